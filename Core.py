@@ -3,13 +3,21 @@
 # -*- coding: utf-8 -*-
 """
 AI核心模块
-提供与AI模型交互的统一接口，支持流式和非流式输出
+提供与AI模型交互的统一接口，支持流式和非流式输出，以及异步和批量调用
 """
 
 import os
-from typing import Union, Generator, Any
-from langchain_modelscope import ModelScopeChatEndpoint
+import asyncio
+import sys
+from typing import Union, Generator, Any, AsyncIterator, List, Optional, Tuple, TYPE_CHECKING
 from template import get_system_message
+from llmcache import ResponseCache, CACHE_CONFIG
+from singleflight import SingleFlight, AsyncSingleFlight
+from limiter import AdaptiveLimiter, LIMITER_CONFIG
+
+# langchain_modelscope及其依赖的langchain_core、pydantic导入耗时较长，首次创建模型客户端时才导入
+if TYPE_CHECKING:
+    from langchain_modelscope import ModelScopeChatEndpoint
 
 # 尝试加载环境变量
 try:
@@ -18,13 +26,309 @@ try:
 except ImportError:
     pass
 
-# 缓存模型实例以提高性能
+# 缓存模型实例以提高性能，每个模型只保留一个客户端，流式与非流式共用
 _model_cache = {}
 
+# 调用配置
+LLM_CONFIG = {
+    "max_concurrency": int(os.environ.get("llm_max_concurrency", 8)),  # 自适应并发上限的上界
+    "queue_timeout": float(os.environ.get("llm_queue_timeout", LIMITER_CONFIG["queue_timeout"])),  # 排队截止时间(秒)
+    "coalesce": True,     # 合并进行中的相同请求
+    "backup_model": os.environ.get("backup_modelname") or None,  # 对冲请求使用的备用模型，为None时关闭
+    "hedge_delay": float(os.environ.get("hedge_delay", 1.0))     # 首个块未在该时间(秒)内到达时发出对冲请求
+}
+
+# 流式调用指标，按模型名统计
+_metrics = {
+    "hedged_requests": 0,   # 启用对冲的流式请求数
+    "hedges_fired": 0,      # 实际发出备用请求的次数
+    "models": {}            # 模型名 -> 请求数、胜出数、被取消数、失败数、首块延迟
+}
+
+# 模型调用的自适应并发限制，同步与异步调用共用，根据延迟和错误率调整上限
+_limiter = AdaptiveLimiter(
+    initial_limit=min(LIMITER_CONFIG["initial_limit"], LLM_CONFIG["max_concurrency"]),
+    max_limit=LLM_CONFIG["max_concurrency"],
+    queue_timeout=LLM_CONFIG["queue_timeout"]
+)
+
+# 回复缓存，默认关闭，通过enable_response_cache()开启
+_response_cache: Optional[ResponseCache] = None
+
+# 相同请求合并：并发的相同请求只向模型发出一次调用
+_sync_flight = SingleFlight()
+_async_flight = AsyncSingleFlight()
+
+
+def _get_model_name() -> str:
+    """
+    获取模型名称
+    
+    Raises:
+        ValueError: 当环境变量未设置时
+    """
+    model_name = os.environ.get("modelname")
+    if not model_name:
+        raise ValueError("环境变量 'modelname' 未设置")
+    return model_name
+
+
+def _get_model(model_name: str) -> "ModelScopeChatEndpoint":
+    """
+    获取共享的模型客户端
+    
+    Args:
+        model_name (str): 模型名称
+    
+    Returns:
+        ModelScopeChatEndpoint: 模型客户端
+    """
+    if model_name not in _model_cache:
+        from langchain_modelscope import ModelScopeChatEndpoint
+        _model_cache[model_name] = ModelScopeChatEndpoint(model=model_name)
+    return _model_cache[model_name]
+
+
+def _build_messages(userprompt: str, systemprompt: str,
+                    history: Optional[List[Tuple[str, str]]] = None) -> list:
+    """
+    构建消息列表
+    
+    Args:
+        userprompt (str): 用户输入的提示词
+        systemprompt (str): 系统提示词类型
+        history (List[Tuple[str, str]]): 插入在系统消息与本轮提问之间的历史消息，
+            其中的system消息（如对话摘要）会并入开头的系统消息
+    
+    Returns:
+        list: [system, *history, human]消息
+    """
+    # 格式化用户提示词
+    formatted_prompt = f"'''{userprompt}'''"
+    
+    # Qwen等模型的对话模板只接受开头的一条system消息
+    role, system_text = get_system_message(systemprompt)
+    turns = []
+    for message in history or []:
+        if message[0] == "system":
+            system_text = f"{system_text}\n\n{message[1]}"
+        else:
+            turns.append(message)
+    
+    return [
+        (role, system_text),
+        *turns,
+        ("human", formatted_prompt),
+    ]
+
+
+def set_max_concurrency(limit: int) -> None:
+    """
+    设置并发上限的上界，自适应上限不会超过该值
+    
+    Args:
+        limit (int): 最大并发数
+    """
+    if limit < 1:
+        raise ValueError("最大并发数必须大于0")
+    LLM_CONFIG["max_concurrency"] = limit
+    _limiter.set_max_limit(limit)
+
+
+def get_limiter_stats() -> dict:
+    """
+    获取并发限制指标
+    
+    Returns:
+        dict: 当前上限、在途数、排队数等，见AdaptiveLimiter.stats()
+    """
+    return _limiter.stats()
+
+
+async def _limited_astream(llm: "ModelScopeChatEndpoint", messages: list) -> AsyncIterator[Any]:
+    """
+    在并发限制内进行流式调用，配额在整个流结束后才释放，以首个块的延迟调整并发上限
+    """
+    async with _limiter.aslot() as permit:
+        async for chunk in llm.astream(messages):
+            permit.observe()
+            yield chunk
+
+
+def _model_metrics(model_name: str) -> dict:
+    """获取模型的指标记录"""
+    stats = _metrics["models"].get(model_name)
+    if stats is None:
+        stats = {"requests": 0, "wins": 0, "cancelled": 0, "errors": 0,
+                 "first_token_total": 0.0, "first_token_max": 0.0}
+        _metrics["models"][model_name] = stats
+    return stats
+
+
+async def _open_first_chunk(model_name: str, messages: list):
+    """
+    发起流式调用并等待首个块
+
+    Returns:
+        (流, 首个块, 首块延迟)，流为空时首个块为None
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    _model_metrics(model_name)["requests"] += 1
+    stream_iter = _limited_astream(_get_model(model_name), messages)
+    try:
+        chunk = await stream_iter.__anext__()
+    except StopAsyncIteration:
+        chunk = None
+    return stream_iter, chunk, loop.time() - start
+
+
+async def _hedged_astream(model_name: str, backup_model: str, messages: list,
+                          delay: float) -> AsyncIterator[Any]:
+    """
+    对冲流式调用：主模型在delay秒内没有产出首个块（或已失败）时，向备用模型再发一次请求，
+    先产出首个块的流胜出，另一个被取消
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    _metrics["hedged_requests"] += 1
+
+    tasks = {loop.create_task(_open_first_chunk(model_name, messages)): model_name}
+    pending = set(tasks)
+    hedged = False
+    winner = None
+    error = None
+
+    try:
+        while winner is None:
+            timeout = None if hedged else max(0.0, delay - (loop.time() - start))
+            done, pending = await asyncio.wait(pending, timeout=timeout,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if winner is None:
+                        winner = task
+                    else:
+                        # 同时完成的另一个流直接关闭
+                        await task.result()[0].aclose()
+                        _model_metrics(tasks[task])["cancelled"] += 1
+                else:
+                    error = task.exception()
+                    _model_metrics(tasks[task])["errors"] += 1
+            if winner is not None:
+                break
+            if not hedged:
+                hedged = True
+                _metrics["hedges_fired"] += 1
+                backup = loop.create_task(_open_first_chunk(backup_model, messages))
+                tasks[backup] = backup_model
+                pending.add(backup)
+            elif not pending:
+                raise error
+    finally:
+        for task in pending:
+            task.cancel()
+            _model_metrics(tasks[task])["cancelled"] += 1
+        if pending:
+            await asyncio.wait(pending)
+
+    stream_iter, chunk, latency = winner.result()
+    stats = _model_metrics(tasks[winner])
+    stats["wins"] += 1
+    stats["first_token_total"] += latency
+    stats["first_token_max"] = max(stats["first_token_max"], latency)
+
+    try:
+        if chunk is None:
+            return
+        yield chunk
+        async for chunk in stream_iter:
+            yield chunk
+    finally:
+        await stream_iter.aclose()
+
+
+def get_llm_metrics() -> dict:
+    """
+    获取流式调用指标
+
+    Returns:
+        dict: 对冲请求数、发出备用请求次数，以及每个模型的请求数、胜出数、被取消数、
+              失败数和平均/最大首块延迟(秒)
+    """
+    models = {}
+    for name, stats in _metrics["models"].items():
+        models[name] = {
+            "requests": stats["requests"],
+            "wins": stats["wins"],
+            "cancelled": stats["cancelled"],
+            "errors": stats["errors"],
+            "first_token_avg": stats["first_token_total"] / stats["wins"] if stats["wins"] else None,
+            "first_token_max": stats["first_token_max"]
+        }
+    return {
+        "hedged_requests": _metrics["hedged_requests"],
+        "hedges_fired": _metrics["hedges_fired"],
+        "models": models
+    }
+
+
+def enable_response_cache(max_entries: int = CACHE_CONFIG["max_entries"],
+                          ttl: Optional[float] = CACHE_CONFIG["ttl"],
+                          near_threshold: Optional[float] = CACHE_CONFIG["near_threshold"],
+                          path: Optional[str] = None) -> ResponseCache:
+    """
+    开启回复缓存
+    
+    Args:
+        max_entries (int): 最大缓存条目数
+        ttl (float): 条目有效期(秒)，为None时不过期
+        near_threshold (float): 近似命中的相似度阈值，为None时只做精确匹配
+        path (str): 持久化文件路径，为None时仅保存在内存中
+    
+    Returns:
+        ResponseCache: 缓存实例，可用于查看命中统计
+    """
+    global _response_cache
+    _response_cache = ResponseCache(max_entries, ttl, near_threshold, path)
+    return _response_cache
+
+
+def disable_response_cache() -> None:
+    """关闭回复缓存"""
+    global _response_cache
+    if _response_cache is not None and _response_cache.path:
+        _response_cache.save()
+    _response_cache = None
+
+
+async def _replay_stream(text: str) -> AsyncIterator[Any]:
+    """
+    以与模型流式输出相同的接口回放缓存的回复
+    """
+    from langchain_core.messages import AIMessageChunk
+    yield AIMessageChunk(content=text)
+
+
+async def _caching_astream(stream: AsyncIterator[Any], model_name: str,
+                           messages: list, userprompt: str) -> AsyncIterator[Any]:
+    """
+    透传流式输出，完整结束后把拼接的回复写入缓存
+    """
+    parts = []
+    async for chunk in stream:
+        parts.append(chunk.content)
+        yield chunk
+    if _response_cache is not None:
+        _response_cache.put(model_name, messages[0][1], userprompt, "".join(parts))
+
 
 def get_ai_response(userprompt: str, 
                    systemprompt: str = 'Claude', 
-                   stream: bool = False) -> Union[str, Generator[str, None, None]]:
+                   stream: bool = False,
+                   history: Optional[List[Tuple[str, str]]] = None,
+                   backup_model: Optional[str] = None,
+                   hedge_delay: Optional[float] = None) -> Union[str, Generator[str, None, None]]:
     """
     获取AI回复
     
@@ -32,6 +336,10 @@ def get_ai_response(userprompt: str,
         userprompt (str): 用户输入的提示词
         systemprompt (str): 系统提示词类型，默认为'Claude'
         stream (bool): 是否使用流式输出，默认为False
+        history (List[Tuple[str, str]]): 多轮对话的历史消息，见conversation.ConversationSession；
+                                         带历史的请求不使用回复缓存
+        backup_model (str): 流式对冲请求的备用模型，默认取LLM_CONFIG["backup_model"]
+        hedge_delay (float): 发出对冲请求前等待首个块的时间(秒)，默认取LLM_CONFIG["hedge_delay"]
     
     Returns:
         Union[str, Generator]: 非流式返回字符串，流式返回生成器
@@ -41,40 +349,140 @@ def get_ai_response(userprompt: str,
         Exception: 当AI调用失败时
     """
     # 获取模型名称
-    model_name = os.environ.get("modelname")
-    if not model_name:
-        raise ValueError("环境变量 'modelname' 未设置")
-    
-    # 格式化用户提示词
-    formatted_prompt = f"'''{userprompt}'''"
+    model_name = _get_model_name()
     
     # 构建消息
-    messages = [
-        get_system_message(systemprompt),
-        ("human", formatted_prompt),
-    ]
+    messages = _build_messages(userprompt, systemprompt, history)
+    
+    # 查找回复缓存
+    cache = _response_cache if not history else None
+    if cache is not None:
+        cached = cache.get(model_name, messages[0][1], userprompt)
+        if cached is not None:
+            return _replay_stream(cached) if stream else cached
     
     try:
         # 使用缓存的模型实例提高性能
-        cache_key = f"{model_name}_{stream}"
-        if cache_key not in _model_cache:
-            _model_cache[cache_key] = ModelScopeChatEndpoint(model=model_name)
-        
-        llm = _model_cache[cache_key]
+        llm = _get_model(model_name)
+        flight_key = (model_name, tuple(messages))
         
         if stream:
-            # 流式输出
-            return llm.astream(messages)
+            backup_model = backup_model or LLM_CONFIG["backup_model"]
+            if hedge_delay is None:
+                hedge_delay = LLM_CONFIG["hedge_delay"]
+            
+            # 流式输出，受异步并发限制
+            def open_stream():
+                if backup_model and backup_model != model_name:
+                    stream_iter = _hedged_astream(model_name, backup_model, messages, hedge_delay)
+                else:
+                    stream_iter = _limited_astream(llm, messages)
+                if cache is not None:
+                    stream_iter = _caching_astream(stream_iter, model_name, messages, userprompt)
+                return stream_iter
+            
+            if LLM_CONFIG["coalesce"]:
+                return _async_flight.stream(flight_key, open_stream)
+            return open_stream()
         else:
             # 非流式输出
-            response = llm.invoke(messages)
-            return response.content
+            def invoke() -> str:
+                # 完整回答的耗时随输出长度变化，不作为过载信号，只按错误和超时调整并发上限
+                with _limiter.slot(measure_latency=False):
+                    response = llm.invoke(messages)
+                if cache is not None:
+                    cache.put(model_name, messages[0][1], userprompt, response.content)
+                return response.content
+            
+            if LLM_CONFIG["coalesce"]:
+                return _sync_flight.do(flight_key, invoke)
+            return invoke()
             
     except Exception as e:
         print(f"AI调用失败: {e}")
         raise
 
 
+async def aget_ai_response(userprompt: str, systemprompt: str = 'Claude',
+                           history: Optional[List[Tuple[str, str]]] = None) -> str:
+    """
+    异步获取AI回复（非流式），受最大并发数限制
+    
+    Args:
+        userprompt (str): 用户输入的提示词
+        systemprompt (str): 系统提示词类型，默认为'Claude'
+        history (List[Tuple[str, str]]): 多轮对话的历史消息
+    
+    Returns:
+        str: AI回复
+    
+    Raises:
+        ValueError: 当环境变量未设置时
+        Exception: 当AI调用失败时
+    """
+    model_name = _get_model_name()
+    messages = _build_messages(userprompt, systemprompt, history)
+    
+    cache = _response_cache if not history else None
+    if cache is not None:
+        cached = cache.get(model_name, messages[0][1], userprompt)
+        if cached is not None:
+            return cached
+    
+    llm = _get_model(model_name)
+    
+    async def invoke() -> str:
+        async with _limiter.aslot(measure_latency=False):
+            response = await llm.ainvoke(messages)
+        if cache is not None:
+            cache.put(model_name, messages[0][1], userprompt, response.content)
+        return response.content
+    
+    if LLM_CONFIG["coalesce"]:
+        return await _async_flight.do((model_name, tuple(messages)), invoke)
+    return await invoke()
+
+
+async def abatch_ai_responses(prompts: List[str],
+                              systemprompt: str = 'Claude',
+                              max_concurrency: Optional[int] = None) -> List[Union[str, Exception]]:
+    """
+    并发获取一批提示词的AI回复
+    
+    Args:
+        prompts (List[str]): 用户提示词列表
+        systemprompt (str): 系统提示词类型，默认为'Claude'
+        max_concurrency (int): 本批次的最大并发数，为None时只受全局并发数限制
+    
+    Returns:
+        List[Union[str, Exception]]: 与输入顺序一致的结果，失败的条目为对应的异常对象
+    """
+    batch_semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    
+    async def run_one(prompt: str) -> str:
+        if batch_semaphore is None:
+            return await aget_ai_response(prompt, systemprompt)
+        async with batch_semaphore:
+            return await aget_ai_response(prompt, systemprompt)
+    
+    return await asyncio.gather(*(run_one(p) for p in prompts), return_exceptions=True)
+
+
+def preload_models() -> List[str]:
+    """
+    预先创建主模型和备用模型的客户端（并完成langchain相关导入），供常驻进程启动时调用
+    
+    Returns:
+        List[str]: 已就绪的模型名称
+    """
+    names = [_get_model_name()]
+    if LLM_CONFIG["backup_model"] and LLM_CONFIG["backup_model"] not in names:
+        names.append(LLM_CONFIG["backup_model"])
+    for name in names:
+        _get_model(name)
+    return names
+
+
 def clear_model_cache() -> None:
     """
     清理模型缓存，释放内存
@@ -85,6 +493,11 @@ def clear_model_cache() -> None:
 
 
 if __name__ == "__main__":
+    if "--import-profile" in sys.argv:
+        from importprofile import print_import_profile
+        print_import_profile("Core")
+        sys.exit(0)
+    
     try:
         user_input = input("请输入你的问题: ")
         if not user_input.strip():
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别结果缓存模块
+按音频内容指纹（归一化PCM的xxhash）和识别参数缓存识别文本，重试、重复上传或
+反复使用的测试音频不再重新识别计费；LRU淘汰，可选持久化到磁盘
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+# xxhash比标准库哈希快一个数量级，未安装时退回blake2b
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# 缓存配置常量
+ASR_CACHE_CONFIG = {
+    "max_entries": 4096,       # 最大缓存条目数，超出时淘汰最久未使用的条目
+    "path": os.environ.get(    # 持久化文件路径，设为空字符串时仅保存在内存中
+        "s2t_cache_path",
+        os.path.join(os.path.expanduser("~"), ".cache", "voice-agent", "asr_cache.json")
+    ),
+    "bytes_per_second": 32000  # 16kHz 16bit 单声道，用于统计节省的音频时长
+}
+
+
+def normalize_pcm(pcm: bytes) -> bytes:
+    """
+    归一化PCM：去掉不足一个采样的尾部字节和首尾的数字静音（全零采样），
+    同一段录音多录或少录几个零采样时得到相同的指纹
+
+    Args:
+        pcm (bytes): s16le PCM
+
+    Returns:
+        bytes: 归一化后的PCM
+    """
+    end = len(pcm.rstrip(b"\0"))
+    end += end % 2  # 末尾采样的高字节为0时不能截掉低字节
+    start = len(pcm) - len(pcm.lstrip(b"\0"))
+    start -= start % 2
+    end = min(end, len(pcm) - len(pcm) % 2)
+    return pcm[start:end] if start < end else b""
+
+
+def audio_fingerprint(pcm: bytes, params: Dict[str, Any]) -> str:
+    """
+    计算缓存键：归一化PCM的哈希加识别参数的哈希
+
+    Args:
+        pcm (bytes): s16le PCM
+        params (Dict): 影响识别结果的参数（识别参数、是否去除静音等）
+
+    Returns:
+        str: 缓存键
+    """
+    audio = normalize_pcm(pcm)
+    options = json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    if xxhash is not None:
+        return f"{xxhash.xxh3_128_hexdigest(audio)}-{xxhash.xxh3_64_hexdigest(options)}"
+    return (f"{hashlib.blake2b(audio, digest_size=16).hexdigest()}-"
+            f"{hashlib.blake2b(options, digest_size=8).hexdigest()}")
+
+
+class TranscriptCache:
+    """
+    识别结果缓存
+    同样的音频和识别参数得到同样的文本，因此条目不设有效期，只按LRU淘汰
+    """
+
+    def __init__(self, max_entries: int = ASR_CACHE_CONFIG["max_entries"],
+                 path: Optional[str] = None):
+        """
+        Args:
+            max_entries (int): 最大缓存条目数
+            path (str): 持久化文件路径，为None时仅保存在内存中
+        """
+        self.max_entries = max_entries
+        self.path = path
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0  # 命中后免于上传的音频时长
+
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def _insert(self, key: str, text: str, seconds: float, created: float) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = {"text": text, "seconds": seconds, "created": created}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查找缓存的识别文本
+
+        Args:
+            key (str): audio_fingerprint()的结果
+
+        Returns:
+            Optional[str]: 命中时返回识别文本，否则返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+            return entry["text"]
+
+    def put(self, key: str, text: str, seconds: float = 0.0) -> None:
+        """
+        写入缓存，只应写入服务端正常返回的最终结果
+
+        Args:
+            key (str): audio_fingerprint()的结果
+            text (str): 识别文本
+            seconds (float): 音频时长(秒)
+        """
+        with self._lock:
+            self._insert(key, text, seconds, time.time())
+            self._dirty = True
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        命中统计
+
+        Returns:
+            Dict[str, Any]: 条目数、命中、未命中次数和命中节省的音频时长(秒)
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_seconds": round(self.saved_seconds, 2)
+        }
+
+    def save(self) -> bool:
+        """
+        保存到持久化文件，没有新条目时跳过
+
+        Returns:
+            bool: 保存成功返回True
+        """
+        if not self.path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return True
+            records = [
+                {"key": key, "text": entry["text"], "seconds": entry["seconds"],
+                 "created": entry["created"]}
+                for key, entry in self._entries.items()
+            ]
+            self._dirty = False
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"保存识别缓存失败: {e}")
+            return False
+
+    def load(self) -> int:
+        """
+        从持久化文件加载
+
+        Returns:
+            int: 加载的条目数
+        """
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except Exception as e:
+            print(f"读取识别缓存失败: {e}")
+            return 0
+
+        with self._lock:
+            # 文件按从旧到新的使用顺序保存，依次插入即可恢复LRU顺序
+            for record in records:
+                self._insert(record["key"], record["text"],
+                             record.get("seconds", 0.0), record.get("created", 0.0))
+        return len(records)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量语音识别模块
+以有限的并发会话数转写大量已录制的音频文件，单个文件失败时按退避时间重试，
+完成情况逐行写入JSONL清单，中断后再次运行会跳过已成功的文件
+
+用法:
+    python audioapi/bulk.py calls/*.raw -j 16 --manifest calls.jsonl
+    python audioapi/bulk.py --list files.txt --manifest calls.jsonl --as-completed
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+from typing import Optional, Iterable, Iterator, AsyncIterator, Callable, Dict, Any, List
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.s2t import SpeechRecognizer, RecognitionSession, TokenBucket, create_recognizer
+from audioapi.engine import await_future
+
+# 批量识别配置常量
+BULK_CONFIG = {
+    "concurrency": 8,          # 同时进行的识别会话数
+    "retries": 2,              # 单个文件失败后的重试次数
+    "retry_backoff": 1.0,      # 首次重试的等待时间(秒)，之后每次翻倍（带随机抖动）
+    "timeout": 120,            # 单个文件的识别超时时间(秒)
+    "fast": True               # 使用快速模式上传（不按实时节奏）
+}
+
+
+class TranscriptionResult:
+    """一个文件的识别结果"""
+
+    def __init__(self, path: str, text: str = "", ok: bool = False, attempts: int = 0,
+                 elapsed: float = 0.0, error: Optional[str] = None, resumed: bool = False):
+        self.path = path
+        self.text = text
+        self.ok = ok
+        self.attempts = attempts
+        self.elapsed = elapsed      # 含重试等待的总耗时(秒)
+        self.error = error
+        self.resumed = resumed      # 结果取自已有清单，本次未重新识别
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "size": _file_size(self.path),
+            "ok": self.ok,
+            "text": self.text,
+            "attempts": self.attempts,
+            "elapsed": round(self.elapsed, 3),
+            "error": self.error
+        }
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def load_manifest(manifest: str) -> Dict[str, TranscriptionResult]:
+    """
+    读取清单中已成功的结果，文件大小与记录不一致时视为未完成
+
+    Args:
+        manifest (str): JSONL清单路径
+
+    Returns:
+        Dict[str, TranscriptionResult]: 按文件绝对路径索引的已完成结果
+    """
+    done = {}
+    if not os.path.exists(manifest):
+        return done
+
+    with open(manifest, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 上次中断时写了一半的行
+            key = os.path.abspath(record.get("path", ""))
+            if record.get("ok") and record.get("size") == _file_size(key):
+                done[key] = TranscriptionResult(
+                    record["path"], record.get("text", ""), True,
+                    record.get("attempts", 1), record.get("elapsed", 0.0), resumed=True
+                )
+            else:
+                done.pop(key, None)
+    return done
+
+
+async def transcribe_with_retries(start: Callable[[], RecognitionSession], result: TranscriptionResult,
+                                  retries: int = BULK_CONFIG["retries"],
+                                  timeout: float = BULK_CONFIG["timeout"]) -> TranscriptionResult:
+    """
+    识别一段音频，连接失败、服务端报错或超时时按退避时间重试
+
+    start()会读取整段音频、去除静音并计算指纹，在线程池中执行，不占用调用方的事件循环；
+    其抛出的异常（如文件读取失败）与识别失败一样记入result.error并重试
+
+    Args:
+        start (Callable): 每次尝试调用一次，新建并启动识别会话（如recognizer.start_file）
+        result (TranscriptionResult): 填入识别文本、尝试次数和错误信息
+        retries (int): 失败后的重试次数
+        timeout (float): 每次尝试的超时时间(秒)
+
+    Returns:
+        TranscriptionResult: 即传入的result
+    """
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    backoff = BULK_CONFIG["retry_backoff"]
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        session = None
+        try:
+            session = await _start_session(loop, start)
+            result.text = await await_future(session.done, timeout)
+            result.ok = True
+            result.error = None
+            break
+        except asyncio.TimeoutError:
+            result.error = "识别超时"
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            if session is not None:
+                session.close()
+
+        if attempt < retries:
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+            backoff *= 2
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+async def _start_session(loop: asyncio.AbstractEventLoop,
+                         start: Callable[[], RecognitionSession]) -> RecognitionSession:
+    """在线程池中调用start()；等待期间被取消时，会话建立后立即关闭"""
+    starting = loop.run_in_executor(None, start)
+    try:
+        return await asyncio.shield(starting)
+    except asyncio.CancelledError:
+        def close(future: asyncio.Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+        starting.add_done_callback(close)
+        raise
+
+
+async def _transcribe(recognizer: SpeechRecognizer, path: str, fast: bool,
+                      bucket: Optional[TokenBucket], retries: int,
+                      timeout: float) -> TranscriptionResult:
+    """识别一个文件，文件不存在时不重试"""
+    result = TranscriptionResult(path)
+    if not os.path.exists(path):
+        result.error = f"音频文件不存在: {path}"
+        return result
+    return await transcribe_with_retries(
+        lambda: recognizer.start_file(path, fast, bucket), result, retries, timeout
+    )
+
+
+async def recognize_many_async(paths: Iterable[str],
+                               concurrency: int = BULK_CONFIG["concurrency"],
+                               ordered: bool = True,
+                               manifest: Optional[str] = None,
+                               retries: int = BULK_CONFIG["retries"],
+                               timeout: float = BULK_CONFIG["timeout"],
+                               fast: bool = BULK_CONFIG["fast"],
+                               bucket: Optional[TokenBucket] = None,
+                               recognizer: Optional[SpeechRecognizer] = None) -> AsyncIterator[TranscriptionResult]:
+    """
+    异步批量识别
+
+    Args:
+        paths (Iterable[str]): 音频文件路径
+        concurrency (int): 同时进行的识别会话数
+        ordered (bool): True按输入顺序产出结果，False按完成顺序产出
+        manifest (str): JSONL清单路径，已成功的文件直接产出记录中的结果，
+                        每个文件完成（成功或重试用尽）后追加一行
+        retries (int): 单个文件失败后的重试次数
+        timeout (float): 单个文件每次尝试的超时时间(秒)
+        fast (bool): 使用快速模式上传
+        bucket (TokenBucket): 所有会话共享的上传限速器（如服务配额），为None时各会话单独限速
+        recognizer (SpeechRecognizer): 识别器，为None时使用环境变量中的配置
+
+    Yields:
+        TranscriptionResult: 每个文件的识别结果
+    """
+    if concurrency < 1:
+        raise ValueError("并发数必须大于0")
+    recognizer = recognizer or create_recognizer()
+    paths = list(paths)
+    done = load_manifest(manifest) if manifest else {}
+    output = open(manifest, "a", encoding="utf-8") if manifest else None
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, path: str):
+        async with semaphore:
+            result = await _transcribe(recognizer, path, fast, bucket, retries, timeout)
+        if output is not None:
+            output.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            output.flush()
+        return index, result
+
+    tasks: List[asyncio.Task] = []
+    resumed: Dict[int, TranscriptionResult] = {}
+    for index, path in enumerate(paths):
+        if os.path.abspath(path) in done:
+            resumed[index] = done[os.path.abspath(path)]
+        else:
+            tasks.append(asyncio.create_task(run(index, path)))
+
+    try:
+        if not ordered:
+            for result in resumed.values():
+                yield result
+            for task in asyncio.as_completed(tasks):
+                yield (await task)[1]
+            return
+
+        # 按输入顺序产出：先完成的结果暂存，等前面的文件完成后再产出
+        pending: Dict[int, TranscriptionResult] = dict(resumed)
+        next_index = 0
+        for task in asyncio.as_completed(tasks):
+            index, result = await task
+            pending[index] = result
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+    finally:
+        # 调用方提前结束迭代时取消未完成的识别，并等待各会话关闭
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if output is not None:
+            output.close()
+
+
+def recognize_many(paths: Iterable[str],
+                   concurrency: int = BULK_CONFIG["concurrency"],
+                   ordered: bool = True,
+                   manifest: Optional[str] = None,
+                   **kwargs) -> Iterator[TranscriptionResult]:
+    """
+    批量识别（同步接口），参数与recognize_many_async相同，不能在运行中的事件循环内调用
+
+    用法:
+        for result in recognize_many(paths, concurrency=16, manifest="calls.jsonl"):
+            print(result.path, result.text if result.ok else result.error)
+
+    Yields:
+        TranscriptionResult: 每个文件的识别结果
+    """
+    loop = asyncio.new_event_loop()
+    results = recognize_many_async(paths, concurrency, ordered, manifest, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量语音识别")
+    parser.add_argument("paths", nargs="*", help="音频文件（s16le, 16kHz, 单声道）")
+    parser.add_argument("--list", help="每行一个音频文件路径的列表文件")
+    parser.add_argument("-j", "--concurrency", type=int, default=BULK_CONFIG["concurrency"],
+                        help="同时进行的识别会话数")
+    parser.add_argument("--manifest", help="JSONL清单路径，中断后可继续")
+    parser.add_argument("--as-completed", action="store_true", help="按完成顺序输出")
+    parser.add_argument("--realtime", action="store_true", help="按实时节奏上传（默认快速模式）")
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.list:
+        with open(args.list, "r", encoding="utf-8") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    if not paths:
+        parser.error("没有要识别的文件")
+
+    started = time.monotonic()
+    succeeded = failed = skipped = 0
+    for result in recognize_many(paths, args.concurrency, not args.as_completed,
+                                 args.manifest, fast=not args.realtime):
+        if result.resumed:
+            skipped += 1
+        elif result.ok:
+            succeeded += 1
+        else:
+            failed += 1
+        print(f"{result.path}\t{result.text if result.ok else '失败: ' + str(result.error)}")
+
+    print(f"完成: 成功 {succeeded}，失败 {failed}，跳过 {skipped}，"
+          f"耗时 {time.monotonic() - started:.1f} 秒", file=sys.stderr)
+    sys.exit(1 if failed else 0)
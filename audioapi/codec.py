@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据帧编解码模块
+识别每40ms、合成每个文本块都要发送一个JSON数据包，接收的音频帧也是JSON包着base64。
+本模块把每个会话固定不变的包结构预先序列化成模板，发送时只把base64结果按字节拼进去，
+不再逐帧构建嵌套字典和调用json.dumps；接收音频帧时直接从原始报文中切出base64部分解码，
+只解析剩下的少量字段。安装了orjson时用其解析JSON
+
+用法:
+    python audioapi/codec.py --bench
+"""
+
+import re
+import json
+import binascii
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+# orjson解析速度约为标准库的数倍，未安装时使用json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 模板占位符：$name$ 替换为字符串内容（保留两侧引号），"#name#" 替换为数值（去掉引号）
+_FIELD_PATTERN = re.compile(rb'"#(\w+)#"|\$(\w+)\$')
+
+# 音频帧中base64音频字段的位置
+_AUDIO_FIELD = re.compile(rb'"audio"\s*:\s*"')
+
+
+def loads(message: Union[str, bytes]) -> Any:
+    """
+    解析JSON，可直接传入未解码的UTF-8字节
+
+    Args:
+        message (str | bytes): JSON文本
+
+    Returns:
+        Any: 解析结果
+    """
+    if orjson is not None:
+        return orjson.loads(message)
+    return json.loads(message)
+
+
+def b64encode(data) -> bytes:
+    """base64编码，接受bytes、bytearray或memoryview，不带换行"""
+    return binascii.b2a_base64(data, newline=False)
+
+
+class PacketTemplate:
+    """
+    预先序列化的数据包模板
+    构建时传入含占位符的数据包，render()只做字节拼接
+    """
+
+    def __init__(self, packet: Dict[str, Any]):
+        """
+        Args:
+            packet (Dict): 数据包，字符串字段的值写作"$name$"，数值字段写作"#name#"
+        """
+        serialized = json.dumps(packet, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._literals: List[bytes] = []
+        self.fields: List[str] = []
+        position = 0
+        for match in _FIELD_PATTERN.finditer(serialized):
+            # 数值字段的匹配包含两侧引号，替换后引号随之去掉；字符串字段的引号留在模板中
+            self._literals.append(serialized[position:match.start()])
+            self.fields.append((match.group(1) or match.group(2)).decode("ascii"))
+            position = match.end()
+        self._literals.append(serialized[position:])
+
+    def render(self, *values: bytes) -> bytes:
+        """
+        按占位符出现的顺序填入各字段
+
+        Args:
+            *values (bytes): 字段值，数值字段传入其十进制文本，字符串字段不能含需转义的字符
+
+        Returns:
+            bytes: 序列化后的数据包（UTF-8）
+        """
+        literals = self._literals
+        if len(values) == 1:
+            return b"".join((literals[0], values[0], literals[1]))
+        parts = [literals[0]]
+        for value, literal in zip(values, literals[1:]):
+            parts.append(value)
+            parts.append(literal)
+        return b"".join(parts)
+
+
+class AudioPacketEncoder:
+    """识别音频帧编码器，每个会话一个（模板含app_id和识别参数）"""
+
+    def __init__(self, app_id: str, iat_params: Dict[str, Any], sample_rate: int, encoding: str):
+        self._templates = [
+            PacketTemplate({
+                "header": {"status": status, "app_id": app_id},
+                "parameter": {"iat": iat_params} if status == 0 else {},
+                "payload": {
+                    "audio": {
+                        "audio": "$audio$",
+                        "sample_rate": sample_rate,
+                        "encoding": encoding
+                    }
+                }
+            })
+            for status in (0, 1, 2)
+        ]
+
+    def encode(self, status: int, audio) -> bytes:
+        """
+        编码一帧音频
+
+        Args:
+            status (int): 帧状态（0首帧，1中间帧，2结束帧）
+            audio (bytes | memoryview): 音频数据
+
+        Returns:
+            bytes: JSON数据包（UTF-8），按文本帧发送
+        """
+        return self._templates[status].render(b64encode(audio))
+
+
+class TextPacketEncoder:
+    """合成文本帧编码器，每个会话一个（模板含app_id和合成参数）"""
+
+    def __init__(self, common_args: Dict[str, Any], business_args: Dict[str, Any]):
+        self._template = PacketTemplate({
+            "header": {**common_args, "status": "#status#"},
+            "parameter": business_args,
+            "payload": {
+                "text": {
+                    "encoding": "utf8",
+                    "compress": "raw",
+                    "format": "plain",
+                    "status": "#status#",
+                    "seq": "#seq#",
+                    "text": "$text$"
+                }
+            }
+        })
+        self._status = [b"0", b"1", b"2"]
+
+    def encode(self, text: str, status: int, seq: int) -> bytes:
+        """
+        编码一个文本帧
+
+        Args:
+            text (str): 文本内容
+            status (int): 帧状态
+            seq (int): 序列号
+
+        Returns:
+            bytes: JSON数据包（UTF-8），按文本帧发送
+        """
+        status_text = self._status[status]
+        return self._template.render(status_text, status_text, str(seq).encode("ascii"),
+                                     b64encode(text.encode("utf-8")))
+
+
+def decode_audio_message(message: Union[str, bytes]) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """
+    解码合成服务的音频帧：base64音频从原始报文中按位置切出后直接解码（不经过JSON字符串），
+    其余字段（header、status、seq等）单独解析
+
+    Args:
+        message (str | bytes): 原始报文，传入未解码的bytes可省去一次UTF-8解码
+
+    Returns:
+        Tuple[Dict, Optional[bytes]]: (去掉音频内容的报文, 音频数据)，报文不含音频时音频为None
+    """
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    match = _AUDIO_FIELD.search(message)
+    if match is None:
+        return loads(message), None
+    start = match.end()
+    end = message.index(b'"', start)
+    audio = binascii.a2b_base64(memoryview(message)[start:end])
+    return loads(message[:start] + message[end:]), audio
+
+
+def _bench(repeat: int = 20000) -> None:
+    """对比逐帧构建字典+json的写法与模板编解码的耗时"""
+    import os
+    import base64
+    import timeit
+
+    pcm = os.urandom(1280)
+    app_id = "15a90977"
+    iat_params = {"domain": "slm", "language": "zh_cn", "accent": "mandarin", "dwa": "wpgs",
+                  "result": {"encoding": "utf8", "compress": "raw", "format": "plain"}}
+
+    def legacy_asr():
+        return json.dumps({
+            "header": {"status": 1, "app_id": app_id},
+            "parameter": {},
+            "payload": {"audio": {"audio": base64.b64encode(pcm).decode("utf-8"),
+                                  "sample_rate": 16000, "encoding": "raw"}}
+        })
+
+    encoder = AudioPacketEncoder(app_id, iat_params, 16000, "raw")
+    assert json.loads(encoder.encode(1, pcm)) == json.loads(legacy_asr())
+
+    common_args = {"app_id": app_id, "status": 0}
+    business_args = {"tts": {"vcn": "x5_lingxiaoyue_flow", "volume": 50, "speed": 50, "pitch": 50,
+                             "audio": {"encoding": "raw", "sample_rate": 24000, "channels": 1,
+                                       "bit_depth": 16, "frame_size": 0}}}
+    text = "今天天气很好，我们去公园散步吧。"
+
+    def legacy_tts():
+        packet = {"header": common_args.copy(), "parameter": business_args,
+                  "payload": {"text": {"encoding": "utf8", "compress": "raw", "format": "plain",
+                                       "status": 1, "seq": 7,
+                                       "text": base64.b64encode(text.encode("utf-8")).decode("UTF8")}}}
+        packet["header"]["status"] = 1
+        return json.dumps(packet)
+
+    text_encoder = TextPacketEncoder(common_args, business_args)
+    assert json.loads(text_encoder.encode(text, 1, 7)) == json.loads(legacy_tts())
+
+    audio = os.urandom(9600)  # 24kHz 16bit 200ms
+    message = json.dumps({
+        "header": {"code": 0, "message": "success", "sid": "ase000e1234", "status": 1},
+        "payload": {"audio": {"encoding": "raw", "sample_rate": 24000, "channels": 1,
+                              "bit_depth": 16, "status": 1, "seq": 3,
+                              "audio": base64.b64encode(audio).decode("utf-8")}}
+    })
+    raw = message.encode("utf-8")
+
+    def legacy_decode():
+        data = json.loads(message)
+        return base64.b64decode(data["payload"]["audio"]["audio"])
+
+    assert decode_audio_message(raw)[1] == legacy_decode() == audio
+
+    cases = [
+        ("识别音频帧编码 (1280B)", legacy_asr, lambda: encoder.encode(1, pcm)),
+        ("合成文本帧编码", legacy_tts, lambda: text_encoder.encode(text, 1, 7)),
+        ("合成音频帧解码 (9600B)", legacy_decode, lambda: decode_audio_message(raw)),
+    ]
+    print(f"JSON解析: {'orjson' if orjson is not None else 'json'}，每项 {repeat} 次")
+    print(f"{'':<24}{'原写法(us)':>12}{'编解码器(us)':>14}{'加速':>8}")
+    for name, legacy, fast in cases:
+        before = min(timeit.repeat(legacy, number=repeat, repeat=3)) / repeat * 1e6
+        after = min(timeit.repeat(fast, number=repeat, repeat=3)) / repeat * 1e6
+        print(f"{name:<24}{before:>12.2f}{after:>14.2f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="数据帧编解码")
+    parser.add_argument("--bench", action="store_true", help="运行微基准测试")
+    parser.add_argument("-n", type=int, default=20000, help="每项重复次数")
+    args = parser.parse_args()
+    if args.bench:
+        _bench(args.n)
+    else:
+        parser.print_help()
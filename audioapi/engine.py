@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享事件循环模块
+所有识别和合成连接复用同一个事件循环线程收发数据、执行定时任务；WebSocket握手和
+可能阻塞的读写（实时录音帧、写入播放缓冲区和文件）交给两个固定大小的线程池，
+进程中的线程数不随会话数增长
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
+from typing import Optional, Callable, Dict, Any
+
+# 事件循环配置常量
+ENGINE_CONFIG = {
+    "connect_workers": 4,      # 同时进行的握手数（连接池上限），超出的连接排队等待
+    "io_workers": 8,           # 阻塞读写线程数
+    "recv_size": 65536         # 每次从套接字读取的最大字节数
+}
+
+
+def settle(future: Future, result: Any = None, error: Optional[BaseException] = None) -> bool:
+    """
+    设置Future的结果，已完成（含被等待方取消）时忽略
+
+    Returns:
+        bool: 本次设置成功返回True
+    """
+    if future.done():
+        return False
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return True
+    except InvalidStateError:
+        return False
+
+
+async def await_future(future: Future, timeout: Optional[float] = None) -> Any:
+    """
+    在任意asyncio事件循环中等待concurrent.futures.Future，超时不会取消原Future
+
+    Args:
+        future (Future): 由共享事件循环完成的Future
+        timeout (float): 超时时间(秒)，None表示一直等待
+
+    Returns:
+        Any: Future的结果
+
+    Raises:
+        asyncio.TimeoutError: 超时
+    """
+    return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+
+class SerialQueue:
+    """
+    在共享线程池上按提交顺序依次执行的任务队列
+    同一队列的任务不会并发执行，不同队列之间互不阻塞，用于保证单个会话的音频按序写出
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self._executor = executor
+        self._tasks = deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def submit(self, fn: Callable, *args) -> None:
+        """
+        追加一个任务
+
+        Args:
+            fn (Callable): 任务函数，异常会被打印后忽略，不影响后续任务
+        """
+        with self._lock:
+            self._tasks.append((fn, args))
+            if self._running:
+                return
+            self._running = True
+        self._executor.submit(self._drain)
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                if not self._tasks:
+                    self._running = False
+                    return
+                fn, args = self._tasks.popleft()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"后台任务错误: {e}")
+
+
+class Engine:
+    """
+    共享事件循环
+    事件循环线程在首次使用时启动，之后常驻；回调都在该线程中执行，不能阻塞
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._connector = ThreadPoolExecutor(max_workers=ENGINE_CONFIG["connect_workers"],
+                                             thread_name_prefix="audio-connect")
+        self._io = ThreadPoolExecutor(max_workers=ENGINE_CONFIG["io_workers"],
+                                      thread_name_prefix="audio-io")
+        self.connections = 0  # 当前已建立的连接数
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """事件循环，首次访问时启动循环线程"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+                    self._thread = threading.Thread(target=self._run, args=(loop, ready),
+                                                    name="audio-engine", daemon=True)
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def in_loop(self) -> bool:
+        """当前是否在事件循环线程中"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def call_soon(self, callback: Callable, *args) -> None:
+        """在事件循环线程中执行回调，可从任意线程调用，同一线程提交的回调按顺序执行"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay: float, callback: Callable, *args) -> asyncio.TimerHandle:
+        """
+        延迟执行回调，只能在事件循环线程中调用
+
+        Returns:
+            asyncio.TimerHandle: 可用cancel()取消
+        """
+        return self.loop.call_later(delay, callback, *args)
+
+    def connect(self, fn: Callable, *args) -> Future:
+        """在握手线程池中执行阻塞的连接建立"""
+        return self._connector.submit(fn, *args)
+
+    def run_blocking(self, fn: Callable, *args) -> Future:
+        """在读写线程池中执行可能阻塞的任务（如迭代实时录音帧）"""
+        return self._io.submit(fn, *args)
+
+    def serial(self) -> SerialQueue:
+        """创建一个在读写线程池上顺序执行的任务队列"""
+        return SerialQueue(self._io)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        事件循环指标
+
+        Returns:
+            Dict[str, Any]: 已建立的连接数、进程线程数
+        """
+        return {
+            "connections": self.connections,
+            "threads": threading.active_count()
+        }
+
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    获取进程内共享的事件循环
+
+    Returns:
+        Engine: 共享实例
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = Engine()
+    return _engine
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长音频识别模块
+单次识别会话按实时节奏上传且有时长上限，长录音要么超时、要么耗时等于音频时长。
+本模块在说话停顿处把长音频切成有限长度的片段，用多个会话并发识别，再按顺序拼接；
+找不到停顿时硬切并让相邻片段重叠，拼接时去掉重叠部分重复识别出的文字
+
+用法:
+    python audioapi/longform.py meeting.raw -j 8
+"""
+
+import os
+import sys
+import time
+import bisect
+import asyncio
+from difflib import SequenceMatcher
+from typing import Optional, List, Tuple
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.s2t import SpeechRecognizer, TokenBucket, AUDIO_CONFIG, create_recognizer
+from audioapi.bulk import TranscriptionResult, BULK_CONFIG, transcribe_with_retries
+from voiceIO.vad import find_pauses
+
+# 长音频识别配置常量
+LONGFORM_CONFIG = {
+    "max_segment": 50.0,       # 片段最长时长(秒)，单次识别会话的音频上限约60秒
+    "min_segment": 15.0,       # 片段最短时长(秒)，停顿早于此位置时不切分，避免片段过碎
+    "min_pause_ms": 300,       # 可作为切分点的最短停顿(毫秒)
+    "overlap": 1.0,            # 找不到停顿而硬切时，相邻片段重叠的时长(秒)
+    "overlap_chars": 12,       # 修复重叠时比较的字数（前一段末尾、后一段开头）
+    "concurrency": 8           # 同时进行的识别会话数
+}
+
+
+class Segment:
+    """长音频中的一个片段（字节偏移）"""
+
+    def __init__(self, index: int, start: int, end: int, overlap: bool = False):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.overlap = overlap  # 开头与上一片段的结尾重叠（硬切）
+
+    @property
+    def seconds(self) -> float:
+        return (self.end - self.start) / AUDIO_CONFIG["bytes_per_second"]
+
+
+class LongTranscript:
+    """长音频识别结果"""
+
+    def __init__(self, text: str, segments: List[TranscriptionResult],
+                 audio_seconds: float, elapsed: float):
+        self.text = text
+        self.segments = segments
+        self.audio_seconds = audio_seconds
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        """所有片段均识别成功"""
+        return all(result.ok for result in self.segments)
+
+
+def split_segments(pcm: bytes,
+                   max_segment: float = LONGFORM_CONFIG["max_segment"],
+                   min_segment: float = LONGFORM_CONFIG["min_segment"],
+                   overlap: float = LONGFORM_CONFIG["overlap"]) -> List[Segment]:
+    """
+    在停顿处切分长音频
+
+    每个片段在[min_segment, max_segment]范围内选最靠后的停顿中点切开；
+    范围内没有停顿时在max_segment处硬切，下一片段从切点前overlap秒开始
+
+    Args:
+        pcm (bytes): s16le 16kHz 单声道PCM
+        max_segment (float): 片段最长时长(秒)
+        min_segment (float): 片段最短时长(秒)
+        overlap (float): 硬切时的重叠时长(秒)
+
+    Returns:
+        List[Segment]: 按时间顺序的片段
+    """
+    bytes_per_second = AUDIO_CONFIG["bytes_per_second"]
+    max_bytes = int(max_segment * bytes_per_second) & ~1
+    min_bytes = int(min_segment * bytes_per_second) & ~1
+    overlap_bytes = int(overlap * bytes_per_second) & ~1
+    if overlap_bytes >= min_bytes:
+        raise ValueError("重叠时长必须小于片段最短时长")
+
+    cuts = [(start + end) // 2 & ~1
+            for start, end in find_pauses(pcm, LONGFORM_CONFIG["min_pause_ms"])]
+    length = len(pcm) & ~1
+    segments = []
+    position = 0
+    overlapped = False
+    while length - position > max_bytes:
+        # 范围内最靠后的停顿
+        i = bisect.bisect_right(cuts, position + max_bytes) - 1
+        if i >= 0 and cuts[i] >= position + min_bytes:
+            segments.append(Segment(len(segments), position, cuts[i], overlapped))
+            position, overlapped = cuts[i], False
+        else:
+            cut = position + max_bytes
+            segments.append(Segment(len(segments), position, cut, overlapped))
+            position, overlapped = cut - overlap_bytes, True
+    if length > position or not segments:
+        segments.append(Segment(len(segments), position, length, overlapped))
+    return segments
+
+
+def repair_overlap(previous: str, following: str,
+                   window: int = LONGFORM_CONFIG["overlap_chars"]) -> Tuple[str, str]:
+    """
+    去掉重叠音频在相邻两段中重复识别出的文字
+
+    在前一段末尾和后一段开头各取window个字，找最长的公共片段作为对齐点：
+    前一段保留到对齐点，后一段从对齐点之后开始。切点附近被截断的词通常识别不准，
+    对齐点两侧的这部分文字一并丢弃
+
+    Args:
+        previous (str): 前一段文本
+        following (str): 后一段文本
+        window (int): 比较的字数
+
+    Returns:
+        Tuple[str, str]: 修复后的(前一段, 后一段)，找不到至少2个字的公共片段时原样返回
+    """
+    tail = previous[-window:]
+    head = following[:window]
+    match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(head)
+    )
+    if match.size < 2:
+        return previous, following
+    keep = len(previous) - len(tail) + match.a + match.size
+    return previous[:keep], following[match.b + match.size:]
+
+
+def stitch(segments: List[Segment], texts: List[str]) -> str:
+    """
+    按顺序拼接各片段的文本，硬切处修复重叠
+
+    Args:
+        segments (List[Segment]): split_segments()的结果
+        texts (List[str]): 各片段的识别文本，失败的片段为空字符串
+
+    Returns:
+        str: 完整文本
+    """
+    parts: List[str] = []
+    for segment, text in zip(segments, texts):
+        if segment.overlap and parts and text:
+            parts[-1], text = repair_overlap(parts[-1], text)
+        parts.append(text)
+    return "".join(parts)
+
+
+async def recognize_long_async(audio_file: str,
+                               concurrency: int = LONGFORM_CONFIG["concurrency"],
+                               fast: bool = BULK_CONFIG["fast"],
+                               retries: int = BULK_CONFIG["retries"],
+                               timeout: float = BULK_CONFIG["timeout"],
+                               bucket: Optional[TokenBucket] = None,
+                               recognizer: Optional[SpeechRecognizer] = None) -> LongTranscript:
+    """
+    异步识别长音频
+
+    Args:
+        audio_file (str): 音频文件路径（s16le, 16kHz, 单声道）
+        concurrency (int): 同时进行的识别会话数
+        fast (bool): 使用快速模式上传
+        retries (int): 单个片段失败后的重试次数
+        timeout (float): 单个片段每次尝试的超时时间(秒)
+        bucket (TokenBucket): 所有片段共享的上传限速器，为None时各片段单独限速
+        recognizer (SpeechRecognizer): 识别器，为None时使用环境变量中的配置
+
+    Returns:
+        LongTranscript: 拼接后的文本和各片段的结果；失败的片段在文本中缺失，ok为False
+    """
+    if concurrency < 1:
+        raise ValueError("并发数必须大于0")
+    recognizer = recognizer or create_recognizer()
+    started = time.monotonic()
+    with open(audio_file, "rb") as f:
+        pcm = f.read()
+    segments = split_segments(pcm)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(segment: Segment) -> TranscriptionResult:
+        audio = pcm[segment.start:segment.end]
+        async with semaphore:
+            return await transcribe_with_retries(
+                lambda: recognizer.start_pcm(audio, fast, bucket),
+                TranscriptionResult(f"{audio_file}#{segment.index}"), retries, timeout
+            )
+
+    tasks = [asyncio.ensure_future(run(segment)) for segment in segments]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    text = stitch(segments, [result.text if result.ok else "" for result in results])
+    return LongTranscript(text, list(results), len(pcm) / AUDIO_CONFIG["bytes_per_second"],
+                          time.monotonic() - started)
+
+
+def recognize_long(audio_file: str,
+                   concurrency: int = LONGFORM_CONFIG["concurrency"],
+                   **kwargs) -> LongTranscript:
+    """
+    识别长音频（同步接口），参数与recognize_long_async相同，不能在运行中的事件循环内调用
+
+    Returns:
+        LongTranscript: 拼接后的文本和各片段的结果
+    """
+    return asyncio.run(recognize_long_async(audio_file, concurrency, **kwargs))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="长音频识别")
+    parser.add_argument("audio_file", help="音频文件（s16le, 16kHz, 单声道）")
+    parser.add_argument("-j", "--concurrency", type=int, default=LONGFORM_CONFIG["concurrency"],
+                        help="同时进行的识别会话数")
+    parser.add_argument("--realtime", action="store_true", help="按实时节奏上传（默认快速模式）")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.audio_file):
+        parser.error(f"音频文件不存在: {args.audio_file}")
+
+    transcript = recognize_long(args.audio_file, args.concurrency, fast=not args.realtime)
+    print(transcript.text)
+    failed = [result for result in transcript.segments if not result.ok]
+    for result in failed:
+        print(f"片段识别失败: {result.path}: {result.error}", file=sys.stderr)
+    print(f"音频 {transcript.audio_seconds:.1f} 秒，{len(transcript.segments)} 个片段，"
+          f"耗时 {transcript.elapsed:.1f} 秒", file=sys.stderr)
+    sys.exit(1 if failed else 0)
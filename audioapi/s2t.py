@@ -5,27 +5,32 @@
 基于WebSocket的实时语音识别服务
 """
 
-import _thread as thread
 import time
-import websocket
 import base64
-import datetime
-import hashlib
-import hmac
-import json
-import ssl
 import threading
+import queue
+import asyncio
 import os
 import sys
-from datetime import datetime
-from time import mktime
-from urllib.parse import urlencode
-from wsgiref.handlers import format_date_time
-from typing import Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Iterable, Iterator, AsyncIterator, Tuple, Dict, Any
 
 # 添加父目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from voiceIO.record import record_audio
+from audioapi.transport import Connection, create_auth_url
+from audioapi.engine import get_engine, settle, await_future
+from audioapi.wpgs import HypothesisBuilder
+from audioapi import codec
+from audioapi.asrcache import TranscriptCache, ASR_CACHE_CONFIG, audio_fingerprint
+
+# 语音识别服务地址
+IAT_URL = 'ws://iat.xf-yun.com/v1'
+
+# 识别结果缓存，首次使用时按ASR_CACHE_CONFIG创建，可通过disable_transcript_cache()关闭
+_transcript_cache: Optional[TranscriptCache] = None
+_transcript_cache_enabled = True
+_transcript_cache_lock = threading.Lock()
 
 # 音频帧状态常量
 STATUS_FIRST_FRAME = 0
@@ -38,10 +43,68 @@ AUDIO_CONFIG = {
     "interval": 0.04,          # 发送间隔(秒)
     "sample_rate": 16000,      # 采样率
     "encoding": "raw",         # 编码格式
-    "timeout": 30              # 默认超时时间
+    "timeout": 30,             # 默认超时时间
+    "bytes_per_second": 32000, # 16kHz 16bit 单声道每秒音频字节数
+    # 快速模式：识别已录制好的文件时不按实时节奏发送，由令牌桶限制上传速率
+    "fast_frame_size": 5120,   # 快速模式每帧音频大小（160ms）
+    "fast_speedup": 5.0,       # 上传速率上限，按实时速率的倍数计
+    "fast_burst": 2.0,         # 开始时可立即发送的音频时长(秒)
+    "vad": True,               # 识别已录制的音频（文件/内存PCM）时先去除静音（见voiceIO.vad），减少计费时长
+    "stream_vad": False        # 实时录音流是否跳过静音帧；开启后静音期间每秒仍发送一帧静音保持连接
 }
 
 
+class TokenBucket:
+    """
+    令牌桶限速器，令牌以字节计，线程安全，可在多个会话间共享以限制总上传速率
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): 每秒补充的令牌数
+            capacity (float): 桶容量，即可立即发送的最大突发量
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, amount: float) -> float:
+        """
+        预订令牌，不足时记为欠账，由后续补充的令牌偿还
+        
+        Args:
+            amount (float): 需要的令牌数
+        
+        Returns:
+            float: 发送前需要等待的时间(秒)，令牌充足时为0
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+def create_upload_bucket(speedup: float = AUDIO_CONFIG["fast_speedup"],
+                         burst: float = AUDIO_CONFIG["fast_burst"]) -> TokenBucket:
+    """
+    创建快速模式的上传限速器
+    
+    Args:
+        speedup (float): 上传速率上限，按实时速率的倍数计
+        burst (float): 可立即发送的音频时长(秒)
+    
+    Returns:
+        TokenBucket: 以音频字节计的令牌桶
+    """
+    rate = AUDIO_CONFIG["bytes_per_second"] * speedup
+    return TokenBucket(rate, AUDIO_CONFIG["bytes_per_second"] * burst)
+
+
 class WebSocketParams:
     """
     WebSocket连接参数配置类
@@ -73,225 +136,714 @@ class WebSocketParams:
         Returns:
             str: 认证后的WebSocket URL
         """
-        url = 'ws://iat.xf-yun.com/v1'
-        
-        # 生成时间戳
-        now = datetime.now()
-        date = format_date_time(mktime(now.timetuple()))
-        
-        # 构建签名字符串
-        signature_origin = f"host: iat.xf-yun.com\ndate: {date}\nGET /v1 HTTP/1.1"
-        
-        # HMAC-SHA256加密
-        signature_sha = hmac.new(
-            self.api_secret.encode('utf-8'),
-            signature_origin.encode('utf-8'),
-            digestmod=hashlib.sha256
-        ).digest()
-        signature_sha = base64.b64encode(signature_sha).decode('utf-8')
-        
-        # 构建授权字符串
-        authorization_origin = (
-            f'api_key="{self.api_key}", algorithm="hmac-sha256", '
-            f'headers="host date request-line", signature="{signature_sha}"'
-        )
-        authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode('utf-8')
-        
-        # 构建URL参数
-        params = {
-            "authorization": authorization,
-            "date": date,
-            "host": "iat.xf-yun.com"
-        }
-        
-        return f"{url}?{urlencode(params)}"
+        return create_auth_url(IAT_URL, self.api_key, self.api_secret)
 
 
-class SpeechRecognizer:
+def _decode_result(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """
-    语音识别器类
-    提供完整的语音识别功能
+    解码消息中的识别结果
+    
+    Args:
+        payload (Dict): 消息中的payload字段
+    
+    Returns:
+        Optional[Dict]: 本条结果（含sn、pgs、rg、ws等字段），没有结果时返回None
     """
+    if not payload or "result" not in payload:
+        return None
     
-    def __init__(self, app_id: str, api_key: str, api_secret: str):
-        self.app_id = app_id
-        self.api_key = api_key
-        self.api_secret = api_secret
+    return codec.loads(base64.b64decode(payload["result"]["text"]))
+
+
+def _iter_pcm_frames(pcm: bytes, frame_size: int = AUDIO_CONFIG["frame_size"]) -> Iterator[bytes]:
+    """
+    把内存中的音频按帧切分
+    
+    Args:
+        pcm (bytes): 音频数据
+        frame_size (int): 每帧字节数
+    
+    Yields:
+        memoryview: 音频帧（不复制）
+    """
+    view = memoryview(pcm)
+    for offset in range(0, len(pcm), frame_size):
+        yield view[offset:offset + frame_size]
+
+
+def _iter_file_frames(audio_file: str, frame_size: int = AUDIO_CONFIG["frame_size"]) -> Iterator[bytes]:
+    """
+    按帧读取音频文件
+    
+    Args:
+        audio_file (str): 音频文件路径
+        frame_size (int): 每帧字节数
+    
+    Yields:
+        memoryview: 音频帧，复用同一块缓冲区，只在迭代到下一帧之前有效
+    """
+    buf = bytearray(frame_size)
+    view = memoryview(buf)
+    with open(audio_file, "rb") as fp:
+        while True:
+            size = fp.readinto(buf)
+            if not size:
+                break
+            yield view[:size]
+
+
+class RecognitionSession:
+    """
+    单次识别会话
+    持有一条WebSocket连接及其全部识别状态，同一进程中的多个会话互不影响，可并行运行；
+    可先调用connect()预先建立连接，音频就绪后再调用start()开始发送。
+    回调在共享事件循环中执行，会话本身不创建线程；
+    done在服务端返回最终结果（status 2）时以识别文本完成，出错时以ConnectionError完成
+    """
+    
+    def __init__(self, ws_param: WebSocketParams):
+        self.ws_param = ws_param
+        self._encoder = codec.AudioPacketEncoder(ws_param.app_id, ws_param.iat_params,
+                                                 AUDIO_CONFIG["sample_rate"], AUDIO_CONFIG["encoding"])
+        self.events = queue.Queue()
+        self.done: Future = Future()
+        self.ws = None
+        self.closed = False
+        self._notify = None  # 异步迭代时把事件转交给调用方的事件循环
+        self._events_lock = threading.Lock()
+        
+        # 连接建立后才能开始发送，两者先后顺序不定
+        self._opened = threading.Event()
+        self._lock = threading.Lock()
+        self._frames = None
+        self._interval = 0
+        self._blocking = True
+        self._bucket = None
+        self._sending = False
         
         # 识别状态
         self.final_result = ""
         self.latest_result = ""
+        self.stable_result = ""  # 不会再被动态修正替换的前缀
+        self.hypothesis = HypothesisBuilder()
         self.recognition_complete = False
         self.error_occurred = False
         self.error_message = ""
+        self.saved_seconds = 0.0  # 去除静音节省的音频时长(秒)
+        self.cached = False       # 结果取自识别结果缓存，未上传音频
     
-    def _reset_state(self) -> None:
-        """重置识别状态"""
-        self.final_result = ""
-        self.latest_result = ""
-        self.recognition_complete = False
-        self.error_occurred = False
-        self.error_message = ""
+    def _emit(self, kind: str, value: Any) -> None:
+        """产出一个识别事件（partial/stable/final/error/closed）"""
+        with self._events_lock:
+            if self._notify is not None:
+                self._notify((kind, value))
+            else:
+                self.events.put((kind, value))
+    
+    def _fail(self, message: str) -> None:
+        """记录错误并通知等待方"""
+        self.error_occurred = True
+        self.error_message = message
+        settle(self.done, error=ConnectionError(message))
+        self._emit("error", message)
     
-    def _on_message(self, ws, message: str) -> None:
+    def _on_message(self, conn: Connection, message: str) -> None:
         """处理WebSocket消息"""
         try:
-            data = json.loads(message)
+            data = codec.loads(message)
             code = data["header"]["code"]
             status = data["header"]["status"]
             
             if code != 0:
-                self.error_occurred = True
-                self.error_message = f"识别错误: {code}"
-                ws.close()
+                self._fail(f"识别错误: {code}")
+                conn.close()
                 return
             
             # 处理识别结果
-            payload = data.get("payload")
-            if payload and "result" in payload:
-                text_data = json.loads(
-                    base64.b64decode(payload["result"]["text"]).decode("utf8")
-                )
-                
-                # 提取文本内容
-                result = ""
-                for ws_item in text_data.get("ws", []):
-                    for cw_item in ws_item.get("cw", []):
-                        result += cw_item.get("w", "")
-                
-                # 更新结果（只保留更长的结果）
-                if len(result) > len(self.latest_result):
-                    self.latest_result = result
+            result = _decode_result(data.get("payload"))
+            if result is not None:
+                # 按wpgs的追加/替换语义拼接，稳定前缀变化时单独通知
+                stable_changed = self.hypothesis.apply(result)
+                text = self.hypothesis.text
+                if stable_changed:
+                    self.stable_result = self.hypothesis.stable_text
+                    self._emit("stable", self.stable_result)
+                if text != self.latest_result:
+                    self.latest_result = text
+                    self._emit("partial", text)
             
             # 检查是否完成
             if status == 2:
                 self.final_result = self.latest_result
                 self.recognition_complete = True
-                ws.close()
+                settle(self.done, self.final_result)
+                self._emit("final", self.final_result)
+                conn.close()
                 
         except Exception as e:
-            self.error_occurred = True
-            self.error_message = f"消息处理错误: {e}"
-            ws.close()
+            self._fail(f"消息处理错误: {e}")
+            conn.close()
     
-    def _on_error(self, ws, error) -> None:
+    def _on_error(self, conn: Connection, error) -> None:
         """处理WebSocket错误"""
-        self.error_occurred = True
-        self.error_message = f"WebSocket错误: {error}"
+        self._fail(f"WebSocket错误: {error}")
     
-    def _on_close(self, ws, close_status_code, close_msg) -> None:
+    def _on_close(self, conn: Connection) -> None:
         """处理WebSocket关闭"""
-        pass
+        self.closed = True
+        settle(self.done, error=ConnectionError("识别连接已关闭，未收到最终结果"))
+        self._emit("closed", None)
     
-    def _on_open(self, ws, audio_file: str) -> None:
-        """处理WebSocket开启，开始发送音频数据"""
-        def send_audio():
-            try:
-                ws_param = WebSocketParams(self.app_id, self.api_key, self.api_secret, audio_file)
-                status = STATUS_FIRST_FRAME
+    def _on_open(self, conn: Connection) -> None:
+        """连接建立，音频已就绪时开始发送"""
+        self._opened.set()
+        self._begin_sending()
+    
+    def _begin_sending(self) -> None:
+        """连接已建立且已指定音频帧时开始发送（只开始一次）"""
+        with self._lock:
+            if self._sending or self._frames is None or not self._opened.is_set():
+                return
+            self._sending = True
+        if self._blocking:
+            # 实时录音等会阻塞的帧来源在共享的读写线程池中迭代
+            get_engine().run_blocking(self._send_frames, self.ws, self._frames, self._interval)
+        else:
+            get_engine().call_soon(self._send_next, iter(self._frames), STATUS_FIRST_FRAME, None)
+    
+    def _open(self) -> None:
+        """通过传输层建立连接"""
+        self.ws = Connection(
+            "iat", IAT_URL, self.ws_param.api_key, self.ws_param.api_secret,
+            on_message=self._on_message,
+            on_open=self._on_open,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            raw_text=True
+        ).start()
+    
+    @property
+    def is_open(self) -> bool:
+        """连接已建立、尚未关闭且未出错"""
+        return self.ws is not None and self.ws.is_open and not self.closed and not self.error_occurred
+    
+    def connect(self, timeout: float = 10) -> bool:
+        """
+        预先建立连接，握手和鉴权不再占用音频就绪后的时间
+        
+        Args:
+            timeout (float): 等待连接建立的超时时间(秒)
+        
+        Returns:
+            bool: 连接已建立返回True
+        """
+        if self.ws is None:
+            self._open()
+        return self.ws.wait_open(timeout) and self.is_open
+    
+    def _send_last(self, conn: Connection, status: int) -> None:
+        """发送结束帧；一帧音频都没有（如全是静音）时先补发携带识别参数的首帧"""
+        if status == STATUS_FIRST_FRAME:
+            conn.send(self._encoder.encode(STATUS_FIRST_FRAME, b""), text=True)
+        conn.send(self._encoder.encode(STATUS_LAST_FRAME, b""), text=True)
+    
+    def _send_frames(self, conn: Connection, frames: Iterable[bytes], interval: float) -> None:
+        """
+        发送音频帧，frames耗尽后发送结束帧
+        
+        Args:
+            conn (Connection): WebSocket连接
+            frames (Iterable[bytes]): 音频帧迭代器
+            interval (float): 帧间发送间隔(秒)，0表示不限速
+        """
+        status = STATUS_FIRST_FRAME
+        try:
+            for buf in frames:
+                if self.closed or self.error_occurred:
+                    # 会话已关闭（如识别出错或调用方提前结束），停止读取音频
+                    return
+                if self._bucket is not None:
+                    time.sleep(self._bucket.reserve(len(buf)))
+                conn.send(self._encoder.encode(status, buf), text=True)
+                status = STATUS_CONTINUE_FRAME
                 
-                with open(audio_file, "rb") as fp:
-                    while True:
-                        # 读取音频数据
-                        buf = fp.read(AUDIO_CONFIG["frame_size"])
-                        if not buf:
-                            status = STATUS_LAST_FRAME
-                        
-                        # 编码音频数据
-                        audio_data = base64.b64encode(buf).decode('utf-8')
-                        
-                        # 构建数据包
-                        packet = {
-                            "header": {
-                                "status": 0 if status == STATUS_FIRST_FRAME else (1 if status == STATUS_CONTINUE_FRAME else 2),
-                                "app_id": ws_param.app_id
-                            },
-                            "parameter": {"iat": ws_param.iat_params} if status == STATUS_FIRST_FRAME else {},
-                            "payload": {
-                                "audio": {
-                                    "audio": audio_data,
-                                    "sample_rate": AUDIO_CONFIG["sample_rate"],
-                                    "encoding": AUDIO_CONFIG["encoding"]
-                                }
-                            }
-                        }
-                        
-                        # 发送数据
-                        ws.send(json.dumps(packet))
-                        
-                        if status == STATUS_LAST_FRAME:
-                            break
-                        
-                        # 更新状态
-                        if status == STATUS_FIRST_FRAME:
-                            status = STATUS_CONTINUE_FRAME
-                        
-                        # 控制发送频率
-                        time.sleep(AUDIO_CONFIG["interval"])
-                        
-            except Exception as e:
-                self.error_occurred = True
-                self.error_message = f"音频发送错误: {e}"
-        
-        thread.start_new_thread(send_audio, ())
-    
-    def recognize_audio(self, audio_file: str, timeout: int = AUDIO_CONFIG["timeout"]) -> str:
+                # 控制发送频率
+                if interval:
+                    time.sleep(interval)
+            
+            self._send_last(conn, status)
+        except Exception as e:
+            self._fail(f"音频发送错误: {e}")
+        finally:
+            # 在迭代frames的线程中关闭，实时录音随之停止
+            if hasattr(frames, "close"):
+                frames.close()
+    
+    def _send_next(self, frames: Iterator[bytes], status: int, pending: Optional[bytes]) -> None:
+        """
+        在事件循环中发送下一帧，按self._interval或令牌桶定时发送后续帧，不占用线程
+        
+        Args:
+            frames (Iterator[bytes]): 不会阻塞的音频帧迭代器（如读取文件）
+            status (int): 本帧的帧状态
+            pending (bytes): 已预订令牌、等待发送的帧，为None时从frames读取下一帧
+        """
+        if self.closed or self.error_occurred:
+            return
+        try:
+            buf = pending if pending is not None else next(frames, None)
+            if buf is None:
+                self._send_last(self.ws, status)
+                return
+            if pending is None and self._bucket is not None:
+                wait = self._bucket.reserve(len(buf))
+                if wait > 0:
+                    get_engine().call_later(wait, self._send_next, frames, status, buf)
+                    return
+            self.ws.send(self._encoder.encode(status, buf), text=True)
+            get_engine().call_later(self._interval, self._send_next,
+                                    frames, STATUS_CONTINUE_FRAME, None)
+        except Exception as e:
+            self._fail(f"音频发送错误: {e}")
+    
+    def start(self, frames: Iterable[bytes], interval: float = 0, blocking: bool = True,
+              bucket: Optional[TokenBucket] = None) -> None:
+        """
+        在后台发送音频帧，尚未连接时先建立连接
+        
+        Args:
+            frames (Iterable[bytes]): 音频帧迭代器
+            interval (float): 帧间发送间隔(秒)
+            blocking (bool): 迭代frames是否可能阻塞（如实时录音）；为False时（如读取文件）
+                             直接在事件循环中定时发送，不占用线程
+            bucket (TokenBucket): 上传限速器，每帧按字节数取令牌，可与interval同时使用
+        """
+        self._frames = frames
+        self._interval = interval
+        self._blocking = blocking
+        self._bucket = bucket
+        if self.ws is None:
+            self._open()
+        else:
+            self._begin_sending()
+    
+    def iter_events(self, timeout: int = AUDIO_CONFIG["timeout"]) -> Iterator[Tuple[str, str]]:
+        """
+        按到达顺序产出识别事件
+        
+        Args:
+            timeout (int): 等待服务端消息的超时时间(秒)
+        
+        Yields:
+            Tuple[str, str]: (事件类型, 文本)。partial为当前完整识别文本，
+                             stable为不会再被修正的前缀，final为最终结果（出错或超时时为已识别的部分）
+        """
+        while True:
+            try:
+                kind, value = self.events.get(timeout=timeout)
+            except queue.Empty:
+                yield "final", self.latest_result
+                return
+            
+            if kind in ("partial", "stable"):
+                yield kind, value
+            else:  # final / error / closed
+                if kind == "error":
+                    print(value)
+                yield "final", self.latest_result
+                return
+    
+    async def aiter_events(self, timeout: int = AUDIO_CONFIG["timeout"]) -> AsyncIterator[Tuple[str, str]]:
+        """
+        在调用方的asyncio事件循环中按到达顺序产出识别事件，不占用线程
+        
+        Args:
+            timeout (int): 等待服务端消息的超时时间(秒)
+        
+        Yields:
+            Tuple[str, str]: (事件类型, 文本)，同iter_events
+        """
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+        with self._events_lock:
+            while not self.events.empty():
+                pending.put_nowait(self.events.get_nowait())
+            self._notify = lambda event: loop.call_soon_threadsafe(pending.put_nowait, event)
+        
+        while True:
+            try:
+                kind, value = await asyncio.wait_for(pending.get(), timeout)
+            except asyncio.TimeoutError:
+                yield "final", self.latest_result
+                return
+            
+            if kind in ("partial", "stable"):
+                yield kind, value
+            else:  # final / error / closed
+                if kind == "error":
+                    print(value)
+                yield "final", self.latest_result
+                return
+    
+    def iter_results(self, timeout: int = AUDIO_CONFIG["timeout"]) -> Iterator[Tuple[str, bool]]:
+        """
+        按到达顺序产出识别结果
+        
+        Args:
+            timeout (int): 等待服务端消息的超时时间(秒)
+        
+        Yields:
+            Tuple[str, bool]: (识别文本, 是否为最终结果)
+        """
+        for kind, text in self.iter_events(timeout):
+            if kind != "stable":
+                yield text, kind == "final"
+    
+    async def aiter_results(self, timeout: int = AUDIO_CONFIG["timeout"]) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        在调用方的asyncio事件循环中按到达顺序产出识别结果，不占用线程
+        
+        Args:
+            timeout (int): 等待服务端消息的超时时间(秒)
+        
+        Yields:
+            Tuple[str, bool]: (识别文本, 是否为最终结果)
+        """
+        async for kind, text in self.aiter_events(timeout):
+            if kind != "stable":
+                yield text, kind == "final"
+    
+    def close(self) -> None:
+        """关闭连接"""
+        if self.ws is not None:
+            self.ws.close()
+
+
+def _trim_stream(frames: Iterable[bytes], vad: bool):
+    """为实时音频帧加上静音过滤，返回(SilenceTrimmer或None, 过滤后的帧)"""
+    if not vad:
+        return None, frames
+    from voiceIO.vad import SilenceTrimmer, trim_frames
+    trimmer = SilenceTrimmer(sample_rate=AUDIO_CONFIG["sample_rate"])
+    return trimmer, trim_frames(frames, trimmer)
+
+
+class SpeechRecognizer:
+    """
+    语音识别器类
+    提供完整的语音识别功能，每次识别使用独立的RecognitionSession，可在多个线程中同时调用
+    """
+    
+    def __init__(self, app_id: str, api_key: str, api_secret: str):
+        self.app_id = app_id
+        self.api_key = api_key
+        self.api_secret = api_secret
+    
+    def create_session(self) -> RecognitionSession:
+        """
+        创建新的识别会话
+        
+        Returns:
+            RecognitionSession: 识别会话
+        """
+        return RecognitionSession(
+            WebSocketParams(self.app_id, self.api_key, self.api_secret, "")
+        )
+    
+    def start_file(self, audio_file: str, fast: bool = False,
+                   bucket: Optional[TokenBucket] = None,
+                   vad: bool = AUDIO_CONFIG["vad"]) -> RecognitionSession:
+        """
+        新建会话并开始发送音频文件：默认按实时节奏，快速模式用大帧并由令牌桶限速
+        
+        Args:
+            audio_file (str): 音频文件路径（需已存在）
+            fast (bool): 快速模式
+            bucket (TokenBucket): 快速模式的上传限速器，为None时新建
+            vad (bool): 上传前去除首尾静音并缩短长停顿，节省的时长见session.saved_seconds；
+                        整段都是静音时不建立连接，session.done直接以空文本完成
+        
+        识别结果缓存开启时（默认开启，见enable_transcript_cache）先按音频指纹查找，
+        命中时不建立连接，session.done直接以缓存的文本完成，session.cached为True
+        
+        Returns:
+            RecognitionSession: 会话，结果见session.done
+        """
+        if not vad and get_transcript_cache() is None:
+            frame_size = AUDIO_CONFIG["fast_frame_size"] if fast else AUDIO_CONFIG["frame_size"]
+            session = self.create_session()
+            session.start(*self._file_upload(_iter_file_frames(audio_file, frame_size), fast, bucket))
+            return session
+        
+        with open(audio_file, "rb") as f:
+            return self.start_pcm(f.read(), fast, bucket, vad)
+    
+    def start_pcm(self, pcm: bytes, fast: bool = False,
+                  bucket: Optional[TokenBucket] = None,
+                  vad: bool = AUDIO_CONFIG["vad"]) -> RecognitionSession:
+        """
+        新建会话并开始发送内存中的音频，参数和缓存行为与start_file相同
+        
+        Args:
+            pcm (bytes): s16le 16kHz 单声道PCM
+        
+        Returns:
+            RecognitionSession: 会话，结果见session.done
+        """
+        session = self.create_session()
+        frame_size = AUDIO_CONFIG["fast_frame_size"] if fast else AUDIO_CONFIG["frame_size"]
+        cache = get_transcript_cache()
+        if cache is not None:
+            key = audio_fingerprint(pcm, {"iat": session.ws_param.iat_params, "vad": vad})
+            text = cache.get(key)
+            if text is not None:
+                session.cached = True
+                session.recognition_complete = True
+                settle(session.done, text)
+                return session
+            # 只缓存服务端正常返回的最终结果
+            seconds = len(pcm) / AUDIO_CONFIG["bytes_per_second"]
+            def store(done: Future) -> None:
+                if not done.cancelled() and done.exception() is None:
+                    cache.put(key, done.result(), seconds)
+            session.done.add_done_callback(store)
+        
+        if vad:
+            from voiceIO.vad import trim_silence
+            pcm, session.saved_seconds = trim_silence(pcm, AUDIO_CONFIG["sample_rate"])
+            if not pcm:
+                session.recognition_complete = True
+                settle(session.done, "")
+                return session
+        session.start(*self._file_upload(_iter_pcm_frames(pcm, frame_size), fast, bucket))
+        return session
+    
+    def _file_upload(self, frames: Iterator[bytes], fast: bool,
+                     bucket: Optional[TokenBucket]) -> Tuple[Iterator[bytes], float, bool, Optional[TokenBucket]]:
+        """已录制音频的start()参数：默认按实时节奏，快速模式由令牌桶限速"""
+        if fast:
+            return frames, 0, False, bucket or create_upload_bucket()
+        return frames, AUDIO_CONFIG["interval"], False, None
+    
+    def recognize_audio(self, audio_file: str, timeout: int = AUDIO_CONFIG["timeout"],
+                        fast: bool = False, bucket: Optional[TokenBucket] = None,
+                        vad: bool = AUDIO_CONFIG["vad"]) -> str:
         """
         识别音频文件
         
         Args:
             audio_file (str): 音频文件路径
             timeout (int): 超时时间(秒)
+            fast (bool): 快速模式，不按实时节奏上传，适合已录制好的文件
+            bucket (TokenBucket): 快速模式的上传限速器，可在多次识别间共享以限制总速率；
+                                  为None时每次新建（见create_upload_bucket）
+            vad (bool): 上传前去除静音
         
         Returns:
             str: 识别结果文本
         """
-        self._reset_state()
-        
         # 检查音频文件
         if not os.path.exists(audio_file):
             return f"音频文件不存在: {audio_file}"
         
+        session = None
         try:
-            # 创建WebSocket连接
-            ws_param = WebSocketParams(self.app_id, self.api_key, self.api_secret, audio_file)
-            websocket.enableTrace(False)
-            ws_url = ws_param.create_url()
-            
-            ws = websocket.WebSocketApp(
-                ws_url,
-                on_message=self._on_message,
-                on_error=self._on_error,
-                on_close=self._on_close
-            )
-            ws.on_open = lambda ws: self._on_open(ws, audio_file)
-            
-            # 启动WebSocket连接
-            ws_thread = threading.Thread(
-                target=lambda: ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE}),
-                daemon=True
-            )
-            ws_thread.start()
-            
-            # 等待识别完成
-            start_time = time.time()
-            while not self.recognition_complete and not self.error_occurred:
-                if time.time() - start_time > timeout:
-                    ws.close()
-                    return "识别超时"
-                time.sleep(0.1)
-            
-            return self.error_message if self.error_occurred else self.final_result
-            
+            # 启动WebSocket连接并发送音频，最终结果到达时立即返回
+            session = self.start_file(audio_file, fast, bucket, vad)
+            if session.saved_seconds:
+                print(f"已去除静音 {session.saved_seconds:.1f} 秒")
+            return session.done.result(timeout)
+        except FutureTimeoutError:
+            session.close()
+            return "识别超时"
+        except ConnectionError as e:
+            return str(e)
         except Exception as e:
             return f"识别失败: {e}"
+    
+    async def recognize_async(self, audio_file: str, timeout: int = AUDIO_CONFIG["timeout"],
+                              fast: bool = False, bucket: Optional[TokenBucket] = None,
+                              vad: bool = AUDIO_CONFIG["vad"]) -> str:
+        """
+        异步识别音频文件，等待期间不占用调用方事件循环的线程
+        
+        Args:
+            audio_file (str): 音频文件路径
+            timeout (int): 超时时间(秒)
+            fast (bool): 快速模式，不按实时节奏上传
+            bucket (TokenBucket): 快速模式的上传限速器
+            vad (bool): 上传前去除静音
+        
+        Returns:
+            str: 识别结果文本，出错时为错误信息（与recognize_audio相同）
+        """
+        if not os.path.exists(audio_file):
+            return f"音频文件不存在: {audio_file}"
+        
+        session = None
+        try:
+            session = self.start_file(audio_file, fast, bucket, vad)
+            return await await_future(session.done, timeout)
+        except asyncio.TimeoutError:
+            session.close()
+            return "识别超时"
+        except ConnectionError as e:
+            return str(e)
+        except Exception as e:
+            return f"识别失败: {e}"
+    
+    def recognize_stream(self, frames: Iterable[bytes],
+                         timeout: int = AUDIO_CONFIG["timeout"],
+                         session: Optional[RecognitionSession] = None,
+                         events: bool = False,
+                         vad: bool = AUDIO_CONFIG["stream_vad"]) -> Iterator[Tuple[Any, Any]]:
+        """
+        流式识别：边采集边发送音频帧，实时产出中间结果
+        
+        frames按采集节奏产出（如voiceIO.record.stream_audio），因此发送端不再额外限速；
+        frames耗尽后立即发送结束帧，服务端返回最终结果。
+        
+        Args:
+            frames (Iterable[bytes]): 音频帧迭代器
+            timeout (int): 等待服务端消息的超时时间(秒)
+            session (RecognitionSession): 已通过connect()预先连接的会话，为None时新建
+            events (bool): 为True时改为产出(事件类型, 文本)，含稳定前缀事件（见RecognitionSession.iter_events）
+            vad (bool): 跳过静音帧，只上传说话部分（说话开始时多约60ms延迟），静音期间每秒
+                        仍发送一帧静音，避免服务端因长时间无数据断开；默认关闭，
+                        结束后节省的时长见session.saved_seconds
+        
+        Yields:
+            Tuple[str, bool]: (识别文本, 是否为最终结果)
+        """
+        if session is None or not session.is_open:
+            if session is not None:
+                session.close()
+            session = self.create_session()
+        trimmer, frames = _trim_stream(frames, vad)
+        try:
+            session.start(frames)
+            if events:
+                yield from session.iter_events(timeout)
+            else:
+                yield from session.iter_results(timeout)
+        finally:
+            session.close()
+            if trimmer is not None:
+                session.saved_seconds = trimmer.saved_seconds
+            if hasattr(frames, "close"):
+                try:
+                    frames.close()
+                except ValueError:
+                    # 发送任务仍在迭代中：会话已关闭，发送任务在读到下一帧后停止并关闭frames
+                    pass
+    
+    async def recognize_stream_async(self, frames: Iterable[bytes],
+                                     timeout: int = AUDIO_CONFIG["timeout"],
+                                     session: Optional[RecognitionSession] = None,
+                                     events: bool = False,
+                                     vad: bool = AUDIO_CONFIG["stream_vad"]) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        异步流式识别，参数与recognize_stream相同；frames在共享读写线程池中迭代，
+        识别结果直接投递到调用方的事件循环
+        
+        Yields:
+            Tuple[str, bool]: (识别文本, 是否为最终结果)
+        """
+        if session is None or not session.is_open:
+            if session is not None:
+                session.close()
+            session = self.create_session()
+        trimmer, frames = _trim_stream(frames, vad)
+        try:
+            session.start(frames)
+            results = session.aiter_events(timeout) if events else session.aiter_results(timeout)
+            async for item in results:
+                yield item
+        finally:
+            session.close()
+            if trimmer is not None:
+                session.saved_seconds = trimmer.saved_seconds
+            if hasattr(frames, "close"):
+                try:
+                    frames.close()
+                except ValueError:
+                    # 发送任务仍在迭代中：会话已关闭，发送任务在读到下一帧后停止并关闭frames
+                    pass
+
+
+def get_transcript_cache() -> Optional[TranscriptCache]:
+    """
+    获取识别结果缓存
+    
+    Returns:
+        Optional[TranscriptCache]: 缓存实例，已关闭时返回None
+    """
+    global _transcript_cache
+    if _transcript_cache is None and _transcript_cache_enabled:
+        with _transcript_cache_lock:
+            if _transcript_cache is None and _transcript_cache_enabled:
+                _transcript_cache = TranscriptCache(
+                    ASR_CACHE_CONFIG["max_entries"], ASR_CACHE_CONFIG["path"] or None
+                )
+    return _transcript_cache
+
+
+def enable_transcript_cache(max_entries: int = ASR_CACHE_CONFIG["max_entries"],
+                            path: Optional[str] = ASR_CACHE_CONFIG["path"]) -> TranscriptCache:
+    """
+    开启（或以新配置重建）识别结果缓存
+    
+    Args:
+        max_entries (int): 最大缓存条目数
+        path (str): 持久化文件路径，为None时仅保存在内存中
+    
+    Returns:
+        TranscriptCache: 缓存实例，可用于查看命中统计
+    """
+    global _transcript_cache, _transcript_cache_enabled
+    with _transcript_cache_lock:
+        if _transcript_cache is not None and _transcript_cache.path:
+            _transcript_cache.save()
+        _transcript_cache = TranscriptCache(max_entries, path)
+        _transcript_cache_enabled = True
+    return _transcript_cache
+
+
+def disable_transcript_cache() -> None:
+    """关闭识别结果缓存，已有条目保存到持久化文件"""
+    global _transcript_cache, _transcript_cache_enabled
+    with _transcript_cache_lock:
+        if _transcript_cache is not None and _transcript_cache.path:
+            _transcript_cache.save()
+        _transcript_cache = None
+        _transcript_cache_enabled = False
+
+
+def create_recognizer(app_id: str = None, api_secret: str = None,
+                       api_key: str = None) -> SpeechRecognizer:
+    """
+    创建识别器，未指定的配置从环境变量获取
+    
+    Returns:
+        SpeechRecognizer: 识别器
+    """
+    if not app_id:
+        app_id = os.environ.get('s2t_appid', '15a90977')
+    if not api_secret:
+        api_secret = os.environ.get('s2t_api_secret', 'MmVjMzA4NDExYTgxMzAzYjUxYzFjMDM5')
+    if not api_key:
+        api_key = os.environ.get('s2t_api_key', '64acce84dee079661249e08083636471')
+    
+    return SpeechRecognizer(app_id, api_key, api_secret)
 
 
 def recognize_speech(audio_file: str, 
                     app_id: str = None,
                     api_secret: str = None, 
                     api_key: str = None,
-                    timeout: int = AUDIO_CONFIG["timeout"]) -> str:
+                    timeout: int = AUDIO_CONFIG["timeout"],
+                    fast: bool = False,
+                    vad: bool = AUDIO_CONFIG["vad"]) -> str:
     """
     语音识别便捷函数
     
@@ -301,20 +853,78 @@ def recognize_speech(audio_file: str,
         api_secret (str): API密钥，为None时从环境变量获取
         api_key (str): API Key，为None时从环境变量获取
         timeout (int): 超时时间(秒)
+        fast (bool): 快速模式，已录制好的文件不按实时节奏上传
+        vad (bool): 上传前去除静音
     
     Returns:
         str: 识别结果
     """
-    # 从环境变量获取配置
-    if not app_id:
-        app_id = os.environ.get('s2t_appid', '15a90977')
-    if not api_secret:
-        api_secret = os.environ.get('s2t_api_secret', 'MmVjMzA4NDExYTgxMzAzYjUxYzFjMDM5')
-    if not api_key:
-        api_key = os.environ.get('s2t_api_key', '64acce84dee079661249e08083636471')
+    recognizer = create_recognizer(app_id, api_secret, api_key)
+    return recognizer.recognize_audio(audio_file, timeout, fast, vad=vad)
+
+
+def recognize_speech_stream(frames: Iterable[bytes],
+                            app_id: str = None,
+                            api_secret: str = None,
+                            api_key: str = None,
+                            timeout: int = AUDIO_CONFIG["timeout"],
+                            session: Optional[RecognitionSession] = None,
+                            events: bool = False,
+                            vad: bool = AUDIO_CONFIG["stream_vad"]) -> Iterator[Tuple[Any, Any]]:
+    """
+    流式语音识别便捷函数
+    
+    Args:
+        frames (Iterable[bytes]): 音频帧迭代器，如voiceIO.record.stream_audio()
+        app_id (str): 应用ID，为None时从环境变量获取
+        api_secret (str): API密钥，为None时从环境变量获取
+        api_key (str): API Key，为None时从环境变量获取
+        timeout (int): 等待服务端消息的超时时间(秒)
+        session (RecognitionSession): 预先连接的会话，已断开时自动新建
+        events (bool): 为True时产出(事件类型, 文本)，含稳定前缀事件
+        vad (bool): 跳过静音帧（默认关闭，见recognize_stream）
+    
+    Yields:
+        Tuple[str, bool]: (识别文本, 是否为最终结果)
+    """
+    recognizer = create_recognizer(app_id, api_secret, api_key)
+    yield from recognizer.recognize_stream(frames, timeout, session, events, vad)
+
+
+async def recognize_speech_async(audio_file: str,
+                                 app_id: str = None,
+                                 api_secret: str = None,
+                                 api_key: str = None,
+                                 timeout: int = AUDIO_CONFIG["timeout"],
+                                 fast: bool = False,
+                                 vad: bool = AUDIO_CONFIG["vad"]) -> str:
+    """
+    异步语音识别便捷函数，参数与recognize_speech相同
     
-    recognizer = SpeechRecognizer(app_id, api_key, api_secret)
-    return recognizer.recognize_audio(audio_file, timeout)
+    Returns:
+        str: 识别结果
+    """
+    recognizer = create_recognizer(app_id, api_secret, api_key)
+    return await recognizer.recognize_async(audio_file, timeout, fast, vad=vad)
+
+
+async def recognize_speech_stream_async(frames: Iterable[bytes],
+                                        app_id: str = None,
+                                        api_secret: str = None,
+                                        api_key: str = None,
+                                        timeout: int = AUDIO_CONFIG["timeout"],
+                                        session: Optional[RecognitionSession] = None,
+                                        events: bool = False,
+                                        vad: bool = AUDIO_CONFIG["stream_vad"]) -> AsyncIterator[Tuple[Any, Any]]:
+    """
+    异步流式语音识别便捷函数，参数与recognize_speech_stream相同
+    
+    Yields:
+        Tuple[str, bool]: (识别文本, 是否为最终结果)
+    """
+    recognizer = create_recognizer(app_id, api_secret, api_key)
+    async for item in recognizer.recognize_stream_async(frames, timeout, session, events, vad):
+        yield item
 
 
 if __name__ == "__main__":
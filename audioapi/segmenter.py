@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS文本分段模块
+决定流式文本何时、在何处切分后发送给合成服务，支持中英文标点与子句边界
+"""
+
+import time
+from typing import Optional, List, Callable, Dict, Any
+
+# 分段配置常量
+SEGMENT_CONFIG = {
+    "first_min_chars": 4,      # 首段最少字符数，达到后遇到第一个子句边界即发送
+    "min_chars": 12,           # 后续段最少字符数
+    "target_chars": 60,        # 后续段超过该长度且无句末标点时，在子句边界发送
+    "max_chars": 200,          # 强制发送上限，在词边界切分
+    "first_max_wait": 0.4,     # 首段最长等待时间(秒)
+    "max_wait": 1.0,           # 后续段最长等待时间(秒)
+    "send_interval": 1.0,      # IntervalSegmenter: 发送间隔(秒)
+    "max_buffer_size": 500     # IntervalSegmenter: 最大缓冲区大小
+}
+
+# 句末标点（语调完整）
+SENTENCE_END = set("。！？；….!?;\n")
+# 子句标点（可停顿）
+CLAUSE_END = set("，、：,:")
+# 紧随标点之后、应归入前一段的闭合符号
+CLOSING = set("”’)）」』】》]")
+# 英文中可能不是边界的标点，需结合后一字符判断
+_AMBIGUOUS = set(".,:;!?")
+
+
+def _is_word_char(ch: str) -> bool:
+    """是否为英文单词/数字的组成字符"""
+    return ch.isascii() and (ch.isalnum() or ch in "_'-")
+
+
+class TextSegmenter:
+    """
+    分段策略基类
+
+    调用约定：feed()送入新文本并返回可立即发送的段；time_to_flush()给出下一次需要
+    调用poll()的剩余时间；finish()返回剩余全部文本。每次发送决策都会生成一个追踪事件，
+    保存在trace中并回调on_event。
+    """
+
+    def __init__(self, on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.buffer = ""
+        self.on_event = on_event
+        self.trace: List[Dict[str, Any]] = []
+        self.segment_count = 0
+        self._first_text_time = None
+        self._pending_since = None
+
+    def feed(self, text: str) -> List[str]:
+        """
+        送入文本块
+
+        Args:
+            text (str): 文本块
+
+        Returns:
+            List[str]: 可立即发送的文本段
+        """
+        now = time.monotonic()
+        if self._first_text_time is None:
+            self._first_text_time = now
+        if self._pending_since is None:
+            self._pending_since = now
+        self.buffer += text
+        return self._collect(now, timed_out=False)
+
+    def poll(self) -> List[str]:
+        """
+        time_to_flush()到期后调用，返回因等待超时而应发送的文本段
+        """
+        now = time.monotonic()
+        wait = self.time_to_flush()
+        if wait is None or wait > 0:
+            return []
+        return self._collect(now, timed_out=True)
+
+    def finish(self) -> str:
+        """
+        取出剩余全部文本
+
+        Returns:
+            str: 剩余文本（可能为空）
+        """
+        rest, self.buffer = self.buffer, ""
+        if rest.strip():
+            self._emit("finish", rest, time.monotonic())
+        self._pending_since = None
+        return rest
+
+    def time_to_flush(self) -> Optional[float]:
+        """
+        距下次需要调用poll()的剩余时间(秒)，没有待发送文本时返回None
+        """
+        if not self.buffer.strip():
+            return None
+        elapsed = time.monotonic() - self._pending_since
+        return max(0.0, self._max_wait() - elapsed)
+
+    @property
+    def first_flush_delay(self) -> Optional[float]:
+        """从收到首个文本到首段发出的时间(秒)，用于衡量首包音频延迟"""
+        return self.trace[0]["since_first_text"] if self.trace else None
+
+    def _max_wait(self) -> float:
+        raise NotImplementedError
+
+    def _find_cut(self, timed_out: bool):
+        """
+        返回(切分位置, 原因)，位置为0表示暂不发送
+        """
+        raise NotImplementedError
+
+    def _collect(self, now: float, timed_out: bool) -> List[str]:
+        segments = []
+        while True:
+            cut, reason = self._find_cut(timed_out)
+            if cut <= 0:
+                break
+            segment, self.buffer = self.buffer[:cut], self.buffer[cut:]
+            if segment.strip():
+                segments.append(segment)
+                self._emit(reason, segment, now)
+            timed_out = False
+        self._pending_since = now if self.buffer.strip() else None
+        return segments
+
+    def _emit(self, reason: str, segment: str, now: float) -> None:
+        event = {
+            "event": "flush",
+            "reason": reason,
+            "index": self.segment_count,
+            "chars": len(segment),
+            "since_first_text": now - self._first_text_time,
+            "waited": now - self._pending_since if self._pending_since else 0.0,
+            "time": now
+        }
+        self.segment_count += 1
+        self.trace.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+class IntervalSegmenter(TextSegmenter):
+    """
+    按固定间隔发送的旧策略：距上次发送超过send_interval或超过max_buffer_size时整体发送
+    """
+
+    def __init__(self, send_interval: float = SEGMENT_CONFIG["send_interval"],
+                 max_buffer_size: int = SEGMENT_CONFIG["max_buffer_size"],
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        super().__init__(on_event)
+        self.send_interval = send_interval
+        self.max_buffer_size = max_buffer_size
+        self._last_send_time = time.monotonic()
+
+    def time_to_flush(self) -> Optional[float]:
+        if not self.buffer.strip():
+            return None
+        elapsed = time.monotonic() - self._last_send_time
+        return max(0.0, self.send_interval - elapsed)
+
+    def _max_wait(self) -> float:
+        return self.send_interval
+
+    def _find_cut(self, timed_out: bool):
+        if not self.buffer.strip():
+            return 0, None
+        if len(self.buffer) > self.max_buffer_size:
+            self._last_send_time = time.monotonic()
+            return len(self.buffer), "max_chars"
+        if time.monotonic() - self._last_send_time >= self.send_interval:
+            self._last_send_time = time.monotonic()
+            return len(self.buffer), "interval"
+        return 0, None
+
+
+class ProsodySegmenter(TextSegmenter):
+    """
+    韵律感知的增量分段器
+
+    首段在第一个子句边界立即发送以降低首包音频延迟；之后在句末标点处发送较长的完整单元，
+    过长时退回到子句边界；强制切分和超时切分都不会切断英文单词或数字。
+    """
+
+    def __init__(self, first_min_chars: int = SEGMENT_CONFIG["first_min_chars"],
+                 min_chars: int = SEGMENT_CONFIG["min_chars"],
+                 target_chars: int = SEGMENT_CONFIG["target_chars"],
+                 max_chars: int = SEGMENT_CONFIG["max_chars"],
+                 first_max_wait: float = SEGMENT_CONFIG["first_max_wait"],
+                 max_wait: float = SEGMENT_CONFIG["max_wait"],
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        super().__init__(on_event)
+        self.first_min_chars = first_min_chars
+        self.min_chars = min_chars
+        self.target_chars = target_chars
+        self.max_chars = max_chars
+        self.first_max_wait = first_max_wait
+        self.max_wait = max_wait
+
+    def _max_wait(self) -> float:
+        return self.first_max_wait if self.segment_count == 0 else self.max_wait
+
+    def _boundaries(self):
+        """
+        扫描缓冲区，返回[(切分位置, 是否句末)]，位置为标点及其后闭合符号、空白之后
+        """
+        buf = self.buffer
+        n = len(buf)
+        result = []
+        i = 0
+        while i < n:
+            ch = buf[i]
+            if ch in SENTENCE_END or ch in CLAUSE_END:
+                if ch in _AMBIGUOUS:
+                    # 缓冲区末尾的英文标点无法判断（可能是3.14或server.jar），等待后续文本
+                    if i + 1 >= n:
+                        break
+                    nxt = buf[i + 1]
+                    if _is_word_char(nxt) or (ch == "." and nxt == "."):
+                        i += 1
+                        continue
+                j = i + 1
+                while j < n and (buf[j] in CLOSING or buf[j] in SENTENCE_END):
+                    j += 1
+                while j < n and buf[j].isspace() and buf[j] != "\n":
+                    j += 1
+                is_end = any(c in SENTENCE_END for c in buf[i:j])
+                result.append((j, is_end))
+                i = j
+                continue
+            i += 1
+        return result
+
+    def _word_safe_cut(self) -> int:
+        """不切断末尾英文单词的切分位置，整段都是一个未结束的单词时返回0"""
+        buf = self.buffer
+        i = len(buf)
+        while i > 0 and _is_word_char(buf[i - 1]):
+            i -= 1
+        return i
+
+    def _find_cut(self, timed_out: bool):
+        if not self.buffer.strip():
+            return 0, None
+
+        boundaries = self._boundaries()
+
+        if self.segment_count == 0:
+            # 首段：第一个足够长的子句边界
+            for pos, _ in boundaries:
+                if pos >= self.first_min_chars:
+                    return pos, "first_clause"
+        else:
+            sentence = max((pos for pos, is_end in boundaries if is_end), default=0)
+            if sentence >= self.min_chars:
+                return sentence, "sentence"
+            if len(self.buffer) >= self.target_chars:
+                clause = max((pos for pos, _ in boundaries), default=0)
+                if clause >= self.min_chars:
+                    return clause, "clause"
+
+        if len(self.buffer) >= self.max_chars:
+            # 只有超长时才会在单词中间硬切
+            return (self._word_safe_cut() or len(self.buffer)), "max_chars"
+
+        if timed_out:
+            # 没有边界且缓冲区只有一个未结束的单词时继续等待（如"M"之后还有"inecraft"）
+            last = max((pos for pos, _ in boundaries), default=0)
+            return (last or self._word_safe_cut()), "timeout"
+
+        return 0, None
+
+
+def create_default_segmenter(on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> TextSegmenter:
+    """
+    创建默认分段器
+
+    Args:
+        on_event (Callable): 发送决策追踪回调
+
+    Returns:
+        TextSegmenter: 分段器实例
+    """
+    return ProsodySegmenter(on_event=on_event)
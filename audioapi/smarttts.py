@@ -5,22 +5,21 @@
 支持流式文本输入和高质量语音合成
 """
 
-import websocket
-import datetime
-import hashlib
-import base64
-import hmac
-import json
 import time
-import ssl
 import threading
-import queue
+import asyncio
 import os
-from urllib.parse import urlencode
-from wsgiref.handlers import format_date_time
-from datetime import datetime
-from time import mktime
-from typing import Optional, Dict, Any
+import sys
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, List
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.segmenter import TextSegmenter, create_default_segmenter
+from audioapi.transport import Connection, TRANSPORT_CONFIG
+from audioapi.engine import get_engine, settle, await_future
+from audioapi.codec import TextPacketEncoder, decode_audio_message
 
 # 尝试加载环境变量
 try:
@@ -39,30 +38,43 @@ TTS_CONFIG = {
     "channels": 1,                   # 声道数
     "bit_depth": 16,                 # 位深
     "encoding": "raw",               # 编码格式
-    "buffer_timeout": 5.0,           # 缓冲区超时
-    "send_interval": 1.0,            # 发送间隔
-    "max_buffer_size": 500           # 最大缓冲区大小
+    "async_queue_size": 64,          # 异步接口待发送文本块上限（背压）
+    "finish_timeout": 30,            # 发送结束帧后等待全部音频的超时时间(秒)
+    "connect_timeout": TRANSPORT_CONFIG["connect_timeout"],  # 建立连接的超时时间(秒)
+    "standby_sessions": 1,           # 热备连接池保持的预连接数
+    "standby_max_idle": 8.0,         # 预连接空闲超过该时间(秒)即替换，需小于服务端空闲超时
+    "standby_retry": 2.0             # 预连接失败后的重试间隔(秒)
 }
 
-# 全局状态管理
+# 流式合成服务地址
+TTS_URL = 'wss://cbm01.cn-huabei-1.xf-yun.com/v1/private/mcd9m97e6'
+
 class TTSState:
-    """TTS状态管理类"""
+    """TTS会话状态，每个StreamingSynthesizer持有一份"""
     def __init__(self):
         self.reset()
     
     def reset(self):
-        self.text_queue = queue.Queue()
-        self.audio_buffer = queue.Queue()
         self.ws_closed = False
         self.ws_error = False
         self.ws_instance = None
         self.ws_param = None
         self.current_filepath = None
-        self.audio_writer_thread = None
+        self.audio_file = None
+        self.audio_output = None        # 按序写出音频的任务队列（共享读写线程池）
+        self.audio_ended = False
+        self.audio_lock = threading.Lock()
+        self.audio_done = Future()      # 音频全部写出，结果为合成和写出是否都成功
         self.audio_writing_finished = False
+        self.audio_sink = None
+        self.jitter = None              # 按序列号排序音频帧的抖动缓冲（voiceIO.jitter）
+        self.flush_timer = None         # 分段器下次到期的定时器
+        self.seq = 0
 
-# 全局状态实例
-_tts_state = TTSState()
+    def close_sink(self):
+        """结束音频输出通道，通知播放端数据已写完"""
+        if self.audio_sink is not None:
+            self.audio_sink.close()
 
 
 class WebSocketParams:
@@ -94,337 +106,706 @@ class WebSocketParams:
                 }
             }
         }
+        
+        # 文本帧模板，发送时只填入状态、序列号和文本
+        self.encoder = TextPacketEncoder(self.common_args, self.business_args)
+
+
+class StreamingSynthesizer:
+    """
+    流式语音合成会话
+    每个实例拥有独立的连接、队列、序列号和音频输出，同一进程中可并行运行多个实例
+    """
+    
+    def __init__(self, app_id: str, api_secret: str, api_key: str,
+                 filepath: Optional[str] = './demo.raw', audio_sink=None,
+                 segmenter: Optional[TextSegmenter] = None):
+        """
+        Args:
+            app_id (str): 应用ID
+            api_secret (str): API密钥
+            api_key (str): API密钥
+            filepath (str): 输出音频文件路径，为None时不写文件
+            audio_sink: 音频输出通道（如voiceIO.ringbuffer.AudioRingBuffer），
+                        需提供write(bytes)和close()，解码后的PCM数据直接写入其中
+            segmenter (TextSegmenter): 文本分段策略，为None时使用默认的韵律分段器；
+                                       其trace记录了每次发送决策
+        """
+        self.app_id = app_id
+        self.api_secret = api_secret
+        self.api_key = api_key
+        self.state = TTSState()
+        self.state.current_filepath = filepath
+        self.state.audio_sink = audio_sink
+        self.segmenter = segmenter or create_default_segmenter()
     
-    def create_data_frame(self, text: str, status: int, seq: int) -> Dict[str, Any]:
+    def _write_audio(self, seq: Optional[int], audio_data: bytes) -> None:
+        """
+        收到一帧音频（读写线程池中按序执行）：经抖动缓冲按序列号排序、修补缺帧，
+        写入播放缓冲区可能阻塞，不能放在事件循环中
+        """
+        state = self.state
+        if state.jitter is None:
+            from voiceIO.jitter import JitterBuffer
+            # 只写文件时不需要缓存起播，只做排序和缺帧修补
+            state.jitter = JitterBuffer(self._emit_audio, TTS_CONFIG["sample_rate"],
+                                        realtime=state.audio_sink is not None)
+        state.jitter.push(seq, audio_data)
+
+    def _emit_audio(self, audio_data: bytes) -> None:
+        """按播放顺序写出音频到输出通道和文件"""
+        state = self.state
+        if state.audio_sink is not None:
+            state.audio_sink.write(audio_data)
+        if state.current_filepath:
+            if state.audio_file is None:
+                state.audio_file = open(state.current_filepath, 'wb')
+            state.audio_file.write(audio_data)
+    
+    def _close_audio(self) -> None:
+        """
+        结束音频输出（排在所有音频块之后执行）：关闭输出通道和文件，并验证文件
         """
-        创建数据帧
+        state = self.state
+        try:
+            if state.jitter is not None:
+                state.jitter.close()
+            state.close_sink()
+            if state.current_filepath:
+                if state.audio_file is not None:
+                    state.audio_file.close()
+                    file_size = os.path.getsize(state.current_filepath)
+                    print(f"音频文件生成完成: {state.current_filepath} ({file_size} bytes)")
+                else:
+                    print("警告: 音频文件生成失败")
+        except Exception as e:
+            print(f"音频写入错误: {e}")
+        finally:
+            state.audio_writing_finished = True
+            settle(state.audio_done, not state.ws_error
+                   and (state.audio_file is not None or not state.current_filepath))
+    
+    def _end_audio(self) -> None:
+        """音频已全部收到或会话中止，通知输出端（只执行一次）"""
+        state = self.state
+        with state.audio_lock:
+            if state.audio_ended:
+                return
+            state.audio_ended = True
+        if state.audio_output is not None:
+            state.audio_output.submit(self._close_audio)
+        else:
+            self._close_audio()
+    
+    def _on_message(self, conn: Connection, message: str) -> None:
+        """
+        处理WebSocket消息
+        """
+        state = self.state
+        
+        try:
+            # 音频从原始报文中直接切出解码，其余字段单独解析
+            data, audio_data = decode_audio_message(message)
+            code = data["header"]["code"]
+            
+            if code != 0:
+                error_msg = data.get("message", "未知错误")
+                print(f"TTS错误: {error_msg} (code: {code})")
+                state.ws_error = True
+                self._end_audio()
+                return
+            
+            # 处理音频数据
+            payload = data.get("payload")
+            if payload and "audio" in payload:
+                status = payload["audio"]["status"]
+                
+                if audio_data:
+                    state.audio_output.submit(self._write_audio, payload["audio"].get("seq"),
+                                              audio_data)
+                
+                if status == 2:  # 结束状态
+                    self._end_audio()
+                    state.ws_closed = True
+                    conn.close()
+                    
+        except Exception as e:
+            print(f"消息处理错误: {e}")
+            state.ws_error = True
+            self._end_audio()
+    
+    def _on_error(self, conn: Connection, error) -> None:
+        """
+        处理WebSocket错误
+        """
+        print(f"WebSocket错误: {error}")
+        self.state.ws_error = True
+        self._end_audio()
+    
+    def _on_close(self, conn: Connection) -> None:
+        """
+        处理WebSocket关闭
+        """
+        state = self.state
+        state.ws_closed = True
+        if state.flush_timer is not None:
+            state.flush_timer.cancel()
+        self._end_audio()
+    
+    def _feed_text(self, text_chunk: Optional[str]) -> None:
+        """
+        在事件循环中把文本块交给分段器，到点的分段立即发送；text_chunk为None表示结束
+        """
+        state = self.state
+        segmenter = self.segmenter
+        if state.ws_closed or state.ws_error:
+            return
+        
+        try:
+            if text_chunk is None:  # 结束信号
+                if state.flush_timer is not None:
+                    state.flush_timer.cancel()
+                    state.flush_timer = None
+                # 发送剩余文本
+                rest = segmenter.finish()
+                if rest.strip():
+                    self.send_text_frame(rest)
+                
+                # 发送结束帧
+                self.send_text_frame("。", final=True)
+                return
+            
+            for segment in segmenter.feed(text_chunk):
+                self.send_text_frame(segment)
+            self._schedule_flush()
+        except Exception as e:
+            print(f"文本发送错误: {e}")
+            state.ws_error = True
+    
+    def _flush_text(self) -> None:
+        """分段器的截止时间已到，发送到期的分段"""
+        state = self.state
+        state.flush_timer = None
+        if state.ws_closed or state.ws_error:
+            return
+        try:
+            for segment in self.segmenter.poll():
+                self.send_text_frame(segment)
+            self._schedule_flush()
+        except Exception as e:
+            print(f"文本发送错误: {e}")
+            state.ws_error = True
+    
+    def _schedule_flush(self) -> None:
+        """按分段器的截止时间设置定时器，代替发送线程的超时等待"""
+        state = self.state
+        if state.flush_timer is not None:
+            state.flush_timer.cancel()
+            state.flush_timer = None
+        delay = self.segmenter.time_to_flush()
+        if delay is not None:
+            state.flush_timer = get_engine().call_later(delay, self._flush_text)
+    
+    def send_text_frame(self, text: str, final: bool = False) -> None:
+        """
+        立即发送一个文本帧，序列号和帧状态由会话维护
         
         Args:
             text (str): 文本内容
-            status (int): 状态码
-            seq (int): 序列号
+            final (bool): 是否为结束帧
+        """
+        state = self.state
+        status = 2 if final else (0 if state.seq == 0 else 1)
+        
+        state.ws_instance.send(state.ws_param.encoder.encode(text, status, state.seq), text=True)
+        state.seq += 1
+    
+    def connect(self) -> Future:
+        """
+        开始建立WebSocket连接，不等待
         
         Returns:
-            Dict: 数据帧
+            Future: 连接建立结果，已建立为True，最终失败为False
         """
-        return {
-            "text": {
-                "encoding": "utf8",
-                "compress": "raw",
-                "format": "plain",
-                "status": status,
-                "seq": seq,
-                "text": base64.b64encode(text.encode('utf-8')).decode("UTF8")
-            }
-        }
-
-
-def _create_auth_url(request_url: str, method: str = "GET", 
-                    api_key: str = "", api_secret: str = "") -> str:
-    """
-    创建WebSocket认证URL
+        state = self.state
+        
+        # 创建WebSocket参数
+        state.ws_param = WebSocketParams(self.app_id, self.api_key, self.api_secret)
+        
+        # 音频在共享读写线程池中按序写出
+        state.audio_output = get_engine().serial()
+        if state.current_filepath and os.path.exists(state.current_filepath):
+            os.remove(state.current_filepath)
+        
+        # 通过传输层建立连接（签名、超时与重试）
+        state.ws_instance = Connection(
+            "tts", TTS_URL, self.api_key, self.api_secret,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            raw_text=True
+        ).start()
+        return state.ws_instance.opened
+    
+    def _connected(self, opened: bool, verbose: bool) -> bool:
+        """连接建立结果已知（或超时）后的处理"""
+        state = self.state
+        if opened and state.ws_instance.is_open and not state.ws_error:
+            if verbose:
+                print("TTS连接已建立")
+            return True
+        print("TTS连接建立失败")
+        state.ws_instance.close()
+        self._end_audio()
+        return False
     
-    Args:
-        request_url (str): 请求URL
-        method (str): HTTP方法
-        api_key (str): API密钥
-        api_secret (str): API密钥
+    def start(self, use_text_sender: bool = True, verbose: bool = True) -> bool:
+        """
+        建立WebSocket连接
+        
+        Args:
+            use_text_sender (bool): 兼容参数：send()传入的文本由共享事件循环分段发送，
+                                    不再需要启动发送线程；调用方也可通过send_text_frame自行发送
+            verbose (bool): 是否打印连接建立信息，热备连接池后台建连时关闭
+        
+        Returns:
+            bool: 初始化成功返回True
+        """
+        try:
+            opened = self.connect()
+            try:
+                result = opened.result(TTS_CONFIG["connect_timeout"])
+            except FutureTimeoutError:
+                result = False
+            return self._connected(result, verbose)
+        except Exception as e:
+            print(f"TTS初始化错误: {e}")
+            self._end_audio()
+            return False
     
-    Returns:
-        str: 认证后的URL
-    """
-    # 解析URL
-    schema_end = request_url.index("://")
-    host_start = schema_end + 3
-    path_start = request_url.index("/", host_start)
-    
-    host = request_url[host_start:path_start]
-    path = request_url[path_start:]
-    
-    # 生成时间戳
-    now = datetime.now()
-    date = format_date_time(mktime(now.timetuple()))
-    
-    # 构建签名
-    signature_origin = f"host: {host}\ndate: {date}\n{method} {path} HTTP/1.1"
-    signature_sha = hmac.new(
-        api_secret.encode('utf-8'),
-        signature_origin.encode('utf-8'),
-        digestmod=hashlib.sha256
-    ).digest()
-    signature_sha = base64.b64encode(signature_sha).decode('utf-8')
-    
-    # 构建授权
-    authorization_origin = (
-        f'api_key="{api_key}", algorithm="hmac-sha256", '
-        f'headers="host date request-line", signature="{signature_sha}"'
-    )
-    authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode('utf-8')
-    
-    # 构建参数
-    values = {
-        "host": host,
-        "date": date,
-        "authorization": authorization
-    }
-    
-    return f"{request_url}?{urlencode(values)}"
-
-
-def _audio_writer_worker() -> None:
-    """
-    音频写入工作线程
-    处理音频缓冲区中的数据并写入文件
-    """
-    global _tts_state
+    async def start_async(self, verbose: bool = True) -> bool:
+        """
+        异步建立WebSocket连接，等待握手期间不占用调用方事件循环的线程
+        
+        Args:
+            verbose (bool): 是否打印连接建立信息
+        
+        Returns:
+            bool: 初始化成功返回True
+        """
+        try:
+            opened = self.connect()
+            try:
+                result = await await_future(opened, TTS_CONFIG["connect_timeout"])
+            except asyncio.TimeoutError:
+                result = False
+            return self._connected(result, verbose)
+        except Exception as e:
+            print(f"TTS初始化错误: {e}")
+            self._end_audio()
+            return False
     
-    try:
-        # 清理已存在的文件
-        if os.path.exists(_tts_state.current_filepath):
-            os.remove(_tts_state.current_filepath)
+    @property
+    def is_ready(self) -> bool:
+        """连接已建立、尚未发送任何文本且未关闭，可用于新的合成"""
+        state = self.state
+        return (state.ws_instance is not None and state.ws_instance.is_open
+                and state.seq == 0 and not state.ws_closed and not state.ws_error)
+    
+    def attach_sink(self, audio_sink) -> None:
+        """
+        为预先建立的会话指定音频输出通道，需在发送文本前调用
         
-        audio_data_received = False
+        Args:
+            audio_sink: 音频输出通道，需提供write(bytes)和close()
+        """
+        self.state.audio_sink = audio_sink
+    
+    @property
+    def jitter_stats(self) -> Optional[Dict[str, Any]]:
+        """本次合成的抖动缓冲统计（缺帧、迟到帧、欠载次数、缓存时长等），尚未收到音频时为None"""
+        jitter = self.state.jitter
+        return jitter.stats() if jitter is not None else None
+    
+    def send(self, text_chunk: str) -> bool:
+        """
+        发送文本块到TTS服务
         
-        with open(_tts_state.current_filepath, 'ab') as f:
-            while True:
-                try:
-                    # 从缓冲区获取音频数据
-                    audio_data = _tts_state.audio_buffer.get(timeout=TTS_CONFIG["buffer_timeout"])
-                    
-                    if audio_data is None:  # 结束信号
-                        break
-                    
-                    # 写入音频数据
-                    f.write(audio_data)
-                    f.flush()
-                    audio_data_received = True
-                    
-                except queue.Empty:
-                    # 检查是否应该结束
-                    if _tts_state.ws_closed and _tts_state.audio_buffer.empty():
-                        break
-                    continue
-                except Exception as e:
-                    print(f"音频写入错误: {e}")
-                    break
+        Args:
+            text_chunk (str): 文本块内容
         
-        # 验证文件
-        if audio_data_received and os.path.exists(_tts_state.current_filepath):
-            file_size = os.path.getsize(_tts_state.current_filepath)
-            print(f"音频文件生成完成: {_tts_state.current_filepath} ({file_size} bytes)")
-        else:
-            print("警告: 音频文件生成失败")
-            
-    except Exception as e:
-        print(f"音频写入线程错误: {e}")
-    finally:
-        _tts_state.audio_writing_finished = True
-
-
-def _on_message(ws, message: str) -> None:
-    """
-    处理WebSocket消息
-    """
-    global _tts_state
+        Returns:
+            bool: 发送成功返回True
+        """
+        state = self.state
+        
+        if state.ws_closed or state.ws_error:
+            print("TTS连接已关闭，无法发送文本")
+            return False
+        
+        try:
+            if text_chunk and text_chunk.strip():
+                get_engine().call_soon(self._feed_text, text_chunk)
+            return True
+        except Exception as e:
+            print(f"文本发送错误: {e}")
+            return False
     
-    try:
-        data = json.loads(message)
-        code = data["header"]["code"]
+    def finish_future(self) -> Future:
+        """
+        发送剩余文本和结束帧，不等待
         
-        if code != 0:
-            error_msg = data.get("message", "未知错误")
-            print(f"TTS错误: {error_msg} (code: {code})")
-            _tts_state.ws_error = True
-            _tts_state.audio_buffer.put(None)  # 发送结束信号
-            return
+        Returns:
+            Future: 服务端返回全部音频（status 2）且已写出后完成，结果为是否成功；
+                    出错或连接中断时立即以False完成
+        """
+        get_engine().call_soon(self._feed_text, None)
+        return self.state.audio_done
+    
+    def finish(self) -> bool:
+        """
+        结束流式文本转语音
         
-        # 处理音频数据
-        payload = data.get("payload")
-        if payload and "audio" in payload:
-            audio_data = base64.b64decode(payload["audio"]["audio"])
-            status = payload["audio"]["status"]
-            
-            if len(audio_data) > 0:
-                _tts_state.audio_buffer.put(audio_data)
-            
-            if status == 2:  # 结束状态
-                _tts_state.audio_buffer.put(None)
-                _tts_state.ws_closed = True
-                ws.close()
-                
-    except Exception as e:
-        print(f"消息处理错误: {e}")
-        _tts_state.ws_error = True
-        _tts_state.audio_buffer.put(None)
+        Returns:
+            bool: 完成成功返回True
+        """
+        self.finish_future()
+        return self.wait_done()
+    
+    async def finish_async(self) -> bool:
+        """
+        异步结束流式文本转语音
+        
+        Returns:
+            bool: 完成成功返回True
+        """
+        try:
+            return await await_future(self.finish_future(), TTS_CONFIG["finish_timeout"])
+        except asyncio.TimeoutError:
+            print("TTS结束错误: 等待音频超时")
+            return False
+    
+    def wait_done(self) -> bool:
+        """
+        等待服务端返回全部音频并写出
+        
+        Returns:
+            bool: 完成成功返回True
+        """
+        try:
+            return self.state.audio_done.result(TTS_CONFIG["finish_timeout"])
+        except FutureTimeoutError:
+            print("TTS结束错误: 等待音频超时")
+            return False
+    
+    def close(self) -> None:
+        """中止会话并关闭连接"""
+        self.state.ws_error = True
+        self._end_audio()
+        if self.state.ws_instance is not None:
+            self.state.ws_instance.close()
 
 
-def _on_error(ws, error) -> None:
-    """
-    处理WebSocket错误
+class AsyncStreamingSynthesizer:
     """
-    global _tts_state
-    print(f"WebSocket错误: {error}")
-    _tts_state.ws_error = True
+    asyncio流式语音合成接口
 
+    用法:
+        async with AsyncStreamingSynthesizer(app_id, api_secret, api_key) as synth:
+            await synth.send(text)
 
-def _on_close(ws, close_status_code, close_msg) -> None:
+    文本块进入有界asyncio队列，队列满时send()等待（背压）；事件循环中的发送任务按
+    分段策略累积文本，到点立即发出；发帧只是把数据交给共享事件循环，不会阻塞。
+    传入已用start(False)建立连接的synthesizer时直接使用该连接，省去握手时间。
     """
-    处理WebSocket关闭
-    """
-    global _tts_state
-    _tts_state.ws_closed = True
-    if not _tts_state.audio_writing_finished:
-        _tts_state.audio_buffer.put(None)
+    
+    def __init__(self, app_id: str, api_secret: str, api_key: str,
+                 filepath: Optional[str] = None, audio_sink=None,
+                 max_pending: int = TTS_CONFIG["async_queue_size"],
+                 segmenter: Optional[TextSegmenter] = None,
+                 synthesizer: Optional[StreamingSynthesizer] = None):
+        if synthesizer is not None and synthesizer.is_ready:
+            synthesizer.attach_sink(audio_sink)
+            self.synthesizer = synthesizer
+        else:
+            if synthesizer is not None:
+                synthesizer.close()
+            self.synthesizer = StreamingSynthesizer(app_id, api_secret, api_key,
+                                                    filepath, audio_sink, segmenter)
+        self._max_pending = max_pending
+        self._queue = None
+        self._pump_task = None
+    
+    async def __aenter__(self) -> "AsyncStreamingSynthesizer":
+        if not self.synthesizer.is_ready and \
+                not await self.synthesizer.start_async(verbose=False):
+            raise ConnectionError("TTS连接建立失败")
+        
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._pump_task = asyncio.create_task(self._pump())
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            await self.finish()
+        else:
+            self._pump_task.cancel()
+            self.synthesizer.close()
+        return False
+    
+    async def send(self, text: str) -> None:
+        """
+        发送文本块，待发送队列已满时等待
 
+        Args:
+            text (str): 文本块内容
 
-def _on_open(ws) -> None:
-    """
-    处理WebSocket开启，开始文本处理
-    """
-    def text_sender():
-        global _tts_state
-        
-        seq = 0
-        text_buffer = ""
-        last_send_time = time.time()
+        Raises:
+            ConnectionError: 连接已关闭或发送失败时
+        """
+        state = self.synthesizer.state
+        if self._pump_task.done() or state.ws_closed or state.ws_error:
+            raise ConnectionError("TTS连接已关闭，无法发送文本")
+        if text and text.strip():
+            await self._queue.put(text)
+    
+    async def finish(self) -> bool:
+        """
+        发送剩余文本和结束帧，等待全部音频返回
+
+        Returns:
+            bool: 完成成功返回True
+        """
+        if not self._pump_task.done():
+            await self._queue.put(None)
+        try:
+            await self._pump_task
+            return await await_future(self.synthesizer.state.audio_done,
+                                      TTS_CONFIG["finish_timeout"])
+        except asyncio.TimeoutError:
+            print("TTS结束错误: 等待音频超时")
+            return False
+        except Exception as e:
+            print(f"文本发送错误: {e}")
+            return False
+    
+    async def _pump(self) -> None:
+        """事件循环中的文本发送任务"""
+        segmenter = self.synthesizer.segmenter
         
-        while not _tts_state.ws_closed and not _tts_state.ws_error:
-            try:
-                # 获取文本块
+        try:
+            while True:
                 try:
-                    text_chunk = _tts_state.text_queue.get(timeout=0.1)
-                    
+                    text_chunk = await asyncio.wait_for(self._queue.get(),
+                                                        segmenter.time_to_flush())
+                except asyncio.TimeoutError:
+                    segments = segmenter.poll()
+                else:
                     if text_chunk is None:  # 结束信号
-                        # 发送剩余文本
-                        if text_buffer.strip():
-                            _send_text_frame(ws, text_buffer, 0 if seq == 0 else 1, seq)
-                            seq += 1
-                        
-                        # 发送结束帧
-                        _send_text_frame(ws, "。", 2, seq)
-                        break
-                    
-                    text_buffer += text_chunk
-                    
-                except queue.Empty:
-                    pass
+                        rest = segmenter.finish()
+                        if rest.strip():
+                            self.synthesizer.send_text_frame(rest)
+                        self.synthesizer.send_text_frame("。", True)
+                        return
+                    segments = segmenter.feed(text_chunk)
                 
-                # 检查是否需要发送
-                current_time = time.time()
-                should_send = False
-                
-                if text_buffer.strip():
-                    if (current_time - last_send_time >= TTS_CONFIG["send_interval"] or 
-                        len(text_buffer) > TTS_CONFIG["max_buffer_size"]):
-                        should_send = True
-                
-                if should_send:
-                    status = 0 if seq == 0 else 1
-                    _send_text_frame(ws, text_buffer, status, seq)
-                    text_buffer = ""
-                    last_send_time = current_time
-                    seq += 1
-                    
-            except Exception as e:
-                print(f"文本发送错误: {e}")
-                _tts_state.ws_error = True
-                break
-    
-    threading.Thread(target=text_sender, daemon=True).start()
+                for segment in segments:
+                    self.synthesizer.send_text_frame(segment)
+        except Exception:
+            self.synthesizer.state.ws_error = True
+            # 清空队列，唤醒因队列已满而等待的send()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            raise
 
 
-def _send_text_frame(ws, text: str, status: int, seq: int) -> None:
+class SynthesizerPool:
     """
-    发送文本帧
+    热备合成连接池
+
+    后台线程保持size个已完成握手和鉴权的连接，连接空闲接近服务端超时前先建新连接
+    再关闭旧连接；claim()立即取走一个可用连接，使握手不再占用首包音频的时间。
+
+    用法:
+        pool = SynthesizerPool(app_id, api_secret, api_key)
+        ...
+        async with AsyncStreamingSynthesizer(app_id, api_secret, api_key, audio_sink=sink,
+                                             synthesizer=pool.claim()) as synth:
+            ...
+        pool.close()
     """
-    global _tts_state
-    
-    data_frame = _tts_state.ws_param.create_data_frame(text, status, seq)
-    packet = {
-        "header": _tts_state.ws_param.common_args.copy(),
-        "parameter": _tts_state.ws_param.business_args,
-        "payload": data_frame,
-    }
-    packet["header"]["status"] = status
-    
-    ws.send(json.dumps(packet))
+
+    def __init__(self, app_id: str, api_secret: str, api_key: str,
+                 size: int = TTS_CONFIG["standby_sessions"],
+                 max_idle: float = TTS_CONFIG["standby_max_idle"]):
+        """
+        Args:
+            app_id (str): 应用ID
+            api_secret (str): API密钥
+            api_key (str): API密钥
+            size (int): 保持的预连接数
+            max_idle (float): 预连接的最长空闲时间(秒)
+        """
+        self.app_id = app_id
+        self.api_secret = api_secret
+        self.api_key = api_key
+        self.size = size
+        self.max_idle = max_idle
+
+        self._ready = deque()  # (连接, 建立时间)
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # 统计
+        self.warm_claims = 0
+        self.cold_claims = 0
+        self.refreshed = 0
+        self.failures = 0
+
+        self._thread = threading.Thread(target=self._maintain, daemon=True)
+        self._thread.start()
+
+    def _open(self) -> Optional[StreamingSynthesizer]:
+        """建立一个不写文件、由调用方自行发送文本帧的连接"""
+        synthesizer = StreamingSynthesizer(self.app_id, self.api_secret, self.api_key, filepath=None)
+        if synthesizer.start(use_text_sender=False, verbose=False):
+            return synthesizer
+        synthesizer.close()
+        return None
+
+    def _maintain(self) -> None:
+        """后台维护线程：补足连接数，替换即将空闲超时或已断开的连接"""
+        while True:
+            stale: List[StreamingSynthesizer] = []
+            with self._cond:
+                if self._closed:
+                    return
+                for item in list(self._ready):
+                    if not item[0].is_ready:
+                        self._ready.remove(item)
+                        stale.append(item[0])
+
+                now = time.monotonic()
+                oldest = self._ready[0] if self._ready else None
+                refresh = oldest is not None and now - oldest[1] >= self.max_idle
+                if len(self._ready) >= self.size and not refresh:
+                    # 睡到最早的连接需要替换时，被取走连接或关闭时提前唤醒
+                    self._cond.wait(oldest[1] + self.max_idle - now if oldest else None)
+                    continue
+
+            for synthesizer in stale:
+                synthesizer.close()
+
+            synthesizer = self._open()
+            with self._cond:
+                if self._closed:
+                    if synthesizer is not None:
+                        synthesizer.close()
+                    return
+                if synthesizer is None:
+                    self.failures += 1
+                    self._cond.wait(TTS_CONFIG["standby_retry"])
+                    continue
+                self._ready.append((synthesizer, time.monotonic()))
+                if refresh and len(self._ready) > self.size:
+                    # 新连接就绪后再关闭旧连接，池中始终有可用连接
+                    old = self._ready.popleft()[0]
+                    self.refreshed += 1
+                else:
+                    old = None
+            if old is not None:
+                old.close()
+
+    def claim(self, audio_sink=None) -> Optional[StreamingSynthesizer]:
+        """
+        取走一个预连接，后台随即补充新的连接
+
+        Args:
+            audio_sink: 音频输出通道，需提供write(bytes)和close()
+
+        Returns:
+            Optional[StreamingSynthesizer]: 已建立连接的会话；暂无可用连接时返回None，
+                                            由调用方自行建立连接
+        """
+        stale = []
+        synthesizer = None
+        with self._cond:
+            while self._ready:
+                candidate = self._ready.popleft()[0]
+                if candidate.is_ready:
+                    synthesizer = candidate
+                    break
+                stale.append(candidate)
+            if synthesizer is not None:
+                self.warm_claims += 1
+            else:
+                self.cold_claims += 1
+            self._cond.notify_all()
+
+        for candidate in stale:
+            candidate.close()
+        if synthesizer is not None and audio_sink is not None:
+            synthesizer.attach_sink(audio_sink)
+        return synthesizer
+
+    def close(self) -> None:
+        """停止维护线程并关闭所有预连接"""
+        with self._cond:
+            self._closed = True
+            ready = [item[0] for item in self._ready]
+            self._ready.clear()
+            self._cond.notify_all()
+        for synthesizer in ready:
+            synthesizer.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        连接池统计
+
+        Returns:
+            Dict[str, int]: 可用连接数、命中/未命中预连接的次数、刷新次数、建连失败次数
+        """
+        return {
+            "ready": len(self._ready),
+            "warm_claims": self.warm_claims,
+            "cold_claims": self.cold_claims,
+            "refreshed": self.refreshed,
+            "failures": self.failures
+        }
+
+
+# 兼容旧函数接口的默认会话
+_default_synthesizer: Optional[StreamingSynthesizer] = None
 
 
 def stream_text_to_speech_init(app_id: str, api_secret: str, api_key: str, 
-                              filepath: str = './demo.raw') -> bool:
+                              filepath: Optional[str] = './demo.raw',
+                              audio_sink=None) -> bool:
     """
-    初始化流式文本转语音连接
+    初始化流式文本转语音连接（兼容接口，使用模块级默认会话）
+    
+    需要并发合成时请直接创建StreamingSynthesizer实例。
     
     Args:
         app_id (str): 应用ID
         api_secret (str): API密钥
         api_key (str): API密钥
-        filepath (str): 输出音频文件路径
+        filepath (str): 输出音频文件路径，为None时不写文件
+        audio_sink: 音频输出通道，需提供write(bytes)和close()
     
     Returns:
         bool: 初始化成功返回True
     """
-    global _tts_state
+    global _default_synthesizer
     
-    # 重置状态
-    _tts_state.reset()
-    _tts_state.current_filepath = filepath
-    
-    try:
-        # 创建WebSocket参数
-        _tts_state.ws_param = WebSocketParams(app_id, api_key, api_secret)
-        
-        # 创建WebSocket URL
-        request_url = 'wss://cbm01.cn-huabei-1.xf-yun.com/v1/private/mcd9m97e6'
-        ws_url = _create_auth_url(request_url, "GET", api_key, api_secret)
-        
-        # 启动音频写入线程
-        _tts_state.audio_writer_thread = threading.Thread(
-            target=_audio_writer_worker, daemon=True
-        )
-        _tts_state.audio_writer_thread.start()
-        
-        # 创建WebSocket连接
-        _tts_state.ws_instance = websocket.WebSocketApp(
-            ws_url,
-            on_message=_on_message,
-            on_error=_on_error,
-            on_close=_on_close,
-            on_open=_on_open
-        )
-        
-        # 启动WebSocket连接
-        ws_thread = threading.Thread(
-            target=lambda: _tts_state.ws_instance.run_forever(
-                sslopt={"cert_reqs": ssl.CERT_NONE}
-            ),
-            daemon=True
-        )
-        ws_thread.start()
-        
-        # 等待连接建立
-        timeout = 10
-        start_time = time.time()
-        while (_tts_state.ws_instance.sock is None and 
-               not _tts_state.ws_error and 
-               (time.time() - start_time) < timeout):
-            time.sleep(0.1)
-        
-        if _tts_state.ws_instance.sock is not None:
-            print("TTS连接已建立")
-            return True
-        else:
-            print("TTS连接建立失败")
-            return False
-            
-    except Exception as e:
-        print(f"TTS初始化错误: {e}")
-        return False
+    _default_synthesizer = StreamingSynthesizer(app_id, api_secret, api_key,
+                                                filepath, audio_sink)
+    return _default_synthesizer.start()
 
 
 def stream_text_to_speech_send(text_chunk: str) -> bool:
     """
-    发送文本块到TTS服务
+    发送文本块到TTS服务（兼容接口）
     
     Args:
         text_chunk (str): 文本块内容
@@ -432,76 +813,181 @@ def stream_text_to_speech_send(text_chunk: str) -> bool:
     Returns:
         bool: 发送成功返回True
     """
-    global _tts_state
-    
-    if _tts_state.ws_closed or _tts_state.ws_error:
-        print("TTS连接已关闭，无法发送文本")
-        return False
-    
-    try:
-        if text_chunk and text_chunk.strip():
-            _tts_state.text_queue.put(text_chunk)
-        return True
-    except Exception as e:
-        print(f"文本发送错误: {e}")
+    if _default_synthesizer is None:
+        print("TTS连接未初始化，无法发送文本")
         return False
+    return _default_synthesizer.send(text_chunk)
 
 
 def stream_text_to_speech_finish() -> bool:
     """
-    结束流式文本转语音
+    结束流式文本转语音（兼容接口）
     
     Returns:
         bool: 完成成功返回True
     """
-    global _tts_state
-    
-    try:
-        # 发送结束信号
-        _tts_state.text_queue.put(None)
-        
-        # 等待处理完成
-        timeout = 30
-        start_time = time.time()
-        while (not _tts_state.ws_closed and 
-               not _tts_state.ws_error and 
-               (time.time() - start_time) < timeout):
-            time.sleep(0.1)
-        
-        # 等待音频写入完成
-        if (_tts_state.audio_writer_thread and 
-            _tts_state.audio_writer_thread.is_alive()):
-            _tts_state.audio_writer_thread.join(timeout=10)
-        
-        return _tts_state.audio_writing_finished
-        
-    except Exception as e:
-        print(f"TTS结束错误: {e}")
+    if _default_synthesizer is None:
         return False
+    return _default_synthesizer.finish()
+
+
+class _FileSink:
+    """把音频写入文件的输出通道"""
+    
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, 'wb')
+    
+    def write(self, data: bytes) -> None:
+        if not self._file.closed:
+            self._file.write(data)
+    
+    def close(self) -> None:
+        self._file.close()
+
+
+class _FanoutSink:
+    """
+    把同一路合成音频分发给多个输出通道，后加入的通道先补发已收到的数据
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks = []
+        self._sinks = []
+        self._closed = False
+    
+    def attach(self, sink) -> None:
+        with self._lock:
+            for chunk in self._chunks:
+                sink.write(chunk)
+            if self._closed:
+                sink.close()
+            else:
+                self._sinks.append(sink)
+    
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self._chunks.append(data)
+            for sink in self._sinks:
+                sink.write(data)
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for sink in self._sinks:
+                sink.close()
+
+
+class _SynthesisFlight:
+    """一次进行中的一次性合成，供相同请求共享"""
+    
+    def __init__(self):
+        self.fanout = _FanoutSink()
+        self.done = Future()  # 结果为是否合成成功
+
+
+# 进行中的一次性合成，键为(应用ID, 发音人参数, 文本)
+_synthesis_flights: Dict[Any, _SynthesisFlight] = {}
+_synthesis_flights_lock = threading.Lock()
+
+
+def _join_flight(text: str, app_id: str, filepath: Optional[str], audio_sink):
+    """
+    加入相同请求进行中的一次性合成，没有时新建
+
+    Returns:
+        Tuple: (合成键, 合成, 是否由本调用方执行合成)
+    """
+    key = (app_id, TTS_CONFIG["voice"], TTS_CONFIG["volume"], TTS_CONFIG["speed"],
+           TTS_CONFIG["pitch"], TTS_CONFIG["sample_rate"], text)
+    
+    with _synthesis_flights_lock:
+        flight = _synthesis_flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _SynthesisFlight()
+            _synthesis_flights[key] = flight
+        if filepath:
+            flight.fanout.attach(_FileSink(filepath))
+        if audio_sink is not None:
+            flight.fanout.attach(audio_sink)
+    return key, flight, leader
+
+
+def _end_flight(key, flight: _SynthesisFlight, success: bool) -> None:
+    """结束一次性合成并通知共享该合成的调用方"""
+    with _synthesis_flights_lock:
+        del _synthesis_flights[key]
+    flight.fanout.close()
+    settle(flight.done, success)
 
 
 def text_to_speech(text: str, app_id: str, api_secret: str, api_key: str, 
-                  filepath: str = './demo.raw') -> bool:
+                  filepath: Optional[str] = './demo.raw', audio_sink=None) -> bool:
     """
     一次性文本转语音函数
     
+    相同文本和发音参数的并发请求只建立一个合成会话，音频分发给每个调用方的输出。
+    
     Args:
         text (str): 要转换的文本
         app_id (str): 应用ID
         api_secret (str): API密钥
         api_key (str): API密钥
-        filepath (str): 输出音频文件路径
+        filepath (str): 输出音频文件路径，为None时不写文件
+        audio_sink: 额外的音频输出通道，需提供write(bytes)和close()
     
     Returns:
         bool: 转换成功返回True
     """
-    if not stream_text_to_speech_init(app_id, api_secret, api_key, filepath):
-        return False
+    key, flight, leader = _join_flight(text, app_id, filepath, audio_sink)
+    if not leader:
+        return flight.done.result()
     
-    if not stream_text_to_speech_send(text):
-        return False
+    success = False
+    synthesizer = StreamingSynthesizer(app_id, api_secret, api_key, None, flight.fanout)
+    try:
+        success = synthesizer.start() and synthesizer.send(text) and synthesizer.finish()
+    finally:
+        # 发送失败、等待超时或异常时中止会话，避免连接一直留在共享事件循环上
+        if not success:
+            synthesizer.close()
+        _end_flight(key, flight, success)
+    
+    if success and filepath:
+        print(f"音频文件生成完成: {filepath} ({os.path.getsize(filepath)} bytes)")
+    return success
+
+
+async def synthesize_async(text: str, app_id: str, api_secret: str, api_key: str,
+                           filepath: Optional[str] = None, audio_sink=None) -> bool:
+    """
+    异步一次性文本转语音，参数与text_to_speech相同，等待期间不占用调用方事件循环的线程
+    
+    Returns:
+        bool: 转换成功返回True
+    """
+    key, flight, leader = _join_flight(text, app_id, filepath, audio_sink)
+    if not leader:
+        return await await_future(flight.done)
     
-    return stream_text_to_speech_finish()
+    success = False
+    synthesizer = StreamingSynthesizer(app_id, api_secret, api_key, None, flight.fanout)
+    try:
+        success = (await synthesizer.start_async() and synthesizer.send(text)
+                   and await synthesizer.finish_async())
+    finally:
+        # 发送失败、等待超时、异常或调用方任务被取消时中止会话，关闭连接
+        if not success:
+            synthesizer.close()
+        _end_flight(key, flight, success)
+    
+    if success and filepath:
+        print(f"音频文件生成完成: {filepath} ({os.path.getsize(filepath)} bytes)")
+    return success
 
 
 if __name__ == "__main__":
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+讯飞WebSocket传输层
+语音识别、流式合成和声音复刻共用的请求签名、连接管理（超时与重试）和连接指标；
+所有连接复用audioapi.engine的共享事件循环收发数据
+"""
+
+import os
+import ssl
+import sys
+import time
+import hmac
+import base64
+import struct
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from urllib.parse import urlencode
+from wsgiref.handlers import format_date_time
+from typing import Optional, Callable, Dict, Any, Tuple
+
+import websocket
+from websocket import ABNF, frame_buffer, continuous_frame
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.engine import get_engine, settle, ENGINE_CONFIG
+
+# 传输配置常量
+TRANSPORT_CONFIG = {
+    "connect_timeout": 10,     # 等待连接建立的超时时间(秒)
+    "retries": 2,              # 连接建立前失败时的重试次数（已建立的连接不重试）
+    "retry_backoff": 0.5,      # 首次重试的等待时间(秒)，之后每次翻倍
+    "history_size": 256        # 保留的最近连接指标条数
+}
+
+# 签名URL缓存：同一秒内对同一地址和密钥的签名结果相同，直接复用
+_signed_urls: Dict[Tuple[str, str, str, str], Tuple[str, str]] = {}
+_signed_urls_lock = threading.Lock()
+_signing_stats = {"hits": 0, "misses": 0}
+
+
+def _split_url(request_url: str) -> Tuple[str, str]:
+    """
+    拆分请求URL
+
+    Returns:
+        Tuple[str, str]: (host, path)
+    """
+    schema_end = request_url.index("://")
+    host_start = schema_end + 3
+    path_start = request_url.find("/", host_start)
+    if path_start < 0:
+        return request_url[host_start:], "/"
+    return request_url[host_start:path_start], request_url[path_start:]
+
+
+def create_auth_url(request_url: str, api_key: str, api_secret: str,
+                    method: str = "GET") -> str:
+    """
+    生成带HMAC-SHA256鉴权参数的WebSocket URL，同一秒内的结果按地址和密钥缓存
+
+    Args:
+        request_url (str): 服务地址，如wss://cbm01.cn-huabei-1.xf-yun.com/v1/private/mcd9m97e6
+        api_key (str): API Key
+        api_secret (str): API Secret
+        method (str): HTTP方法
+
+    Returns:
+        str: 认证后的URL
+    """
+    date = format_date_time(time.time())
+    key = (request_url, method, api_key, api_secret)
+
+    with _signed_urls_lock:
+        cached = _signed_urls.get(key)
+        if cached is not None and cached[0] == date:
+            _signing_stats["hits"] += 1
+            return cached[1]
+        _signing_stats["misses"] += 1
+
+    host, path = _split_url(request_url)
+
+    # 构建签名
+    signature_origin = f"host: {host}\ndate: {date}\n{method} {path} HTTP/1.1"
+    signature_sha = hmac.new(
+        api_secret.encode('utf-8'),
+        signature_origin.encode('utf-8'),
+        digestmod=hashlib.sha256
+    ).digest()
+    signature_sha = base64.b64encode(signature_sha).decode('utf-8')
+
+    # 构建授权
+    authorization_origin = (
+        f'api_key="{api_key}", algorithm="hmac-sha256", '
+        f'headers="host date request-line", signature="{signature_sha}"'
+    )
+    authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode('utf-8')
+
+    url = f"{request_url}?{urlencode({'authorization': authorization, 'date': date, 'host': host})}"
+    with _signed_urls_lock:
+        _signed_urls[key] = (date, url)
+    return url
+
+
+class ConnectionMetrics:
+    """一条连接的指标"""
+
+    def __init__(self, service: str, host: str):
+        self.service = service
+        self.host = host
+        self.created = time.time()
+        self.attempts = 0
+        self.connect_time: Optional[float] = None        # 发起连接到建立的耗时(秒)
+        self.first_message_time: Optional[float] = None  # 建立连接到收到首条消息的耗时(秒)
+        self.duration: Optional[float] = None            # 连接存续时间(秒)
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+# 最近连接的指标和按服务汇总的计数
+_history: deque = deque(maxlen=TRANSPORT_CONFIG["history_size"])
+_totals: Dict[str, Dict[str, float]] = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(metrics: ConnectionMetrics) -> None:
+    """连接结束时汇总指标"""
+    with _metrics_lock:
+        _history.append(metrics)
+        totals = _totals.setdefault(metrics.service, {
+            "connections": 0, "failures": 0, "retries": 0,
+            "messages_sent": 0, "messages_received": 0,
+            "bytes_sent": 0, "bytes_received": 0, "connect_time_total": 0.0
+        })
+        totals["connections"] += 1
+        totals["retries"] += max(0, metrics.attempts - 1)
+        if metrics.error is not None:
+            totals["failures"] += 1
+        if metrics.connect_time is not None:
+            totals["connect_time_total"] += metrics.connect_time
+        for field in ("messages_sent", "messages_received", "bytes_sent", "bytes_received"):
+            totals[field] += getattr(metrics, field)
+
+
+def get_transport_stats(recent: int = 10) -> Dict[str, Any]:
+    """
+    获取传输层指标
+
+    Args:
+        recent (int): 返回的最近连接条数
+
+    Returns:
+        Dict[str, Any]: 签名缓存命中、按服务汇总的连接指标（含平均建连耗时）、最近连接明细、
+                        共享事件循环的连接数和线程数
+    """
+    with _metrics_lock:
+        services = {}
+        for service, totals in _totals.items():
+            services[service] = dict(totals)
+            opened = totals["connections"] - totals["failures"]
+            services[service]["connect_time_avg"] = (
+                totals["connect_time_total"] / opened if opened > 0 else None
+            )
+        history = [m.to_dict() for m in list(_history)[-recent:]] if recent else []
+    return {"signing": dict(_signing_stats), "services": services, "recent": history,
+            "engine": get_engine().stats()}
+
+
+class _Incomplete(Exception):
+    """接收缓冲区中的数据不足一个完整帧"""
+
+
+class Connection:
+    """
+    一条讯飞WebSocket连接
+
+    start()后握手在共享的握手线程池中完成，之后连接挂在共享事件循环上收发数据，
+    不单独占用线程；连接建立前失败会按退避时间重新签名并重试。
+    回调参数为(connection, ...)，都在事件循环线程中执行，不能阻塞；
+    回调中可直接调用connection.send()/close()。
+    """
+
+    def __init__(self, service: str, request_url: str, api_key: str, api_secret: str,
+                 on_message: Callable[["Connection", str], None],
+                 on_open: Optional[Callable[["Connection"], None]] = None,
+                 on_error: Optional[Callable[["Connection", Any], None]] = None,
+                 on_close: Optional[Callable[["Connection"], None]] = None,
+                 retries: int = TRANSPORT_CONFIG["retries"],
+                 raw_text: bool = False):
+        """
+        Args:
+            service (str): 服务名，用于指标汇总（如"iat"、"tts"）
+            request_url (str): 服务地址（不含鉴权参数）
+            api_key (str): API Key
+            api_secret (str): API Secret
+            on_message (Callable): 收到消息
+            on_open (Callable): 连接建立
+            on_error (Callable): 连接出错（建立前的失败在重试用尽后才回调）
+            on_close (Callable): 连接结束（无论是否建立成功都只回调一次）
+            retries (int): 连接建立前失败时的重试次数
+            raw_text (bool): 文本帧不解码为str，直接以UTF-8字节交给on_message（供codec解析）
+        """
+        self.request_url = request_url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.on_message = on_message
+        self.on_open = on_open
+        self.on_error = on_error
+        self.on_close = on_close
+        self.retries = retries
+        self.raw_text = raw_text
+        self.metrics = ConnectionMetrics(service, _split_url(request_url)[0])
+
+        self.opened: Future = Future()  # 建立结果：已建立为True，最终失败为False
+        self.closed: Future = Future()  # 连接结束（on_close回调之后）
+        self._engine = get_engine()
+        self._sock = None
+        self._frames = None
+        self._cont = None
+        self._inbox = bytearray()
+        self._outbox = bytearray()
+        self._writing = False
+        self._closing = False
+        self._close_sent = False
+        self._last_error = None
+        self._backoff = TRANSPORT_CONFIG["retry_backoff"]
+        self._started = None
+        self._attempt_started = None
+        self._opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        """连接已建立且未结束"""
+        return (self.opened.done() and not self.opened.cancelled()
+                and self.opened.result() and not self.closed.done())
+
+    def start(self) -> "Connection":
+        """开始建立连接"""
+        self._started = time.monotonic()
+        self._engine.call_soon(self._attempt)
+        return self
+
+    def wait_open(self, timeout: Optional[float] = TRANSPORT_CONFIG["connect_timeout"]) -> bool:
+        """
+        等待连接建立
+
+        Args:
+            timeout (float): 超时时间(秒)
+
+        Returns:
+            bool: 连接已建立返回True
+        """
+        try:
+            self.opened.result(timeout)
+        except FutureTimeoutError:
+            pass
+        return self.is_open
+
+    def send(self, data, text: Optional[bool] = None) -> None:
+        """
+        发送消息，可从任意线程调用，按调用顺序发出
+
+        Args:
+            data (str | bytes): 消息内容
+            text (bool): 是否按文本帧发送，为None时str按文本帧、bytes按二进制帧；
+                         已编码为UTF-8的JSON（如codec的编码结果）传入True
+
+        Raises:
+            websocket.WebSocketConnectionClosedException: 连接未建立或已关闭
+        """
+        if not self.is_open or self._closing:
+            raise websocket.WebSocketConnectionClosedException("连接未建立或已关闭")
+        if text is None:
+            text = isinstance(data, str)
+        opcode = ABNF.OPCODE_TEXT if text else ABNF.OPCODE_BINARY
+        payload = ABNF.create_frame(data, opcode).format()
+        self.metrics.messages_sent += 1
+        self.metrics.bytes_sent += len(data)
+        self._engine.call_soon(self._write, payload)
+
+    def close(self) -> None:
+        """关闭连接（此前调用send()的消息会先发出），连接尚未建立时停止重试"""
+        self._closing = True
+        self._engine.call_soon(self._close)
+
+    # 以下方法都在事件循环线程中执行
+
+    def _attempt(self) -> None:
+        if self._closing:
+            self._finish()
+            return
+        self.metrics.attempts += 1
+        self._attempt_started = time.monotonic()
+        url = create_auth_url(self.request_url, self.api_key, self.api_secret)
+        future = self._engine.connect(self._handshake, url)
+        future.add_done_callback(lambda f: self._engine.call_soon(self._handshake_done, f))
+
+    def _handshake(self, url: str) -> websocket.WebSocket:
+        """握手线程池中执行：TCP/TLS连接和HTTP升级"""
+        return websocket.create_connection(
+            url, timeout=TRANSPORT_CONFIG["connect_timeout"],
+            sslopt={"cert_reqs": ssl.CERT_NONE}
+        )
+
+    def _handshake_done(self, future: Future) -> None:
+        try:
+            ws = future.result()
+        except Exception as e:
+            self._last_error = e
+            if self._closing or self.metrics.attempts > self.retries:
+                self._finish()
+            else:
+                self._engine.call_later(self._backoff, self._attempt)
+                self._backoff *= 2
+            return
+
+        sock, ws.sock = ws.sock, None
+        if self._closing:
+            sock.close()
+            self._finish()
+            return
+
+        sock.setblocking(False)
+        self._sock = sock
+        self._frames = frame_buffer(self._read_inbox, skip_utf8_validation=False)
+        self._cont = continuous_frame(fire_cont_frame=False, skip_utf8_validation=False)
+        self._engine.loop.add_reader(sock.fileno(), self._on_readable)
+        self._engine.connections += 1
+
+        self._opened_at = time.monotonic()
+        self.metrics.connect_time = self._opened_at - self._attempt_started
+        settle(self.opened, True)
+        self._callback(self.on_open)
+        # TLS层可能已缓存了握手后到达的数据，不会再触发可读事件
+        self._on_readable()
+
+    def _read_inbox(self, bufsize: int) -> bytes:
+        """供帧解析器读取接收缓冲区，数据不足时中断解析，下次可读时从断点继续"""
+        if not self._inbox:
+            raise _Incomplete()
+        data = bytes(self._inbox[:bufsize])
+        del self._inbox[:bufsize]
+        return data
+
+    def _on_readable(self) -> None:
+        sock = self._sock
+        if sock is None:
+            return
+        error = None
+        try:
+            while True:
+                data = sock.recv(ENGINE_CONFIG["recv_size"])
+                if not data:
+                    raise websocket.WebSocketConnectionClosedException("连接已被服务端断开")
+                self._inbox += data
+                if not (isinstance(sock, ssl.SSLSocket) and sock.pending()):
+                    break
+        except (BlockingIOError, ssl.SSLWantReadError):
+            pass
+        except Exception as e:
+            error = e
+
+        # 先处理已收到的完整帧，再处理读取错误
+        while self._sock is not None and not self._closing:
+            try:
+                frame = self._frames.recv_frame()
+            except _Incomplete:
+                break
+            except Exception as e:
+                error = e
+                break
+            self._handle_frame(frame)
+
+        if error is not None and self._sock is not None:
+            if self._closing:
+                self._finish()
+            else:
+                self._fail(error)
+
+    def _handle_frame(self, frame: ABNF) -> None:
+        if frame.opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY, ABNF.OPCODE_CONT):
+            self._cont.validate(frame)
+            self._cont.add(frame)
+            if self._cont.is_fire(frame):
+                opcode, frame = self._cont.extract(frame)
+                data = frame.data
+                if opcode == ABNF.OPCODE_TEXT and not self.raw_text:
+                    data = data.decode("utf-8")
+                self._handle_message(data)
+        elif frame.opcode == ABNF.OPCODE_PING:
+            self._write(ABNF.create_frame(frame.data, ABNF.OPCODE_PONG).format())
+        elif frame.opcode == ABNF.OPCODE_CLOSE:
+            self._closing = True
+            self._close()
+
+    def _write(self, payload: bytes) -> None:
+        if self._sock is None:
+            return
+        self._outbox += payload
+        self._flush()
+
+    def _flush(self) -> None:
+        """把发送缓冲区写入套接字，写不完时等待可写事件"""
+        sock = self._sock
+        if sock is None:
+            return
+        try:
+            while self._outbox:
+                sent = sock.send(self._outbox)
+                del self._outbox[:sent]
+        except (BlockingIOError, ssl.SSLWantWriteError):
+            if not self._writing:
+                self._writing = True
+                self._engine.loop.add_writer(sock.fileno(), self._flush)
+            return
+        except Exception as e:
+            self._fail(e)
+            return
+
+        if self._writing:
+            self._writing = False
+            self._engine.loop.remove_writer(sock.fileno())
+        if self._close_sent:
+            self._finish()
+
+    def _close(self) -> None:
+        """发送关闭帧，发送缓冲区写完后断开；尚未建立的连接由建立流程自行结束"""
+        if self._sock is None or self._close_sent:
+            return
+        self._close_sent = True
+        self._write(ABNF.create_frame(struct.pack("!H", websocket.STATUS_NORMAL),
+                                      ABNF.OPCODE_CLOSE).format())
+
+    def _fail(self, error) -> None:
+        self._last_error = error
+        if self.opened.done():
+            self.metrics.error = str(error)
+            self._callback(self.on_error, error)
+        self._finish()
+
+    def _finish(self) -> None:
+        """结束连接并汇总指标，只执行一次"""
+        if self.closed.done():
+            return
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            loop = self._engine.loop
+            loop.remove_reader(sock.fileno())
+            if self._writing:
+                loop.remove_writer(sock.fileno())
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._engine.connections -= 1
+
+        if not self.opened.done():
+            if self._last_error is not None and not self._closing:
+                self.metrics.error = str(self._last_error)
+                self._callback(self.on_error, self._last_error)
+            settle(self.opened, False)
+        self.metrics.duration = time.monotonic() - self._started
+        _record(self.metrics)
+        self._callback(self.on_close)
+        settle(self.closed)
+
+    def _callback(self, callback, *args) -> None:
+        if callback is None:
+            return
+        try:
+            callback(self, *args)
+        except Exception as e:
+            print(f"连接回调错误: {e}")
+
+    def _handle_message(self, message) -> None:
+        if self.metrics.messages_received == 0 and self._opened_at is not None:
+            self.metrics.first_message_time = time.monotonic() - self._opened_at
+        self.metrics.messages_received += 1
+        self.metrics.bytes_received += len(message)
+        self._callback(self.on_message, message)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+动态修正结果拼接模块
+识别参数dwa=wpgs时，服务端每条结果带序号sn：pgs为apd表示追加在此前的结果之后，
+为rpl表示替换rg=[起始sn, 结束sn]范围内的结果。本模块按这一语义逐条拼接识别文本，
+并维护不会再被替换的稳定前缀，下游可在最终结果到达前先处理稳定部分
+"""
+
+from typing import Optional, Dict, Any, List, Tuple
+
+
+def segment_text(result: Dict[str, Any]) -> str:
+    """
+    拼接一条结果中的词
+
+    Args:
+        result (Dict): 解码后的结果（含ws字段）
+
+    Returns:
+        str: 本条结果的文本
+    """
+    return "".join(
+        cw_item.get("w", "")
+        for ws_item in result.get("ws", [])
+        for cw_item in ws_item.get("cw", [])
+    )
+
+
+class HypothesisBuilder:
+    """
+    增量识别假设
+    已确认的片段追加到稳定前缀后不再改动，只有最近一句话内尚可被替换的片段保存在
+    按sn索引的字典中，每条结果的处理开销只与被替换的片段数有关，与已识别的总长度无关。
+
+    稳定的判定：apd结果追加在"此前的最终结果"之后，因此收到sn为k的apd结果时，
+    k之前的片段都已确认；ls（最后一条结果）到达时全部确认。
+    """
+
+    def __init__(self):
+        self._stable: List[Tuple[int, str]] = []   # 已确认的(sn, 文本)
+        self._stable_text = ""
+        self._pending: Dict[int, str] = {}          # 尚可被替换的片段
+        self._last_sn = 0
+        self.revisions = 0  # rpl范围覆盖到已确认片段的次数（服务端违反上述约定）
+
+    @property
+    def stable_text(self) -> str:
+        """不会再被替换的前缀"""
+        return self._stable_text
+
+    @property
+    def text(self) -> str:
+        """当前完整识别文本"""
+        if not self._pending:
+            return self._stable_text
+        return self._stable_text + "".join(self._pending[sn] for sn in sorted(self._pending))
+
+    def _commit(self, below: Optional[int] = None) -> None:
+        """确认sn小于below的片段，below为None时确认全部"""
+        for sn in sorted(self._pending):
+            if below is not None and sn >= below:
+                break
+            segment = self._pending.pop(sn)
+            self._stable.append((sn, segment))
+            self._stable_text += segment
+
+    def _reopen(self, start: int) -> None:
+        """rpl范围覆盖已确认片段时撤回这些片段，保证最终文本正确"""
+        self.revisions += 1
+        while self._stable and self._stable[-1][0] >= start:
+            sn, segment = self._stable.pop()
+            self._pending[sn] = segment
+        self._stable_text = "".join(segment for _, segment in self._stable)
+
+    def apply(self, result: Dict[str, Any]) -> bool:
+        """
+        应用一条结果
+
+        Args:
+            result (Dict): 解码后的结果，含sn、pgs、rg、ls、ws字段；
+                           没有pgs字段（未开启wpgs）时按追加处理
+
+        Returns:
+            bool: 稳定前缀是否变化
+        """
+        sn = result.get("sn") or self._last_sn + 1
+        self._last_sn = max(self._last_sn, sn)
+        stable_before = len(self._stable)
+
+        if result.get("pgs") == "rpl" and result.get("rg"):
+            start, end = result["rg"][0], result["rg"][-1]
+            if self._stable and start <= self._stable[-1][0]:
+                self._reopen(start)
+            for replaced in range(start, end + 1):
+                self._pending.pop(replaced, None)
+        else:
+            self._commit(below=sn)
+
+        self._pending[sn] = segment_text(result)
+        if result.get("ls"):
+            self._commit()
+        return len(self._stable) != stable_before
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多轮对话模块
+保存对话历史并缓存每轮的token数，超出token预算时把最早的轮次滚动合并进摘要，
+使每轮请求的提示词长度保持稳定
+"""
+
+import asyncio
+from typing import List, Tuple, Optional, Callable, AsyncIterator, Any
+
+from Core import get_ai_response, aget_ai_response
+
+# 对话配置常量
+CONVERSATION_CONFIG = {
+    "token_budget": 2000,          # 摘要与历史轮次的总token预算
+    "keep_recent_turns": 2,        # 至少保留的最近轮次数，不参与摘要
+    "summary_template": "Summary", # 生成摘要使用的系统模板
+    "encoding": "cl100k_base",     # tiktoken编码
+    "message_overhead": 4          # 每条消息的格式开销(token)
+}
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    计算文本的token数
+    tiktoken不可用（未安装或无法加载编码）时按字符估算：中文约1字1 token，英文约4字符1 token
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: token数
+    """
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(CONVERSATION_CONFIG["encoding"])
+        except Exception as e:
+            print(f"警告: tiktoken不可用，使用估算的token数 ({e})")
+
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+class Turn:
+    """一轮对话，token数在创建时计算一次"""
+
+    def __init__(self, user: str, assistant: str):
+        self.user = user
+        self.assistant = assistant
+        self.tokens = (count_tokens(user) + count_tokens(assistant)
+                       + 2 * CONVERSATION_CONFIG["message_overhead"])
+
+    def to_text(self) -> str:
+        return f"用户：{self.user}\n助手：{self.assistant}"
+
+
+def _default_summarizer(summary: str, dropped: List[Turn]) -> str:
+    """
+    用模型把旧摘要和被移出的轮次合并为新摘要
+    """
+    parts = []
+    if summary:
+        parts.append(f"已有摘要：{summary}")
+    parts.append("新增对话：\n" + "\n".join(turn.to_text() for turn in dropped))
+    return get_ai_response("\n".join(parts), CONVERSATION_CONFIG["summary_template"])
+
+
+class ConversationSession:
+    """
+    多轮对话会话
+
+    用法:
+        session = ConversationSession('Voice')
+        answer = session.ask("你好")
+        async for chunk in session.astream("继续"):
+            ...
+    """
+
+    def __init__(self, systemprompt: str = 'Claude',
+                 token_budget: int = CONVERSATION_CONFIG["token_budget"],
+                 keep_recent_turns: int = CONVERSATION_CONFIG["keep_recent_turns"],
+                 summarizer: Optional[Callable[[str, List[Turn]], str]] = None):
+        """
+        Args:
+            systemprompt (str): 系统提示词类型
+            token_budget (int): 摘要与历史轮次的总token预算
+            keep_recent_turns (int): 至少保留的最近轮次数
+            summarizer (Callable): 摘要函数(旧摘要, 被移出的轮次) -> 新摘要，默认调用模型生成
+        """
+        self.systemprompt = systemprompt
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summarizer = summarizer or _default_summarizer
+
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.summary_tokens = 0
+        self.history_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """当前历史（含摘要）的token数"""
+        return self.summary_tokens + self.history_tokens
+
+    def history(self) -> List[Tuple[str, str]]:
+        """
+        构建发送给模型的历史消息
+
+        Returns:
+            List[Tuple[str, str]]: 摘要（如有）及历史轮次
+        """
+        messages = []
+        if self.summary:
+            messages.append(("system", f"之前对话的摘要：{self.summary}"))
+        for turn in self.turns:
+            messages.append(("human", turn.user))
+            messages.append(("ai", turn.assistant))
+        return messages
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        """
+        记录一轮对话，超出预算时滚动摘要
+
+        Args:
+            user (str): 用户输入
+            assistant (str): 助手回复
+        """
+        turn = Turn(user, assistant)
+        self.turns.append(turn)
+        self.history_tokens += turn.tokens
+        self._trim()
+
+    def _trim(self) -> None:
+        """把最早的轮次移出历史并合并进摘要，直到满足token预算"""
+        dropped = []
+        while (self.total_tokens > self.token_budget
+               and len(self.turns) > self.keep_recent_turns):
+            turn = self.turns.pop(0)
+            self.history_tokens -= turn.tokens
+            dropped.append(turn)
+
+        if not dropped:
+            return
+
+        try:
+            self.summary = self.summarizer(self.summary, dropped).strip()
+        except Exception as e:
+            # 摘要失败时退回为截断的原文，保证历史仍然受预算约束
+            print(f"对话摘要失败: {e}")
+            text = (self.summary + "\n" + "\n".join(t.to_text() for t in dropped)).strip()
+            self.summary = text[-max(1, self.token_budget // 4):]
+        self.summary_tokens = count_tokens(self.summary) + CONVERSATION_CONFIG["message_overhead"]
+
+    def ask(self, userprompt: str) -> str:
+        """
+        同步提问并记录本轮对话
+
+        Args:
+            userprompt (str): 用户输入
+
+        Returns:
+            str: AI回复
+        """
+        answer = get_ai_response(userprompt, self.systemprompt, history=self.history())
+        self.add_turn(userprompt, answer)
+        return answer
+
+    async def aask(self, userprompt: str) -> str:
+        """
+        异步提问并记录本轮对话
+
+        Args:
+            userprompt (str): 用户输入
+
+        Returns:
+            str: AI回复
+        """
+        answer = await aget_ai_response(userprompt, self.systemprompt, history=self.history())
+        # 摘要可能需要一次同步的模型调用，放到线程池中避免阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(None, self.add_turn, userprompt, answer)
+        return answer
+
+    async def astream(self, userprompt: str) -> AsyncIterator[Any]:
+        """
+        流式提问，流结束后记录本轮对话；调用方提前结束迭代（如语音打断）或流中途出错时，
+        记录已收到的部分回复，未收到任何内容时不记录
+
+        Args:
+            userprompt (str): 用户输入
+
+        Yields:
+            与get_ai_response(stream=True)相同的消息块
+        """
+        parts = []
+        try:
+            async for chunk in get_ai_response(userprompt, self.systemprompt,
+                                               stream=True, history=self.history()):
+                parts.append(chunk.content)
+                yield chunk
+        finally:
+            answer = "".join(parts)
+            if answer:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.add_turn, userprompt, answer
+                )
+
+    def reset(self) -> None:
+        """清空历史和摘要"""
+        self.turns.clear()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.history_tokens = 0
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音助手常驻进程
+启动时完成导入、创建模型客户端、检查sox/ffplay，并预先建立好识别和合成连接；
+通过本地Unix套接字接收对话请求，热键脚本等轻量客户端几乎无需准备即可开始一轮对话
+
+用法:
+    python daemon.py serve                 # 启动常驻进程
+    python daemon.py turn                  # 录音对话一轮，按回车（或另行执行stop）结束录音
+    python daemon.py turn --text "你好"     # 跳过录音，直接以文本提问
+    python daemon.py stop                  # 结束当前录音
+    python daemon.py status                # 查看预热状态和调用指标
+    python daemon.py shutdown              # 退出常驻进程
+
+协议: 每行一个JSON对象。请求为{"cmd": ...}，常驻进程逐行返回{"event": ...}，
+一轮对话依次返回partial（穿插stable，为不会再被修正的识别前缀）、recognized、reply、done事件，
+出错时返回error事件。
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import time
+from typing import Optional, Dict, Any
+
+# 客户端只依赖标准库，常驻进程所需的模块在serve时才导入
+
+# 常驻进程配置常量
+DAEMON_CONFIG = {
+    "socket_path": os.environ.get("voice_daemon_socket", "/tmp/voice-agent.sock"),
+    "connect_timeout": 10,     # 预先建立识别/合成连接的超时时间(秒)
+    "asr_max_idle": 8.0,       # 预备识别连接空闲超过该时间(秒)即替换，需小于服务端约10秒的空闲超时
+    "asr_retry": 2.0,          # 预备识别连接建立失败后的重试间隔(秒)
+    "stream_limit": 1 << 20    # 单行请求的最大长度(字节)
+}
+
+
+class VoiceDaemon:
+    """
+    常驻语音助手
+    同一时间只处理一轮对话（共用麦克风和扬声器）；识别和合成的预连接都在后台维护，
+    被取走后立即补充，空闲接近服务端超时前先建新连接再关闭旧连接
+    """
+
+    def __init__(self, socket_path: str = DAEMON_CONFIG["socket_path"]):
+        self.socket_path = socket_path
+        self.tts_pool = None
+        self.asr_standby = None
+        self._standby_since = 0.0               # 预备识别连接的建立时间
+        self._standby_cond = threading.Condition()
+        self._standby_thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.asr_refreshed = 0
+        self.asr_failures = 0
+        self.turns = 0
+        self._turn_lock = None
+        self._stop_event: Optional[threading.Event] = None
+        self._server = None
+
+    def warm_up(self) -> bool:
+        """
+        完成导入和一次性检查，创建模型客户端
+
+        Returns:
+            bool: sox和ffplay均可用返回True
+        """
+        # 导入全部模块，首轮对话不再承担导入耗时
+        import Core
+        import voice
+        from voiceIO import play, record
+        from audioapi import s2t, smarttts
+
+        try:
+            print(f"模型客户端已就绪: {', '.join(Core.preload_models())}")
+        except Exception as e:
+            print(f"模型客户端创建失败: {e}")
+        tools_ok = record._check_sox() and play._check_ffplay()
+        # 合成连接由热备连接池在后台维护并定期刷新
+        self.tts_pool = smarttts.SynthesizerPool(voice.appid, voice.apisecret, voice.apikey)
+        # 识别预连接同样由后台线程维护
+        self._standby_thread = threading.Thread(target=self._maintain_asr, daemon=True)
+        self._standby_thread.start()
+        return tools_ok
+
+    def _maintain_asr(self) -> None:
+        """
+        后台维护线程：保持一个已连接的预备识别会话，被取走或已断开时补充，
+        空闲达到asr_max_idle时替换；新会话连接成功后才设为预备会话，对话不会取到仍在连接中的会话
+        """
+        from audioapi.s2t import create_recognizer
+
+        max_idle = DAEMON_CONFIG["asr_max_idle"]
+        while True:
+            with self._standby_cond:
+                if self._closed:
+                    return
+                standby = self.asr_standby
+                if standby is not None and standby.is_open:
+                    wait = self._standby_since + max_idle - time.monotonic()
+                    if wait > 0:
+                        # 睡到需要替换时，被取走或关闭时提前唤醒
+                        self._standby_cond.wait(wait)
+                        continue
+
+            session = create_recognizer().create_session()
+            connected = session.connect(DAEMON_CONFIG["connect_timeout"])
+            with self._standby_cond:
+                if self._closed or not connected:
+                    old = session
+                    if not connected and not self._closed:
+                        self.asr_failures += 1
+                        print("识别连接预热失败，稍后重试")
+                        self._standby_cond.wait(DAEMON_CONFIG["asr_retry"])
+                else:
+                    # 新连接就绪后再关闭旧连接（可能已被取走，此时为None）
+                    old = self.asr_standby
+                    if old is not None:
+                        self.asr_refreshed += 1
+                    self.asr_standby = session
+                    self._standby_since = time.monotonic()
+            if old is not None:
+                old.close()
+
+    def _claim_sessions(self):
+        """取出预先连接的会话，由使用方负责关闭；后台随即补充新的识别连接"""
+        with self._standby_cond:
+            asr, self.asr_standby = self.asr_standby, None
+            self._standby_cond.notify_all()
+        tts = self.tts_pool.claim() if self.tts_pool is not None else None
+        return asr, tts
+
+    def _stop_standby(self) -> None:
+        """停止维护线程并关闭预备识别会话"""
+        with self._standby_cond:
+            self._closed = True
+            standby, self.asr_standby = self.asr_standby, None
+            self._standby_cond.notify_all()
+        if standby is not None:
+            standby.close()
+
+    def status(self) -> Dict[str, Any]:
+        """预热状态和调用指标"""
+        import Core
+        from audioapi.s2t import get_transcript_cache
+        from voiceIO.jitter import get_jitter_stats
+
+        asr_cache = get_transcript_cache()
+        return {
+            "turns": self.turns,
+            "busy": self._turn_lock is not None and self._turn_lock.locked(),
+            "asr_ready": self.asr_standby is not None and self.asr_standby.is_open,
+            "asr_standby": {"refreshed": self.asr_refreshed, "failures": self.asr_failures},
+            "tts_pool": self.tts_pool.stats() if self.tts_pool is not None else None,
+            "llm": Core.get_llm_metrics(),
+            "limiter": Core.get_limiter_stats(),
+            "asr_cache": asr_cache.stats() if asr_cache is not None else None,
+            "tts_jitter": get_jitter_stats()
+        }
+
+    async def _send(self, writer, event: Dict[str, Any]) -> None:
+        writer.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def _recognize(self, writer, stop_event: threading.Event, session) -> str:
+        """录音并识别，中间结果和稳定前缀转发给客户端"""
+        import voice
+        from voiceIO import record
+        from audioapi.s2t import recognize_speech_stream_async
+
+        frames = record.stream_audio(stop_event, output_path=voice.VOICE_FILE)
+        text = ""
+        async for kind, text in recognize_speech_stream_async(frames, session=session, events=True):
+            if kind != "final":
+                await self._send(writer, {"event": kind, "text": text})
+        return text
+
+    async def run_turn(self, writer, text: Optional[str] = None) -> None:
+        """
+        执行一轮对话：录音识别（或直接使用text）、流式获取回复、边合成边播放
+
+        Args:
+            writer: 客户端连接的写入端
+            text (str): 提问文本，为None时录音识别
+        """
+        import asyncio
+        import voice
+        from voiceIO import play
+        from Core import get_ai_response
+
+        if self._turn_lock.locked():
+            await self._send(writer, {"event": "error", "message": "上一轮对话尚未结束"})
+            return
+
+        async with self._turn_lock:
+            asr_session, tts_session = self._claim_sessions()
+            try:
+                if text is None:
+                    self._stop_event = threading.Event()
+                    await self._send(writer, {"event": "recording"})
+                    text = await self._recognize(writer, self._stop_event, asr_session)
+                    self._stop_event = None
+                elif asr_session is not None:
+                    # 文本提问用不到识别连接；后台已在补充新的预连接，关闭即可
+                    asr_session.close()
+                await self._send(writer, {"event": "recognized", "text": text})
+                if not text:
+                    await self._send(writer, {"event": "done"})
+                    return
+
+                async def relay(generator):
+                    async for chunk in generator:
+                        if chunk.content:
+                            await self._send(writer, {"event": "reply", "text": chunk.content})
+                        yield chunk
+
+                player = play.StreamPlayer()
+                if not player.start():
+                    await self._send(writer, {"event": "error", "message": "启动播放器失败"})
+                    return
+                generator = get_ai_response(text, 'Voice', stream=True)
+                await asyncio.gather(
+                    voice.process_tts_stream(relay(generator), player.buffer, tts_session),
+                    voice.play_audio_async(player)
+                )
+                tts_session = None
+                self.turns += 1
+                await self._send(writer, {"event": "done"})
+            except Exception as e:
+                await self._send(writer, {"event": "error", "message": str(e)})
+            finally:
+                if tts_session is not None:
+                    tts_session.close()
+
+    async def _handle(self, reader, writer) -> None:
+        """处理一个客户端连接，每行一个请求"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    cmd = request.get("cmd")
+                except (ValueError, AttributeError):
+                    await self._send(writer, {"event": "error", "message": "请求格式错误"})
+                    continue
+
+                if cmd == "turn":
+                    await self.run_turn(writer, request.get("text"))
+                elif cmd == "stop":
+                    if self._stop_event is not None:
+                        self._stop_event.set()
+                    await self._send(writer, {"event": "stopped"})
+                elif cmd == "status":
+                    await self._send(writer, {"event": "status", **self.status()})
+                elif cmd == "shutdown":
+                    await self._send(writer, {"event": "bye"})
+                    self._server.close()
+                    break
+                else:
+                    await self._send(writer, {"event": "error", "message": f"未知命令: {cmd}"})
+        except (ConnectionError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """预热后在Unix套接字上提供服务，直到收到shutdown"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self._turn_lock = asyncio.Lock()
+        if not await loop.run_in_executor(None, self.warm_up):
+            print("警告: sox或ffplay不可用，录音或播放将失败")
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=self.socket_path, limit=DAEMON_CONFIG["stream_limit"]
+        )
+        os.chmod(self.socket_path, 0o600)
+        print(f"语音助手已就绪: {self.socket_path}")
+        try:
+            async with self._server:
+                await self._server.wait_closed()
+        finally:
+            self._stop_standby()
+            if self.tts_pool is not None:
+                self.tts_pool.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            print("语音助手已退出")
+
+
+def send_command(request: Dict[str, Any],
+                 socket_path: str = DAEMON_CONFIG["socket_path"]) -> int:
+    """
+    轻量客户端：发送一个请求并打印返回的事件
+
+    Args:
+        request (Dict): 请求对象
+        socket_path (str): 常驻进程的套接字路径
+
+    Returns:
+        int: 进程退出码，出错时为1
+    """
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    except OSError as e:
+        print(f"无法连接常驻进程 {socket_path}: {e}（请先运行 python daemon.py serve）")
+        return 1
+
+    final_events = {"done", "error", "stopped", "status", "bye"}
+    exit_code = 0
+    with sock, sock.makefile("r", encoding="utf-8") as stream:
+        sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        for line in stream:
+            event = json.loads(line)
+            kind = event.get("event")
+            if kind == "recording":
+                if sys.stdin.isatty():
+                    print("开始录音，按回车键停止...")
+                    threading.Thread(
+                        target=lambda: (input(), send_command({"cmd": "stop"}, socket_path)),
+                        daemon=True
+                    ).start()
+            elif kind == "partial":
+                print(f"\r识别中: {event['text']}", end="", flush=True)
+            elif kind == "recognized":
+                print(f"\r识别结果: {event['text']}")
+            elif kind == "reply":
+                print(event["text"], end="", flush=True)
+            elif kind == "done":
+                print()
+            elif kind == "error":
+                print(f"错误: {event['message']}")
+                exit_code = 1
+            elif kind == "status":
+                print(json.dumps(event, ensure_ascii=False, indent=2))
+            if kind in final_events:
+                break
+    return exit_code
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="语音助手常驻进程")
+    parser.add_argument("command", choices=["serve", "turn", "stop", "status", "shutdown"])
+    parser.add_argument("--text", help="turn: 直接以文本提问，跳过录音")
+    parser.add_argument("--socket", default=DAEMON_CONFIG["socket_path"], help="套接字路径")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        import asyncio
+        try:
+            asyncio.run(VoiceDaemon(args.socket).serve())
+        except KeyboardInterrupt:
+            print("\n程序已退出")
+        sys.exit(0)
+
+    request = {"cmd": args.command}
+    if args.text:
+        request["text"] = args.text
+    sys.exit(send_command(request, args.socket))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析模块
+在全新的解释器中用 python -X importtime 导入指定模块，统计每个模块的导入耗时，
+并可检查冷启动导入时间是否超出预算
+
+用法:
+    python importprofile.py Core voice --top 20
+    python importprofile.py Core --budget 0.5      # 超出预算时退出码为1
+    python Core.py --import-profile
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from typing import List, Tuple, Optional
+
+# 冷启动导入时间预算(秒)，--budget未指定时使用
+IMPORT_BUDGET = {
+    "Core": 0.5,
+    "voice": 0.8
+}
+
+# 仓库根目录，子进程在此目录下导入，保证与直接运行脚本时的模块搜索路径一致
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(module: str) -> Tuple[List[Tuple[str, int, int, int]], Optional[str]]:
+    """
+    在子进程中导入模块并解析 -X importtime 的输出
+
+    Args:
+        module (str): 模块名
+
+    Returns:
+        Tuple: ([(模块名, 自身耗时us, 累计耗时us, 嵌套层级)], 导入失败时的错误信息)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+
+    records = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2][1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+
+    error = None
+    if proc.returncode != 0:
+        error = errors[-1] if errors else f"退出码 {proc.returncode}"
+    return records, error
+
+
+def total_import_time(records: List[Tuple[str, int, int, int]], module: str) -> float:
+    """
+    目标模块的累计导入时间(秒)
+
+    Args:
+        records (List): profile_imports()的结果
+        module (str): 模块名
+
+    Returns:
+        float: 累计耗时，模块未导入完成时返回所有顶层模块的累计耗时之和
+    """
+    for name, _, cumulative, depth in records:
+        if name == module and depth == 0:
+            return cumulative / 1e6
+    return sum(cumulative for _, _, cumulative, depth in records if depth == 0) / 1e6
+
+
+def print_import_profile(module: str, top: int = 20) -> float:
+    """
+    打印模块的导入耗时排行
+
+    Args:
+        module (str): 模块名
+        top (int): 显示的模块数
+
+    Returns:
+        float: 累计导入时间(秒)
+    """
+    records, error = profile_imports(module)
+    total = total_import_time(records, module)
+
+    print(f"{module} 冷启动导入耗时: {total * 1000:.1f} ms（共 {len(records)} 个模块）")
+    if error:
+        print(f"警告: 导入未完成: {error}")
+
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for name, self_us, cumulative, _ in sorted(records, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+    return total
+
+
+def check_budget(module: str, budget: Optional[float] = None) -> bool:
+    """
+    检查冷启动导入时间是否在预算内
+
+    Args:
+        module (str): 模块名
+        budget (float): 预算(秒)，默认取IMPORT_BUDGET
+
+    Returns:
+        bool: 在预算内且导入成功返回True
+    """
+    budget = IMPORT_BUDGET.get(module) if budget is None else budget
+    records, error = profile_imports(module)
+    if error:
+        print(f"{module} 导入失败: {error}")
+        return False
+
+    total = total_import_time(records, module)
+    if budget is None:
+        print(f"{module} 导入耗时 {total * 1000:.1f} ms（未设置预算）")
+        return True
+    if total > budget:
+        heaviest = max(records, key=lambda r: r[1])
+        print(f"{module} 导入耗时 {total * 1000:.1f} ms 超出预算 {budget * 1000:.0f} ms，"
+              f"自身耗时最大的模块: {heaviest[0]} ({heaviest[1] / 1000:.1f} ms)")
+        return False
+    print(f"{module} 导入耗时 {total * 1000:.1f} ms，预算 {budget * 1000:.0f} ms")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模块冷启动导入耗时分析")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGET), help="要分析的模块")
+    parser.add_argument("--top", type=int, default=20, help="显示耗时最多的模块数")
+    parser.add_argument("--budget", type=float, nargs="?", const=-1.0, default=None,
+                        help="检查导入时间预算(秒)，不带数值时使用IMPORT_BUDGET")
+    args = parser.parse_args()
+
+    if args.budget is None:
+        for name in args.modules:
+            print_import_profile(name, args.top)
+            print()
+    else:
+        budget = None if args.budget < 0 else args.budget
+        ok = all([check_budget(name, budget) for name in args.modules])
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应并发限制模块
+按AIMD（加性增、乘性减）根据观测到的延迟和错误调整在途请求上限，
+超出上限的请求带截止时间排队，同时支持线程和协程调用方
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Dict, Any, Iterator, AsyncIterator
+
+# 限流配置常量
+LIMITER_CONFIG = {
+    "initial_limit": 4,         # 初始并发上限
+    "min_limit": 1,             # 并发上限下界
+    "max_limit": 32,            # 并发上限上界
+    "backoff": 0.7,             # 过载时上限乘以该系数
+    "latency_tolerance": 2.0,   # 延迟超过基线的该倍数视为过载
+    "baseline_window": 50,      # 基线取最近多少个延迟样本的中位数，服务整体变慢后随之适应
+    "baseline_min_samples": 5,  # 样本数不足时不按延迟判断过载
+    "queue_timeout": 30.0       # 默认排队截止时间(秒)
+}
+
+
+class _Waiter:
+    """一个排队中的调用方，线程用Event唤醒，协程用Future唤醒"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._set_future)
+
+    def _set_future(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class Permit:
+    """
+    一个并发配额，退出时归还
+    流式调用可在收到首个块时调用observe()，以首块延迟而非整个流的耗时作为延迟样本；
+    measure_latency为False时（非流式调用，耗时随回答长度变化）只以成败调整上限
+    """
+
+    def __init__(self, measure_latency: bool = True):
+        self.start = time.monotonic()
+        self.measure_latency = measure_latency
+        self.latency: Optional[float] = None
+
+    def observe(self) -> None:
+        """记录当前时刻为本次调用的延迟样本（只记录第一次）"""
+        if self.latency is None and self.measure_latency:
+            self.latency = time.monotonic() - self.start
+
+
+class AdaptiveLimiter:
+    """
+    AIMD自适应并发限制器
+
+    每个成功且延迟正常的调用使上限增加1/上限（即每轮满载增加1）；出现错误或延迟超过
+    基线（最近样本的中位数）的latency_tolerance倍时上限乘以backoff，同一轮内只减少一次。
+    上限已满时调用方按先来先到排队，超过截止时间抛出TimeoutError。
+    """
+
+    def __init__(self, initial_limit: int = LIMITER_CONFIG["initial_limit"],
+                 min_limit: int = LIMITER_CONFIG["min_limit"],
+                 max_limit: int = LIMITER_CONFIG["max_limit"],
+                 backoff: float = LIMITER_CONFIG["backoff"],
+                 latency_tolerance: float = LIMITER_CONFIG["latency_tolerance"],
+                 queue_timeout: Optional[float] = LIMITER_CONFIG["queue_timeout"]):
+        """
+        Args:
+            initial_limit (int): 初始并发上限
+            min_limit (int): 并发上限下界
+            max_limit (int): 并发上限上界
+            backoff (float): 过载时的乘性减少系数
+            latency_tolerance (float): 视为过载的延迟倍数
+            queue_timeout (float): 默认排队截止时间(秒)，None表示一直等待
+        """
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("并发上限范围无效")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=LIMITER_CONFIG["baseline_window"])
+        self._last_decrease = 0.0
+
+        # 统计
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.increases = 0
+        self.decreases = 0
+        self.max_queue_depth = 0
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def baseline(self) -> Optional[float]:
+        """延迟基线：最近延迟样本的中位数，样本不足时为None"""
+        if len(self._samples) < LIMITER_CONFIG["baseline_min_samples"]:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[len(ordered) // 2]
+
+    @property
+    def in_flight(self) -> int:
+        """当前在途请求数"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队的请求数"""
+        return len(self._waiters)
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """
+        修改并发上限的上界，当前上限超出时立即收紧
+
+        Args:
+            max_limit (int): 新的上界
+        """
+        if max_limit < self.min_limit:
+            raise ValueError("最大并发数不能小于下界")
+        with self._lock:
+            self.max_limit = max_limit
+            self._limit = min(self._limit, float(max_limit))
+            self._grant_waiters()
+
+    def _try_acquire(self, waiter: _Waiter) -> bool:
+        """无需排队时直接占用配额，否则加入队列，需持有锁"""
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            return True
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        return False
+
+    def _grant_waiters(self) -> None:
+        """按先来先到唤醒排队者，直到在途数达到上限，需持有锁"""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._in_flight += 1
+            waiter.wake()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """等待超时或被取消：已获得配额则归还，否则移出队列"""
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+                self._grant_waiters()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        同步获取配额
+
+        Args:
+            timeout (float): 排队截止时间(秒)，默认使用queue_timeout
+
+        Raises:
+            TimeoutError: 排队超时
+        """
+        waiter = _Waiter()
+        with self._lock:
+            if self._try_acquire(waiter):
+                return
+        timeout = self.queue_timeout if timeout is None else timeout
+        if waiter.event.wait(timeout) or waiter.granted:
+            return
+        # 超时与获得配额同时发生时_abandon会归还配额，统一按超时处理
+        self._abandon(waiter)
+        self.timeouts += 1
+        raise TimeoutError(f"等待并发配额超时（上限{self.limit}，排队{self.queue_depth}）")
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> None:
+        """
+        异步获取配额
+
+        Args:
+            timeout (float): 排队截止时间(秒)，默认使用queue_timeout
+
+        Raises:
+            TimeoutError: 排队超时
+        """
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            if self._try_acquire(waiter):
+                return
+        timeout = self.queue_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.timeouts += 1
+            raise TimeoutError(f"等待并发配额超时（上限{self.limit}，排队{self.queue_depth}）")
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self, latency: Optional[float] = None, error: bool = False,
+                ok: bool = False) -> None:
+        """
+        归还配额并根据本次结果调整上限
+
+        Args:
+            latency (float): 延迟样本(秒)，与基线比较判断是否过载
+            error (bool): 本次调用是否失败
+            ok (bool): 调用成功但没有可比较的延迟样本（非流式调用），只参与增加上限；
+                       latency为None且ok为False时不参与调整（如调用被取消）
+        """
+        now = time.monotonic()
+        with self._lock:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+
+            if error:
+                self.errors += 1
+                self._decrease(now)
+            elif latency is not None or ok:
+                self.completed += 1
+                overloaded = False
+                if latency is not None:
+                    # 与此前样本的基线比较，再把本次样本加入窗口
+                    baseline = self.baseline
+                    overloaded = baseline is not None and latency > baseline * self.latency_tolerance
+                    self._samples.append(latency)
+
+                if overloaded:
+                    self._decrease(now)
+                elif saturated and self._limit < self.max_limit:
+                    # 只在上限真正被用满时增加，避免空闲时上限无意义地增长
+                    before = self.limit
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                    if self.limit > before:
+                        self.increases += 1
+
+            self._grant_waiters()
+
+    def _decrease(self, now: float) -> None:
+        """乘性减少上限，一个基线延迟内只减少一次，避免同一批失败把上限压到底，需持有锁"""
+        baseline = self.baseline
+        window = baseline * self.latency_tolerance if baseline else 0.0
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        new_limit = max(float(self.min_limit), self._limit * self.backoff)
+        if int(new_limit) < self.limit:
+            self.decreases += 1
+        self._limit = new_limit
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None,
+             measure_latency: bool = True) -> Iterator[Permit]:
+        """
+        同步占用一个配额，退出时按耗时和是否抛出异常调整上限
+
+        Args:
+            timeout (float): 排队截止时间(秒)
+            measure_latency (bool): 是否以耗时判断过载；耗时取决于输出长度的调用应传入False，
+                                    只按错误和超时减少上限
+
+        用法:
+            with limiter.slot(measure_latency=False):
+                llm.invoke(messages)
+        """
+        self.acquire(timeout)
+        permit = Permit(measure_latency)
+        try:
+            yield permit
+        except Exception:
+            self.release(error=True)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        permit.observe()
+        self.release(permit.latency, ok=True)
+
+    @asynccontextmanager
+    async def aslot(self, timeout: Optional[float] = None,
+                    measure_latency: bool = True) -> AsyncIterator[Permit]:
+        """
+        异步占用一个配额，取消不计为错误，参数与slot()相同
+
+        用法:
+            async with limiter.aslot() as permit:
+                async for chunk in llm.astream(messages):
+                    permit.observe()
+        """
+        await self.acquire_async(timeout)
+        permit = Permit(measure_latency)
+        try:
+            yield permit
+        except Exception:
+            self.release(error=True)
+            raise
+        except BaseException:
+            self.release(permit.latency)
+            raise
+        permit.observe()
+        self.release(permit.latency, ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        限流指标
+
+        Returns:
+            Dict[str, Any]: 当前上限、在途数、排队数、历史最大排队数、延迟基线及各类计数
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "baseline_latency": self.baseline,
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI回复缓存模块
+按模型、系统模板和归一化提示词缓存回复，支持基于字符n-gram MinHash的近似重复查找，
+LRU与TTL淘汰，可选持久化到磁盘
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any, List
+
+# 缓存配置常量
+CACHE_CONFIG = {
+    "max_entries": 1024,       # 最大缓存条目数
+    "ttl": 3600,               # 条目有效期(秒)
+    "ngram": 2,                # 近似查找使用的字符n-gram长度
+    "num_perm": 32,            # MinHash签名长度
+    "bands": 8,                # LSH分带数，num_perm需能被其整除
+    "near_threshold": 0.75     # 近似命中所需的Jaccard相似度
+}
+
+# MinHash使用的梅森素数
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    归一化提示词：全半角统一、转小写、去除空白和标点
+
+    Args:
+        text (str): 原始提示词
+
+    Returns:
+        str: 归一化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(
+        ch for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+def _shingles(text: str, n: int) -> frozenset:
+    """字符n-gram集合，文本短于n时整体作为一个元素"""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def _make_permutations(num_perm: int) -> List[Tuple[int, int]]:
+    """生成固定的MinHash置换参数，保证跨进程一致"""
+    perms = []
+    for i in range(num_perm):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME
+        perms.append((a, b))
+    return perms
+
+
+class ResponseCache:
+    """
+    AI回复缓存
+    精确命中按(模型, 系统模板, 归一化提示词)查找；未命中时在同一模型与模板下用
+    MinHash LSH查找近似重复的提示词（如ASR识别结果的细微差异），候选再用精确Jaccard确认
+    """
+
+    def __init__(self, max_entries: int = CACHE_CONFIG["max_entries"],
+                 ttl: Optional[float] = CACHE_CONFIG["ttl"],
+                 near_threshold: Optional[float] = CACHE_CONFIG["near_threshold"],
+                 path: Optional[str] = None):
+        """
+        Args:
+            max_entries (int): 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl (float): 条目有效期(秒)，为None时不过期
+            near_threshold (float): 近似命中的相似度阈值，为None时关闭近似查找
+            path (str): 持久化文件路径，为None时仅保存在内存中
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.near_threshold = near_threshold
+        self.path = path
+
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._perms = _make_permutations(CACHE_CONFIG["num_perm"])
+        self._rows = CACHE_CONFIG["num_perm"] // CACHE_CONFIG["bands"]
+        self._lock = threading.Lock()
+
+        # 命中统计
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def _template_key(template: str) -> str:
+        return hashlib.sha1(template.encode("utf-8")).hexdigest()
+
+    def _signature(self, shingles: frozenset) -> Tuple[int, ...]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, namespace: Tuple[str, str], signature: Tuple[int, ...]) -> List[Tuple]:
+        return [
+            (namespace, band, signature[band * self._rows:(band + 1) * self._rows])
+            for band in range(CACHE_CONFIG["bands"])
+        ]
+
+    def _is_expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl is not None and now - entry["created"] > self.ttl
+
+    def _remove(self, key: Tuple[str, str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry["bands"]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _insert(self, key: Tuple[str, str, str], response: str, created: float) -> None:
+        self._remove(key)
+        shingles = _shingles(key[2], CACHE_CONFIG["ngram"])
+        bands = []
+        if self.near_threshold is not None and len(shingles) > 1:
+            bands = self._band_keys(key[:2], self._signature(shingles))
+            for band_key in bands:
+                self._buckets.setdefault(band_key, set()).add(key)
+
+        self._entries[key] = {
+            "response": response,
+            "created": created,
+            "shingles": shingles,
+            "bands": bands
+        }
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _near_lookup(self, key: Tuple[str, str, str], now: float) -> Optional[Tuple[str, str, str]]:
+        shingles = _shingles(key[2], CACHE_CONFIG["ngram"])
+        if len(shingles) <= 1:
+            return None
+
+        candidates = set()
+        for band_key in self._band_keys(key[:2], self._signature(shingles)):
+            candidates |= self._buckets.get(band_key, set())
+
+        best_key, best_score = None, self.near_threshold
+        for candidate in candidates:
+            entry = self._entries.get(candidate)
+            if entry is None or self._is_expired(entry, now):
+                continue
+            other = entry["shingles"]
+            score = len(shingles & other) / len(shingles | other)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def get(self, model: str, template: str, prompt: str) -> Optional[str]:
+        """
+        查找缓存的回复
+
+        Args:
+            model (str): 模型名称
+            template (str): 系统模板内容
+            prompt (str): 用户提示词
+
+        Returns:
+            Optional[str]: 命中时返回缓存的回复，否则返回None
+        """
+        key = (model, self._template_key(template), normalize_prompt(prompt))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry, now):
+                self._remove(key)
+                entry = None
+
+            if entry is not None:
+                self.hits += 1
+            elif self.near_threshold is not None:
+                near_key = self._near_lookup(key, now)
+                if near_key is not None:
+                    key = near_key
+                    entry = self._entries[near_key]
+                    self.near_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return entry["response"]
+
+    def put(self, model: str, template: str, prompt: str, response: str) -> None:
+        """
+        写入缓存
+
+        Args:
+            model (str): 模型名称
+            template (str): 系统模板内容
+            prompt (str): 用户提示词
+            response (str): AI回复
+        """
+        if not response:
+            return
+        key = (model, self._template_key(template), normalize_prompt(prompt))
+        with self._lock:
+            self._insert(key, response, time.time())
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        命中统计
+
+        Returns:
+            Dict[str, int]: 条目数、精确命中、近似命中、未命中次数
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses
+        }
+
+    def save(self) -> bool:
+        """
+        保存到持久化文件
+
+        Returns:
+            bool: 保存成功返回True
+        """
+        if not self.path:
+            return False
+        now = time.time()
+        with self._lock:
+            records = [
+                {"key": list(key), "response": entry["response"], "created": entry["created"]}
+                for key, entry in self._entries.items()
+                if not self._is_expired(entry, now)
+            ]
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"保存回复缓存失败: {e}")
+            return False
+
+    def load(self) -> int:
+        """
+        从持久化文件加载，过期条目会被跳过
+
+        Returns:
+            int: 加载的条目数
+        """
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except Exception as e:
+            print(f"读取回复缓存失败: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for record in records:
+                if self.ttl is not None and now - record["created"] > self.ttl:
+                    continue
+                self._insert(tuple(record["key"]), record["response"], record["created"])
+                loaded += 1
+        return loaded
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并模块
+相同key的并发请求只执行一次上游调用，结果（或流式输出的每个块）分发给所有等待方
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, AsyncIterator, Awaitable
+
+
+class _Call:
+    """一次进行中的同步调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    同步请求合并（线程间）
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行fn，若相同key的调用正在进行则等待并共享其结果
+
+        Args:
+            key (Hashable): 请求标识
+            fn (Callable): 实际调用
+
+        Returns:
+            Any: fn的返回值；fn抛出的异常会传递给所有等待方
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+        else:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """调用总数和被合并的调用数"""
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+class _StreamFlight:
+    """一次进行中的流式调用，缓存已产出的块供后加入的订阅方补发"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = asyncio.Condition()
+        self.subscribers = 0
+        self.task = None
+        self.cancelled = False  # 所有订阅方已离开，上游已取消，不再接受新订阅方
+
+
+class AsyncSingleFlight:
+    """
+    异步请求合并，支持普通协程和流式输出
+    进行中的调用按(事件循环, key)区分，不同事件循环之间不共享
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _StreamFlight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        等待fn()的结果，相同key的调用正在进行时共享其结果
+
+        上游调用在独立任务中执行，单个等待方被取消不会影响其他等待方。
+
+        Args:
+            key (Hashable): 请求标识
+            fn (Callable): 返回可等待对象的函数，只有首个调用方会执行
+
+        Returns:
+            Any: 调用结果
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        self.calls += 1
+
+        task = self._tasks.get(flight_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._tasks[flight_key] = task
+            task.add_done_callback(lambda t: self._finish_call(flight_key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finish_call(self, flight_key: Hashable, task: asyncio.Task) -> None:
+        """调用结束后移除记录，并取走异常以免所有等待方都已取消时产生警告"""
+        if self._tasks.get(flight_key) is task:
+            del self._tasks[flight_key]
+        if not task.cancelled():
+            task.exception()
+
+    async def stream(self, key: Hashable,
+                     fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        订阅fn()产生的流，相同key的流正在进行时共享同一上游，每个块分发给所有订阅方
+
+        Args:
+            key (Hashable): 请求标识
+            fn (Callable): 返回异步迭代器的函数，只有首个订阅方会执行
+
+        Yields:
+            Any: 流式输出的块，后加入的订阅方先收到已产出的块
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        self.calls += 1
+
+        flight = self._streams.get(flight_key)
+        if flight is None or flight.cancelled:
+            flight = _StreamFlight()
+            self._streams[flight_key] = flight
+            flight.task = loop.create_task(self._pump(flight_key, flight, fn()))
+        else:
+            self.shared += 1
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        await flight.cond.wait()
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done and index >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            # 所有订阅方都已离开时取消上游，并立即移除记录：_pump在之后的循环迭代中才结束，
+            # 其间到达的相同请求应发起新的调用，而不是加入已取消的流
+            if flight.subscribers == 0 and not flight.done:
+                flight.cancelled = True
+                if self._streams.get(flight_key) is flight:
+                    del self._streams[flight_key]
+                flight.task.cancel()
+
+    async def _pump(self, flight_key: Hashable, flight: _StreamFlight,
+                    source: AsyncIterator[Any]) -> None:
+        """消费上游流并唤醒订阅方"""
+        try:
+            async for chunk in source:
+                flight.chunks.append(chunk)
+                async with flight.cond:
+                    flight.cond.notify_all()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if hasattr(source, "aclose"):
+                await source.aclose()
+            if self._streams.get(flight_key) is flight:
+                del self._streams[flight_key]
+            flight.done = True
+            async with flight.cond:
+                flight.cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """调用总数和被合并的调用数"""
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._tasks) + len(self._streams)
+        }
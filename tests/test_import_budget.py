@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动导入时间回归测试：Core和voice的导入耗时超出IMPORT_BUDGET时失败
+
+用法:
+    python -m pytest -q tests/test_import_budget.py
+"""
+
+import os
+import sys
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from importprofile import check_budget
+
+
+def test_core_import_budget():
+    assert check_budget("Core")
+
+
+def test_voice_import_budget():
+    assert check_budget("voice")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时识别流的静音回归测试：识别服务约10秒收不到数据即断开连接，
+以长时间静音开头的录音流也必须持续发送音频
+
+用法:
+    python -m pytest -q tests/test_stream_silence.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.s2t import SpeechRecognizer, AUDIO_CONFIG
+
+BYTES_PER_SECOND = AUDIO_CONFIG["bytes_per_second"]
+IDLE_LIMIT = 10.0  # 服务端无数据断开的时长(秒)
+
+
+class _RecordingSession:
+    """代替识别会话，记录每个上传帧发出时已采集的音频时长"""
+
+    def __init__(self, captured):
+        self.is_open = True
+        self.saved_seconds = 0.0
+        self.captured = captured
+        self.sent_at = []
+
+    def start(self, frames):
+        for frame in frames:
+            self.sent_at.append(self.captured[0] / BYTES_PER_SECOND)
+
+    def iter_results(self, timeout):
+        return iter(())
+
+    def close(self):
+        pass
+
+
+def _silence_then_speech(captured, silence_seconds=12.0, speech_seconds=1.0):
+    """按采集节奏产出的录音帧：低电平噪声开头，之后是一段语音频段的音调"""
+    rng = np.random.default_rng(0)
+    rate = AUDIO_CONFIG["sample_rate"]
+    noise = rng.normal(0, 20, int(silence_seconds * rate))
+    t = np.arange(int(speech_seconds * rate)) / rate
+    tone = 8000 * np.sin(2 * np.pi * 300 * t)
+    pcm = np.concatenate([noise, tone]).astype("<i2").tobytes()
+    size = AUDIO_CONFIG["frame_size"]
+    for offset in range(0, len(pcm), size):
+        captured[0] = offset + size
+        yield pcm[offset:offset + size]
+
+
+def _max_idle(sent_at, total_seconds):
+    points = [0.0] + sent_at + [total_seconds]
+    return max(b - a for a, b in zip(points, points[1:]))
+
+
+def _run(**kwargs):
+    captured = [0]
+    session = _RecordingSession(captured)
+    recognizer = SpeechRecognizer("appid", "key", "secret")
+    list(recognizer.recognize_stream(_silence_then_speech(captured), session=session, **kwargs))
+    return session.sent_at
+
+
+def test_live_stream_sends_leading_silence_by_default():
+    sent_at = _run()
+    assert sent_at, "没有发送任何音频"
+    assert _max_idle(sent_at, 13.0) < 1.0
+
+
+def test_live_stream_with_vad_keeps_connection_alive():
+    sent_at = _run(vad=True)
+    assert sent_at[0] <= 1.5
+    assert _max_idle(sent_at, 13.0) < IDLE_LIMIT / 2
+    # 语音部分仍然上传
+    assert sent_at[-1] > 12.0
@@ -1,10 +1,10 @@
 import asyncio
 import os
-from voiceIO import play, record
-from audioapi.s2t import recognize_speech
-from audioapi.smarttts import stream_text_to_speech_init, stream_text_to_speech_send, stream_text_to_speech_finish
+import sys
 from Core import get_ai_response
 
+# 音频模块（websocket客户端等）在首次使用时才导入，缩短启动时间
+
 # 加载环境变量
 try:
     from dotenv import load_dotenv
@@ -19,90 +19,87 @@ apikey = os.environ["apikey"]
 
 # 配置常量
 VOICE_FILE = "./origin_audio.raw"
-AUDIO_FILE = "./demo.raw"
-MIN_FILE_SIZE = 48000  # 最小文件大小(字节)
-MAX_WAIT_TIME = 60    # 最大等待时间(秒)
-SLEEP_INTERVAL = 0.1  # 发送间隔(秒)
+MAX_WAIT_TIME = 300   # 最长播放等待时间(秒)
 
 async def async_voice_processing():
     """异步语音处理主函数"""
+    from audioapi.smarttts import SynthesizerPool
+    
+    # 录音期间在后台预先建立TTS连接，回复开始时直接使用
+    tts_pool = SynthesizerPool(appid, apisecret, apikey)
+    try:
+        await voice_turn(tts_pool)
+    finally:
+        tts_pool.close()
+
+async def voice_turn(tts_pool=None):
+    """一轮语音对话，tts_pool为热备合成连接池（可选）"""
     
-    # 1. 录音和语音识别
+    # 1. 边录音边识别
     print("开始录音...")
-    record.record_audio(VOICE_FILE)
-    userprompt = recognize_speech(VOICE_FILE)
+    userprompt = await recognize_while_recording()
     print(f"识别结果: {userprompt}")
+    if not userprompt:
+        return
     
     # 2. 获取AI响应流
     generator = get_ai_response(userprompt, 'Voice', stream=True)
     
-    # 3. 清理旧文件
-    if os.path.exists(AUDIO_FILE):
-        try:
-            os.remove(AUDIO_FILE)
-            print(f"已删除旧文件: {AUDIO_FILE}")
-        except Exception as e:
-            print(f"删除文件失败: {e}")
-            return
+    # 3. 启动流式播放器，合成的PCM经内存环形缓冲区直接送入播放
+    from voiceIO import play
+    player = play.StreamPlayer()
+    if not player.start():
+        return
     
     # 4. 并行执行TTS和播放
+    synthesizer = tts_pool.claim() if tts_pool is not None else None
     await asyncio.gather(
-        process_tts_stream(generator),
-        play_audio_async()
+        process_tts_stream(generator, player.buffer, synthesizer),
+        play_audio_async(player)
     )
 
-async def process_tts_stream(generator):
-    """处理TTS流数据"""
-    tts_initialized = False
+async def recognize_while_recording() -> str:
+    """录音帧从sox管道实时送入识别服务，按回车停止后返回最终结果"""
+    from voiceIO import record
+    from audioapi.s2t import recognize_speech_stream_async
     
-    async for chunk in generator:
-        content = chunk.content.strip()
-        if not content:  # 跳过空内容
-            continue
-            
-        # 初始化TTS连接(仅一次)
-        if not tts_initialized:
-            loop = asyncio.get_event_loop()
-            init_success = await loop.run_in_executor(
-                None, stream_text_to_speech_init, appid, apisecret, apikey, AUDIO_FILE
-            )
-            if init_success:
-                tts_initialized = True
-                print("TTS连接已初始化")
-            else:
-                print("TTS初始化失败")
-                return
-        
-        # 发送文本到TTS
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, stream_text_to_speech_send, content)
-        await asyncio.sleep(SLEEP_INTERVAL)  # 控制发送频率
+    frames = record.stream_audio(output_path=VOICE_FILE)
+    text = ""
+    async for text, is_final in recognize_speech_stream_async(frames):
+        if not is_final:
+            print(f"\r识别中: {text}", end="", flush=True)
+    print()
+    return text
+
+async def process_tts_stream(generator, audio_sink, synthesizer=None):
+    """处理TTS流数据：AI响应块直接送入异步TTS会话，synthesizer为预先建立连接的会话（可选）"""
+    from audioapi.smarttts import AsyncStreamingSynthesizer
     
-    # 完成TTS处理
-    if tts_initialized:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, stream_text_to_speech_finish)
+    try:
+        async with AsyncStreamingSynthesizer(appid, apisecret, apikey,
+                                             audio_sink=audio_sink,
+                                             synthesizer=synthesizer) as synth:
+            print("TTS连接已初始化")
+            async for chunk in generator:
+                content = chunk.content.strip()
+                if content:  # 跳过空内容
+                    await synth.send(content)
         print("TTS处理完成")
+    except ConnectionError as e:
+        print(f"TTS处理失败: {e}")
+    finally:
+        # 无论成功与否都结束缓冲区，避免播放端一直等待
+        audio_sink.close()
 
-async def play_audio_async():
-    """异步等待并播放音频"""
-    wait_time = 0
-    
-    # 等待音频文件生成
-    while wait_time < MAX_WAIT_TIME:
-        if os.path.exists(AUDIO_FILE) and os.path.getsize(AUDIO_FILE) > MIN_FILE_SIZE:
-            file_size = os.path.getsize(AUDIO_FILE)
-            print(f"音频文件已生成({file_size} bytes)，开始播放...")
-            
-            # 异步播放音频
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, play.play_audio, AUDIO_FILE)
-            return
-        
-        await asyncio.sleep(0.5)
-        wait_time += 0.5
-    
-    print("等待超时，跳过播放")
+async def play_audio_async(player):
+    """异步等待流式播放结束"""
+    loop = asyncio.get_event_loop()
+    if not await loop.run_in_executor(None, player.wait, MAX_WAIT_TIME):
+        player.stop()
 
 if __name__ == "__main__":
+    if "--import-profile" in sys.argv:
+        from importprofile import print_import_profile
+        print_import_profile("voice")
+        sys.exit(0)
     asyncio.run(async_voice_processing())
\ No newline at end of file
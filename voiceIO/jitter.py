@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+播放抖动缓冲模块
+合成音频帧按序列号排序后再写入播放缓冲区：缺失的帧跳过并用短交叉淡化掩盖接缝，
+开始播放前先缓存一段音频，缓存时长随到达抖动和实际欠载自适应调整，并统计欠载次数
+"""
+
+import time
+import threading
+from typing import Optional, Callable, Dict, Any
+
+import numpy as np
+
+# 抖动缓冲配置常量
+JITTER_CONFIG = {
+    "sample_rate": 24000,      # 采样率（s16le 单声道）
+    "min_delay": 0.06,         # 开始播放前至少缓存的音频时长(秒)
+    "max_delay": 0.5,          # 缓存时长上限(秒)
+    "jitter_factor": 3.0,      # 缓存时长 = 下限 + 该系数 × 到达抖动
+    "underrun_step": 0.04,     # 每次欠载后缓存时长下限增加的时长(秒)
+    "crossfade_ms": 5          # 缺帧和欠载恢复处的交叉淡化时长(毫秒)
+}
+
+
+# 所有会话的累计统计
+_totals: Dict[str, float] = {
+    "sessions": 0, "frames": 0, "gaps": 0, "missing_frames": 0, "late_frames": 0,
+    "duplicate_frames": 0, "underruns": 0, "stall_seconds": 0.0
+}
+_totals_lock = threading.Lock()
+
+
+def get_jitter_stats() -> Dict[str, Any]:
+    """
+    获取所有已结束会话的累计统计
+
+    Returns:
+        Dict[str, Any]: 会话数、帧数、缺口数、缺失/迟到/重复帧数、欠载次数和欠载总时长
+    """
+    with _totals_lock:
+        stats = dict(_totals)
+    stats["stall_seconds"] = round(stats["stall_seconds"], 3)
+    return stats
+
+
+class JitterBuffer:
+    """
+    播放抖动缓冲
+    push()按到达顺序接收(序列号, PCM)，按序列号顺序调用write输出；
+    push()和close()需在同一线程（或同一个顺序任务队列）中调用，write可以阻塞
+    """
+
+    def __init__(self, write: Callable[[bytes], Any],
+                 sample_rate: int = JITTER_CONFIG["sample_rate"],
+                 realtime: bool = True):
+        """
+        Args:
+            write (Callable): 输出函数，按播放顺序接收PCM（bytes或memoryview）
+            sample_rate (int): 采样率
+            realtime (bool): 输出是否被实时播放；为False时（如只写文件）只排序和修补缺口，
+                             不缓存、不统计欠载
+        """
+        self._write = write
+        self.realtime = realtime
+        self.bytes_per_second = sample_rate * 2
+        self._fade_bytes = sample_rate * JITTER_CONFIG["crossfade_ms"] // 1000 * 2
+
+        self._held: Dict[int, bytes] = {}
+        self._held_bytes = 0
+        self._next: Optional[int] = None     # 下一个应输出的序列号
+        self._last_seq: Optional[int] = None
+        self._playing = False
+        self._deadline: Optional[float] = None  # 已输出的音频预计播完的时刻
+        self._stalled_at: Optional[float] = None
+        self._tail: Optional[bytes] = None      # 留待与下一帧衔接的上一帧结尾
+        self._fade = False                      # 下一帧与上一帧之间有缺口，需要交叉淡化
+        self._closed = False
+
+        # 到达抖动估计：只统计比实时节奏晚到的部分（合成通常快于实时，提前到达不构成风险）
+        self._last_arrival: Optional[float] = None
+        self._last_duration = 0.0
+        self.jitter = 0.0
+        self._floor = JITTER_CONFIG["min_delay"]
+
+        self.frames = 0
+        self.gaps = 0
+        self.missing_frames = 0
+        self.late_frames = 0
+        self.duplicate_frames = 0
+        self.underruns = 0
+        self.stall_seconds = 0.0
+        self.startup_delay: Optional[float] = None  # 首帧到达到开始输出的时长(秒)
+        self._first_arrival: Optional[float] = None
+
+    @property
+    def target_delay(self) -> float:
+        """当前的播放缓存时长(秒)"""
+        delay = self._floor + JITTER_CONFIG["jitter_factor"] * self.jitter
+        return min(JITTER_CONFIG["max_delay"], max(JITTER_CONFIG["min_delay"], delay))
+
+    def _seconds(self, size: int) -> float:
+        return size / self.bytes_per_second
+
+    def push(self, seq: Optional[int], pcm: bytes) -> None:
+        """
+        接收一帧音频
+
+        Args:
+            seq (int): 序列号，为None时视为紧接上一帧
+            pcm (bytes): s16le PCM
+        """
+        if self._closed or not pcm:
+            return
+        now = time.monotonic()
+        if seq is None:
+            seq = 0 if self._last_seq is None else self._last_seq + 1
+        self._last_seq = seq
+        self.frames += 1
+        if self._first_arrival is None:
+            self._first_arrival = now
+
+        if self._last_arrival is not None:
+            lateness = (now - self._last_arrival) - self._last_duration
+            self.jitter += (max(lateness, 0.0) - self.jitter) / 16
+        self._last_arrival = now
+        self._last_duration = self._seconds(len(pcm))
+
+        if self._next is not None and seq < self._next:
+            self.late_frames += 1  # 已输出过或已判定为缺失
+            return
+        if seq in self._held:
+            self.duplicate_frames += 1
+            return
+        self._held[seq] = pcm
+        self._held_bytes += len(pcm)
+        self._pump(now)
+
+    def _pump(self, now: float) -> None:
+        """输出已可播放的帧"""
+        if self.realtime and self._playing and self._deadline is not None and now > self._deadline:
+            # 已输出的音频已经播完而后续帧还没输出：播放端欠载，重新缓存并提高缓存下限
+            self.underruns += 1
+            self._stalled_at = self._deadline
+            self._playing = False
+            self._fade = True
+            self._floor = min(JITTER_CONFIG["max_delay"], self._floor + JITTER_CONFIG["underrun_step"])
+
+        if not self._playing:
+            if self.realtime and self._seconds(self._held_bytes) < self.target_delay:
+                return
+            self._playing = True
+            if self.startup_delay is None:
+                self.startup_delay = now - self._first_arrival
+            if self._stalled_at is not None:
+                self.stall_seconds += now - self._stalled_at
+                self._stalled_at = None
+            if self._next is None:
+                self._next = min(self._held)
+
+        while self._held:
+            if self._next in self._held:
+                pcm = self._held.pop(self._next)
+                self._held_bytes -= len(pcm)
+                self._next += 1
+                self._release(pcm, now)
+                continue
+            # 缺帧：已缓存的后续音频足够多，或已输出的音频即将播完时不再等待
+            if not self.realtime:
+                return
+            remaining = self._deadline - now if self._deadline is not None else 0.0
+            if remaining > self._last_duration and self._seconds(self._held_bytes) < self.target_delay:
+                return
+            self._skip_gap()
+
+    def _skip_gap(self) -> None:
+        """放弃等待缺失的帧，从已到达的最小序列号继续"""
+        resume = min(self._held)
+        self.gaps += 1
+        self.missing_frames += resume - self._next
+        self._next = resume
+        self._fade = True
+
+    def _release(self, pcm: bytes, now: float) -> None:
+        """输出一帧：每帧保留结尾一小段，与下一帧衔接时若有缺口则交叉淡化"""
+        if self.realtime:
+            start = now if self._deadline is None else max(self._deadline, now)
+            self._deadline = start + self._seconds(len(pcm))
+
+        fade = self._fade_bytes
+        if len(pcm) % 2 or len(pcm) < 2 * fade:
+            # 帧太短或不是整采样，不做衔接处理
+            if self._tail is not None:
+                self._write(self._tail)
+                self._tail = None
+            self._write(pcm)
+            self._fade = False
+            return
+
+        view = memoryview(pcm)
+        if self._tail is None:
+            self._write(view[:-fade])
+        elif self._fade:
+            self._write(_crossfade(self._tail, view[:fade]))
+            self._write(view[fade:-fade])
+        else:
+            self._write(self._tail)
+            self._write(view[:-fade])
+        self._tail = bytes(view[-fade:])
+        self._fade = False
+
+    def close(self) -> None:
+        """音频结束：按序输出所有缓存的帧（跳过缺口），并汇总统计"""
+        if self._closed:
+            return
+        self._closed = True
+        now = time.monotonic()
+        if self._next is None and self._held:
+            self._next = min(self._held)
+        while self._held:
+            if self._next not in self._held:
+                self._skip_gap()
+            pcm = self._held.pop(self._next)
+            self._held_bytes -= len(pcm)
+            self._next += 1
+            self._release(pcm, now)
+        if self._tail is not None:
+            self._write(self._tail)
+            self._tail = None
+
+        with _totals_lock:
+            _totals["sessions"] += 1
+            for field in ("frames", "gaps", "missing_frames", "late_frames",
+                          "duplicate_frames", "underruns", "stall_seconds"):
+                _totals[field] += getattr(self, field)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        本会话的统计
+
+        Returns:
+            Dict[str, Any]: 帧数、缺口、缺失/迟到/重复帧数、欠载次数和时长、
+                            到达抖动、当前缓存时长和实际启动延迟(秒)
+        """
+        return {
+            "frames": self.frames,
+            "gaps": self.gaps,
+            "missing_frames": self.missing_frames,
+            "late_frames": self.late_frames,
+            "duplicate_frames": self.duplicate_frames,
+            "underruns": self.underruns,
+            "stall_seconds": round(self.stall_seconds, 3),
+            "jitter": round(self.jitter, 4),
+            "target_delay": round(self.target_delay, 3),
+            "startup_delay": None if self.startup_delay is None else round(self.startup_delay, 3)
+        }
+
+
+def _crossfade(tail: bytes, head) -> bytes:
+    """等长的两段PCM做线性交叉淡化：tail淡出、head淡入"""
+    before = np.frombuffer(tail, dtype="<i2").astype(np.float32)
+    after = np.frombuffer(head, dtype="<i2").astype(np.float32)
+    ramp = np.linspace(0.0, 1.0, len(before), dtype=np.float32)
+    mixed = before * (1.0 - ramp) + after * ramp
+    return np.clip(mixed, -32768, 32767).astype("<i2").tobytes()
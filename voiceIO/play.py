@@ -2,13 +2,53 @@
 # -*- coding: utf-8 -*-
 """
 音频播放模块
-使用ffplay播放音频文件，支持多种音频格式
+使用ffplay播放音频文件，支持多种音频格式，以及从内存缓冲区流式播放PCM数据
 """
 
 import subprocess
+import threading
+import time
 import os
+import sys
 from typing import Optional
 
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voiceIO.ringbuffer import AudioRingBuffer
+
+# 流式播放配置常量
+STREAM_CONFIG = {
+    "sample_rate": 24000,          # 采样率
+    "format": "s16le",             # PCM格式
+    "bytes_per_second": 48000,     # 24kHz * 16bit * 单声道
+    "buffer_seconds": 30,          # 环形缓冲区可容纳的音频时长(秒)
+    "chunk_size": 4800             # 每次写入ffplay的字节数(约100ms)
+}
+
+
+# ffplay可用性检查结果，检查通过后同一进程内不再重复启动子进程
+_ffplay_available = False
+
+
+def _check_ffplay() -> bool:
+    """
+    检查ffplay是否可用
+    
+    Returns:
+        bool: 可用返回True
+    """
+    global _ffplay_available
+    if _ffplay_available:
+        return True
+    try:
+        subprocess.run(["ffplay", "-version"], 
+                      capture_output=True, check=True, timeout=3)
+        _ffplay_available = True
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        print("错误: 未找到ffplay命令，请安装ffmpeg: sudo apt install ffmpeg")
+        return False
+
 
 def play_audio(file_path: str = "./demo.raw") -> bool:
     """
@@ -29,11 +69,7 @@ def play_audio(file_path: str = "./demo.raw") -> bool:
         return False
     
     # 检查ffplay是否可用（仅检查一次，提高性能）
-    try:
-        subprocess.run(["ffplay", "-version"], 
-                      capture_output=True, check=True, timeout=3)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        print("错误: 未找到ffplay命令，请安装ffmpeg: sudo apt install ffmpeg")
+    if not _check_ffplay():
         return False
     
     try:
@@ -68,6 +104,114 @@ def play_audio(file_path: str = "./demo.raw") -> bool:
         return False
 
 
+class StreamPlayer:
+    """
+    流式音频播放器
+    启动一个常驻ffplay进程从stdin读取PCM，后台线程持续把环形缓冲区中的数据送入管道，
+    合成仍在进行时即可开始播放
+    """
+
+    def __init__(self, sample_rate: int = STREAM_CONFIG["sample_rate"],
+                 buffer: Optional[AudioRingBuffer] = None):
+        self.sample_rate = sample_rate
+        self.buffer = buffer or AudioRingBuffer(
+            STREAM_CONFIG["bytes_per_second"] * STREAM_CONFIG["buffer_seconds"]
+        )
+        self._process = None
+        self._feeder_thread = None
+
+    def start(self) -> bool:
+        """
+        启动ffplay进程和数据输送线程
+
+        Returns:
+            bool: 启动成功返回True
+        """
+        cmd = [
+            "ffplay",
+            "-nodisp",
+            "-autoexit",
+            "-loglevel", "quiet",
+            "-fflags", "nobuffer",         # 不做额外输入缓冲，降低首包延迟
+            "-ar", str(self.sample_rate),
+            "-f", STREAM_CONFIG["format"],
+            "-i", "pipe:0"
+        ]
+
+        try:
+            self._process = subprocess.Popen(cmd,
+                                             stdin=subprocess.PIPE,
+                                             stdout=subprocess.DEVNULL,
+                                             stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            print("错误: 未找到ffplay命令，请安装ffmpeg: sudo apt install ffmpeg")
+            return False
+        except Exception as e:
+            print(f"启动播放器失败: {e}")
+            return False
+
+        self._feeder_thread = threading.Thread(target=self._feed, daemon=True)
+        self._feeder_thread.start()
+        return True
+
+    def _feed(self) -> None:
+        """把缓冲区数据写入ffplay，缓冲区关闭并读尽后关闭stdin让ffplay自动退出"""
+        try:
+            while True:
+                chunk = self.buffer.read(STREAM_CONFIG["chunk_size"])
+                if not chunk:
+                    break
+                self._process.stdin.write(chunk)
+                self._process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # ffplay提前退出或播放被停止
+            pass
+        except Exception as e:
+            print(f"音频输送错误: {e}")
+        finally:
+            try:
+                self._process.stdin.close()
+            except Exception:
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待播放结束
+
+        Args:
+            timeout (float): 超时时间(秒)，None表示一直等待
+
+        Returns:
+            bool: 正常播放完成返回True
+        """
+        if self._process is None:
+            return False
+
+        # 两次等待共用同一个截止时间
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._feeder_thread.join(timeout)
+            if self._feeder_thread.is_alive():
+                raise subprocess.TimeoutExpired(self._process.args, timeout)
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            self._process.wait(timeout=remaining)
+            print("播放完成")
+            return True
+        except subprocess.TimeoutExpired:
+            print("等待播放超时")
+            return False
+
+    def stop(self) -> None:
+        """立即停止播放"""
+        self.buffer.close()
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
 if __name__ == "__main__":
     import argparse
     
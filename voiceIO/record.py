@@ -2,12 +2,13 @@
 # -*- coding: utf-8 -*-
 """
 音频录制模块
-使用sox录制高质量音频，支持实时录制和按键停止
+使用sox录制高质量音频，支持实时录制和按键停止，以及从sox管道实时读取音频帧
 """
 
 import subprocess
+import threading
 import os
-from typing import Optional
+from typing import Optional, Iterator
 
 # 音频录制配置常量
 AUDIO_CONFIG = {
@@ -15,10 +16,35 @@ AUDIO_CONFIG = {
     "bit_depth": "16",         # 位深16bit
     "channels": "1",           # 单声道
     "encoding": "signed-integer",  # PCM格式
-    "min_file_size": 1024      # 最小文件大小(字节)
+    "min_file_size": 1024,     # 最小文件大小(字节)
+    "frame_size": 1280         # 流式读取的帧大小(字节)，16kHz 16bit下为40ms
 }
 
 
+# sox可用性检查结果，检查通过后同一进程内不再重复启动子进程
+_sox_available = False
+
+
+def _check_sox() -> bool:
+    """
+    检查sox是否可用
+    
+    Returns:
+        bool: 可用返回True
+    """
+    global _sox_available
+    if _sox_available:
+        return True
+    try:
+        subprocess.run(["sox", "--version"], 
+                      capture_output=True, check=True, timeout=3)
+        _sox_available = True
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        print("错误: 未找到sox命令，请安装sox")
+        return False
+
+
 def record_audio(output_path: str = "./origin_audio.raw") -> bool:
     """
     使用sox录制音频
@@ -30,11 +56,7 @@ def record_audio(output_path: str = "./origin_audio.raw") -> bool:
         bool: 录制成功返回True，失败返回False
     """
     # 检查sox是否可用
-    try:
-        subprocess.run(["sox", "--version"], 
-                      capture_output=True, check=True, timeout=3)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        print("错误: 未找到sox命令，请安装sox")
+    if not _check_sox():
         return False
     
     # 准备输出目录
@@ -123,6 +145,81 @@ def _validate_audio_file(file_path: str) -> bool:
     return True
 
 
+def _wait_enter(stop_event: threading.Event) -> None:
+    """等待用户按回车键后设置停止事件"""
+    try:
+        input()
+    except EOFError:
+        pass
+    stop_event.set()
+
+
+def stream_audio(stop_event: Optional[threading.Event] = None,
+                 frame_size: int = AUDIO_CONFIG["frame_size"],
+                 output_path: Optional[str] = None) -> Iterator[bytes]:
+    """
+    使用sox录音并实时产出PCM帧（s16le, 16kHz, 单声道）
+    
+    sox把音频写到stdout管道，本函数边录边读，调用方可在录音进行中就把帧发送给识别服务。
+    
+    Args:
+        stop_event (threading.Event): 停止录音的事件，为None时按回车键停止
+        frame_size (int): 每帧字节数
+        output_path (str): 同时保存录音的文件路径，为None时不保存
+    
+    Yields:
+        bytes: 音频帧，最后一帧可能不足frame_size
+    """
+    if not _check_sox():
+        return
+    
+    if stop_event is None:
+        stop_event = threading.Event()
+        print("开始录音，按回车键停止...")
+        threading.Thread(target=_wait_enter, args=(stop_event,), daemon=True).start()
+    
+    # 构建sox录音命令，输出原始PCM到stdout
+    cmd = [
+        "sox", "-d",
+        "-r", AUDIO_CONFIG["sample_rate"],
+        "-b", AUDIO_CONFIG["bit_depth"],
+        "-c", AUDIO_CONFIG["channels"],
+        "-e", AUDIO_CONFIG["encoding"],
+        "-t", "raw", "-"
+    ]
+    
+    process = subprocess.Popen(cmd,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    output = open(output_path, "wb") if output_path else None
+    try:
+        while not stop_event.is_set():
+            buf = process.stdout.read(frame_size)
+            if not buf:  # sox意外退出
+                break
+            if output:
+                output.write(buf)
+            yield buf
+        
+        # 停止录音并读出管道中剩余的数据
+        process.terminate()
+        rest = process.stdout.read()
+        for i in range(0, len(rest), frame_size):
+            buf = rest[i:i + frame_size]
+            if output:
+                output.write(buf)
+            yield buf
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        try:
+            process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if output:
+            output.close()
+
+
 if __name__ == "__main__":
     import argparse
     
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频环形缓冲区模块
+线程安全的有界字节缓冲区，用于在合成线程与播放线程之间传递PCM数据
+"""
+
+import threading
+from typing import Optional
+
+
+class AudioRingBuffer:
+    """
+    有界环形字节缓冲区
+    写满时写入方阻塞（背压），为空时读取方阻塞，close()后读取方读完剩余数据即返回EOF
+    """
+
+    def __init__(self, capacity: int = 1024 * 1024):
+        if capacity <= 0:
+            raise ValueError("缓冲区容量必须大于0")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._read_pos = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def closed(self) -> bool:
+        """是否已结束写入"""
+        return self._closed
+
+    def available(self) -> int:
+        """当前可读字节数"""
+        with self._cond:
+            return self._size
+
+    def write(self, data: bytes, timeout: Optional[float] = None) -> int:
+        """
+        写入数据，缓冲区满时阻塞等待读取方消费
+
+        Args:
+            data (bytes): PCM数据
+            timeout (float): 每次等待空间的超时时间(秒)，None表示一直等待
+
+        Returns:
+            int: 实际写入的字节数，缓冲区已关闭或等待超时时可能小于len(data)
+        """
+        view = memoryview(data)
+        written = 0
+        with self._cond:
+            while written < len(view):
+                while self._size == self.capacity and not self._closed:
+                    if not self._cond.wait(timeout):
+                        return written
+                if self._closed:
+                    return written
+
+                # 写入到环尾，可能需要分两段回绕
+                write_pos = (self._read_pos + self._size) % self.capacity
+                n = min(len(view) - written, self.capacity - self._size,
+                        self.capacity - write_pos)
+                self._buf[write_pos:write_pos + n] = view[written:written + n]
+                self._size += n
+                written += n
+                self._cond.notify_all()
+        return written
+
+    def read(self, max_bytes: int, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        读取数据，缓冲区为空时阻塞等待写入方
+
+        Args:
+            max_bytes (int): 最多读取的字节数
+            timeout (float): 等待超时时间(秒)，None表示一直等待
+
+        Returns:
+            Optional[bytes]: 读取到的数据；已关闭且读尽时返回b""；等待超时返回None
+        """
+        with self._cond:
+            while self._size == 0:
+                if self._closed:
+                    return b""
+                if not self._cond.wait(timeout):
+                    return None
+
+            n = min(max_bytes, self._size, self.capacity - self._read_pos)
+            chunk = bytes(self._buf[self._read_pos:self._read_pos + n])
+            self._read_pos = (self._read_pos + n) % self.capacity
+            self._size -= n
+            self._cond.notify_all()
+            return chunk
+
+    def close(self) -> None:
+        """标记写入结束，唤醒所有等待方（可重复调用）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reset(self) -> None:
+        """清空数据并重新打开缓冲区"""
+        with self._cond:
+            self._read_pos = 0
+            self._size = 0
+            self._closed = False
+            self._cond.notify_all()
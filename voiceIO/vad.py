@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音活动检测模块
+按短时能量和过零率判断PCM（s16le, 16kHz, 单声道）中的语音帧，去掉首尾静音、
+缩短句间长停顿，减少上传给识别服务的音频时长（识别按音频时长计费）
+
+用法:
+    python voiceIO/vad.py origin_audio.raw -o trimmed.raw
+"""
+
+from collections import deque
+from typing import Optional, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# 语音检测配置常量
+VAD_CONFIG = {
+    "sample_rate": 16000,      # 采样率
+    "frame_ms": 20,            # 分析帧长(毫秒)
+    "min_db": -50.0,           # 语音帧的最低能量(dBFS)，低于此值一律视为静音
+    "margin_db": 12.0,         # 能量高出噪声底噪多少(dB)视为语音
+    "zcr_min": 0.25,           # 清辅音（能量较低、过零率高）的最低过零率
+    "noise_floor_db": -60.0,   # 实时音频的初始噪声底噪估计(dBFS)
+    "floor_rise_db": 0.02,     # 噪声底噪每帧最多上升的幅度(dB)，环境变吵时缓慢跟上
+    "min_speech_ms": 60,       # 连续语音帧达到此时长才认为开始说话，过滤按键声等短噪声
+    "preroll_ms": 200,         # 保留语音开始前的静音时长，避免截掉弱起音
+    "hangover_ms": 300,        # 保留语音结束后的静音时长；句间停顿最多保留preroll+hangover
+    "keepalive_ms": 1000       # 实时流中连续丢弃的音频达到此时长时发送一帧静音，识别服务约10秒无数据即断开
+}
+
+_SILENCE_DB = -100.0  # 全零帧的能量
+
+
+def frame_features(samples: np.ndarray, frame_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算每帧的能量和过零率，不足一帧的尾部忽略
+
+    Args:
+        samples (np.ndarray): int16采样
+        frame_len (int): 每帧采样数
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (能量dBFS, 过零率0~1)
+    """
+    count = len(samples) // frame_len
+    frames = samples[:count * frame_len].reshape(count, frame_len).astype(np.float32)
+    power = np.mean(frames * frames, axis=1) / (32768.0 * 32768.0)
+    db = np.maximum(10.0 * np.log10(np.maximum(power, 1e-12)), _SILENCE_DB)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return db, zcr
+
+
+def estimate_noise_floor(samples: np.ndarray, frame_len: int) -> float:
+    """
+    用整段音频能量的低分位数估计噪声底噪，适用于已录制好的音频
+
+    Returns:
+        float: 底噪(dBFS)
+    """
+    db, _ = frame_features(samples, frame_len)
+    if len(db) == 0:
+        return VAD_CONFIG["noise_floor_db"]
+    return float(np.percentile(db, 10))
+
+
+def speech_mask(db: np.ndarray, zcr: np.ndarray, noise_floor: float) -> np.ndarray:
+    """
+    按固定底噪判断每帧是否为语音（SilenceTrimmer逐帧使用相同的规则，并自适应更新底噪）
+
+    Args:
+        db (np.ndarray): 每帧能量(dBFS)
+        zcr (np.ndarray): 每帧过零率
+        noise_floor (float): 噪声底噪(dBFS)
+
+    Returns:
+        np.ndarray: 布尔数组，True为语音帧
+    """
+    threshold = max(VAD_CONFIG["min_db"], noise_floor + VAD_CONFIG["margin_db"])
+    return (db > threshold) | (
+        (db > threshold - VAD_CONFIG["margin_db"] / 2) & (zcr >= VAD_CONFIG["zcr_min"])
+    )
+
+
+def find_pauses(pcm: bytes, min_pause_ms: int = 300,
+                sample_rate: int = VAD_CONFIG["sample_rate"]) -> List[Tuple[int, int]]:
+    """
+    查找已录制音频中的停顿，用于在停顿处切分长音频
+
+    Args:
+        pcm (bytes): s16le PCM
+        min_pause_ms (int): 最短停顿时长(毫秒)
+        sample_rate (int): 采样率
+
+    Returns:
+        List[Tuple[int, int]]: 每个停顿的(起始字节偏移, 结束字节偏移)，按时间顺序
+    """
+    frame_len = sample_rate * VAD_CONFIG["frame_ms"] // 1000
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2")
+    db, zcr = frame_features(samples, frame_len)
+    if len(db) == 0:
+        return []
+    speech = speech_mask(db, zcr, float(np.percentile(db, 10)))
+
+    # 静音段的边界：相邻帧语音/静音状态变化的位置
+    padded = np.concatenate(([True], speech, [True])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    min_frames = max(1, min_pause_ms // VAD_CONFIG["frame_ms"])
+    frame_bytes = frame_len * 2
+    return [
+        (int(start) * frame_bytes, int(end) * frame_bytes)
+        for start, end in zip(starts, ends)
+        if end - start >= min_frames
+    ]
+
+
+class SilenceTrimmer:
+    """
+    逐块去除静音
+    输入任意长度的PCM块，返回应当上传的部分：语音开始前只保留preroll，语音结束后保留
+    hangover，其余静音丢弃。处于静音中时最多缓存preroll+min_speech的音频，
+    因此实时流只在说话开始时多出约min_speech的延迟
+    """
+
+    def __init__(self, noise_floor_db: Optional[float] = None,
+                 sample_rate: int = VAD_CONFIG["sample_rate"]):
+        """
+        Args:
+            noise_floor_db (float): 初始噪声底噪，为None时使用配置值并随音频自适应；
+                                    已录制的音频可传入estimate_noise_floor()的结果
+            sample_rate (int): 采样率
+        """
+        self.frame_len = sample_rate * VAD_CONFIG["frame_ms"] // 1000
+        self.frame_bytes = self.frame_len * 2
+        self.sample_rate = sample_rate
+        self.noise_floor = VAD_CONFIG["noise_floor_db"] if noise_floor_db is None else noise_floor_db
+
+        frame_ms = VAD_CONFIG["frame_ms"]
+        self._min_speech = max(1, VAD_CONFIG["min_speech_ms"] // frame_ms)
+        self._hangover = VAD_CONFIG["hangover_ms"] // frame_ms
+        self._held = deque(maxlen=VAD_CONFIG["preroll_ms"] // frame_ms + self._min_speech)
+        self._remainder = b""
+        self._speaking = False
+        self._run = 0          # 静音中为连续语音帧数，说话中为连续静音帧数
+
+        self.input_bytes = 0
+        self.dropped_bytes = 0
+
+    @property
+    def saved_seconds(self) -> float:
+        """已丢弃的音频时长(秒)"""
+        return self.dropped_bytes / (self.sample_rate * 2)
+
+    def _is_speech(self, db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+        """按当前底噪判断语音帧，并更新底噪估计"""
+        speech = np.empty(len(db), dtype=bool)
+        for i in range(len(db)):
+            speech[i] = speech_mask(db[i], zcr[i], self.noise_floor)
+            # 底噪向下快速跟随，向上缓慢跟随，说话时不会被语音抬高
+            if db[i] < self.noise_floor:
+                self.noise_floor = (self.noise_floor + db[i]) / 2
+            elif not speech[i]:
+                self.noise_floor += VAD_CONFIG["floor_rise_db"]
+        return speech
+
+    def _drop(self, frame: bytes) -> None:
+        self.dropped_bytes += len(frame)
+
+    def process(self, chunk: bytes) -> bytes:
+        """
+        处理一块PCM
+
+        Args:
+            chunk (bytes): s16le PCM，可以不是整帧
+
+        Returns:
+            bytes: 应上传的PCM，可能为空
+        """
+        self.input_bytes += len(chunk)
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b""
+
+        db, zcr = frame_features(np.frombuffer(data[:usable], dtype="<i2"), self.frame_len)
+        output = []
+        for i, speech in enumerate(self._is_speech(db, zcr)):
+            frame = data[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+            if self._speaking:
+                self._run = 0 if speech else self._run + 1
+                if self._run <= self._hangover:
+                    output.append(frame)
+                else:
+                    self._speaking = False
+                    self._run = 0
+                    self._held.append(frame)
+                continue
+
+            self._run = self._run + 1 if speech else 0
+            if len(self._held) == self._held.maxlen:
+                self._drop(self._held[0])
+            self._held.append(frame)
+            if self._run >= self._min_speech:
+                output.extend(self._held)
+                self._held.clear()
+                self._speaking = True
+                self._run = 0
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        """
+        音频结束：丢弃缓存的尾部静音
+
+        Returns:
+            bytes: 说话中剩余的不足一帧的音频
+        """
+        for frame in self._held:
+            self._drop(frame)
+        self._held.clear()
+        tail, self._remainder = self._remainder, b""
+        if self._speaking:
+            return tail
+        self._drop(tail)
+        return b""
+
+
+def trim_silence(pcm: bytes, sample_rate: int = VAD_CONFIG["sample_rate"]) -> Tuple[bytes, float]:
+    """
+    去除已录制音频的首尾静音并缩短长停顿
+
+    Args:
+        pcm (bytes): s16le PCM
+        sample_rate (int): 采样率
+
+    Returns:
+        Tuple[bytes, float]: (去除静音后的PCM, 节省的音频时长(秒))。
+                             整段都是静音时返回空PCM
+    """
+    trimmer = SilenceTrimmer(sample_rate=sample_rate)
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2")
+    trimmer.noise_floor = estimate_noise_floor(samples, trimmer.frame_len)
+    trimmed = trimmer.process(pcm) + trimmer.flush()
+    return trimmed, trimmer.saved_seconds
+
+
+def trim_frames(frames: Iterable[bytes], trimmer: Optional[SilenceTrimmer] = None) -> Iterator[bytes]:
+    """
+    实时去除静音：逐帧转发语音部分，跳过静音；连续跳过keepalive_ms的音频后
+    发送一帧数字静音（全零），保持识别连接不因长时间无数据被服务端关闭
+
+    Args:
+        frames (Iterable[bytes]): PCM帧，如voiceIO.record.stream_audio()
+        trimmer (SilenceTrimmer): 为None时新建；传入可在结束后读取saved_seconds
+
+    Yields:
+        bytes: 应上传的PCM块，不超过输入帧长
+    """
+    trimmer = trimmer or SilenceTrimmer()
+    keepalive_bytes = trimmer.sample_rate * 2 * VAD_CONFIG["keepalive_ms"] // 1000
+    try:
+        size = 0
+        idle = 0  # 距上次上传的输入字节数
+        for frame in frames:
+            size = max(size, len(frame))
+            output = trimmer.process(frame)
+            if not output:
+                idle += len(frame)
+                if idle >= keepalive_bytes:
+                    idle = 0
+                    # 保活帧会被上传，不计入节省的时长
+                    trimmer.dropped_bytes -= len(frame)
+                    yield bytes(len(frame))
+                continue
+            idle = 0
+            # 说话开始时会一次放出缓存的前导音频，按输入帧长切开，保持上传帧大小不变
+            for offset in range(0, len(output), size):
+                yield output[offset:offset + size]
+        tail = trimmer.flush()
+        if tail:
+            yield tail
+    finally:
+        if hasattr(frames, "close"):
+            frames.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="去除PCM音频中的静音（s16le, 16kHz, 单声道）")
+    parser.add_argument("input", help="输入音频文件")
+    parser.add_argument("-o", "--output", help="输出文件，不指定时只统计")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as f:
+        pcm = f.read()
+    trimmed, saved = trim_silence(pcm)
+    total = len(pcm) / (VAD_CONFIG["sample_rate"] * 2)
+    print(f"原始时长 {total:.2f} 秒，去除静音后 {total - saved:.2f} 秒，节省 {saved:.2f} 秒")
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(trimmed)
+        print(f"已保存: {args.output}")
@@ -14,6 +14,11 @@ from datetime import datetime
 from time import mktime
 import _thread as thread
 import os
+import sys
+
+# 添加父目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audioapi.transport import Connection, create_auth_url
 
 
 STATUS_FIRST_FRAME = 0  # 第一帧的标识
@@ -108,29 +113,8 @@ def parse_url(requset_url):
 
 # build websocket auth request url
 def assemble_ws_auth_url(requset_url, method="GET", api_key="", api_secret=""):
-    u = parse_url(requset_url)
-    host = u.host
-    path = u.path
-    now = datetime.now()
-    date = format_date_time(mktime(now.timetuple()))
-    print(date)
-    # date = "Thu, 12 Dec 2019 01:57:27 GMT"
-    signature_origin = "host: {}\ndate: {}\n{} {} HTTP/1.1".format(host, date, method, path)
-    # print(signature_origin)
-    signature_sha = hmac.new(api_secret.encode('utf-8'), signature_origin.encode('utf-8'),
-                             digestmod=hashlib.sha256).digest()
-    signature_sha = base64.b64encode(signature_sha).decode(encoding='utf-8')
-    authorization_origin = "api_key=\"%s\", algorithm=\"%s\", headers=\"%s\", signature=\"%s\"" % (
-        api_key, "hmac-sha256", "host date request-line", signature_sha)
-    authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode(encoding='utf-8')
-    # print(authorization_origin)
-    values = {
-        "host": host,
-        "date": date,
-        "authorization": authorization
-    }
-
-    return requset_url + "?" + urlencode(values)
+    # 签名由audioapi.transport统一生成（同一秒内复用）
+    return create_auth_url(requset_url, api_key, api_secret, method)
 
 # 全局变量用于存储当前的输出文件路径
 current_output_file = './demo.mp3'
@@ -174,7 +158,7 @@ def on_error(ws, error):
 
 
 # 收到websocket关闭的处理
-def on_close(ws,ts,end):
+def on_close(ws, *args):
     return 0
     # print("### closed ###")
 
@@ -220,12 +204,13 @@ def text_to_speech(text, res_id, appid, apisecret, apikey, output_file='./demo.m
         wsParam = Ws_Param(APPID=appid, APISecret=apisecret,
                            APIKey=apikey,
                            Text=text, res_id=res_id)
-        websocket.enableTrace(False)
         requrl = 'wss://cn-huabei-1.xf-yun.com/v1/private/voice_clone'
-        wsUrl = assemble_ws_auth_url(requrl, "GET", apikey, apisecret)
-        ws = websocket.WebSocketApp(wsUrl, on_message=on_message, on_error=on_error, on_close=on_close)
-        ws.on_open = on_open
-        ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+        # 通过共用传输层建立连接（签名、重试与连接指标），等待服务端结束连接
+        ws = Connection("voice_clone", requrl, apikey, apisecret,
+                        on_message=on_message, on_open=on_open,
+                        on_error=on_error, on_close=on_close)
+        ws.start()
+        ws.closed.result()
         
         # 检查文件是否生成成功
         if os.path.exists(output_file):